@@ -0,0 +1,91 @@
+from config import app
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+import logging
+import time
+import uuid
+
+class QueueFullError(Exception):
+    pass
+
+class Job:
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "queued"
+        self.result = None
+        self.statusCode = None
+        self.createdAt = time.time()
+        self.finishedAt = None
+        self.done = Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the job finishes (or timeout seconds pass); returns whether it finished"""
+        return self.done.wait(timeout)
+
+    def to_json(self):
+        return {
+            "jobId": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "statusCode": self.statusCode,
+            "createdAt": self.createdAt,
+            "finishedAt": self.finishedAt,
+        }
+
+class JobQueue:
+    """Runs AI calls on a bounded worker pool so they never hold a request thread.
+    Jobs with the same key that are still queued or running share one upstream call."""
+
+    def __init__(self, max_workers, max_queued, job_ttl):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eventide-ai")
+        self.max_queued = max_queued
+        self.job_ttl = job_ttl
+        self.lock = Lock()
+        self.jobs = {}
+        self.inflight = {}
+
+    def submit(self, kind, key, fn, *args):
+        """Queues fn(*args), which must return (body, status). Returns (job, coalesced)."""
+        with self.lock:
+            self._expire_finished()
+            inflight_key = (kind, key)
+            if inflight_key in self.inflight:
+                return self.inflight[inflight_key], True
+            if len(self.inflight) >= self.max_queued:
+                raise QueueFullError(f"Too many AI requests in progress (limit {self.max_queued})")
+            job = Job(kind, key)
+            self.jobs[job.id] = job
+            self.inflight[inflight_key] = job
+        self.executor.submit(self._run, job, fn, args)
+        return job, False
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job, fn, args):
+        job.status = "running"
+        try:
+            with app.app_context():
+                result = fn(*args)
+            job.result, job.statusCode = result
+            job.status = "done" if job.statusCode < 400 else "failed"
+        except Exception as e:
+            logging.error(f"AI job {job.id} ({job.kind}) failed: {str(e)}")
+            job.result, job.statusCode, job.status = {"message": "AI request failed"}, 500, "failed"
+        finally:
+            job.finishedAt = time.time()
+            with self.lock:
+                self.inflight.pop((job.kind, job.key), None)
+            job.done.set()
+
+    def _expire_finished(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self.jobs.items() if job.finishedAt and job.finishedAt < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+ai_jobs = JobQueue(app.config["AI_MAX_CONCURRENCY"], app.config["AI_MAX_QUEUED"], app.config["AI_JOB_TTL"])
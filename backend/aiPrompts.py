@@ -1,6 +1,9 @@
-from datetime import datetime
+"""Prompt templates. The building blocks below are plain strings; the full prompts that combine them are
+composed on first access through the module __getattr__, so importing this module costs next to nothing."""
+from datetime import date
 
-currentDate = datetime.now().date()
+# Bump whenever gemini_optimizer_prompt (or anything it includes) changes, so cached optimizer replies are retired
+optimizer_prompt_version = 1
 
 policy = """
 Good Schedule/Event Policy:
@@ -102,11 +105,12 @@ Output:
 - Do not include explanations or additional text outside the JSON object.
 """
 
-constraints = f"""
+def _build_constraints():
+    return f"""
 Constraints:
 - If told to generate one event, the event must be of type "event" (not "reminder").
 - If told to generate a schedule, the events can be diverse, and be either events or reminders
-- Use the current date ({currentDate}) for startDate and endDate.
+- Use the current date ({date.today()}) for startDate and endDate.
 - endDate must be on or after startDate.
 - start and end times must be in "HH:MM AM/PM" format and within the same day (for simplicity).
 - end time must be after start time, with a duration of at least 30 minutes but no more than 4 hours.
@@ -121,7 +125,8 @@ Constraints:
 
 
 
-gemini_optimizer_prompt = f"""
+def _build_gemini_optimizer_prompt():
+    return f"""
 You are an AI schedule optimization agent.
 
 Your task:
@@ -138,7 +143,49 @@ Your task:
 {optimizer_output}
 """
 
-gemini_event_generator_prompt = f"""
+compact_format = """
+id|date|days|start|end|lock|kind|urg|title|desc
+- The first line names the columns; every other line is one event, with cells separated by "|".
+- id: event id. date: start date (YYYY-MM-DD). days: how many days after date the event ends (blank = same day).
+- start, end: 24-hour HH:MM. lock: 1 if locked, blank if not. kind: r for a reminder, blank for an event.
+- urg: urgency code, t=trivial, o=ongoing, a=attention-needed, i=important, c=critical.
+- title, desc: free text, with "|" written as "\\|". The desc column is only present when needed.
+"""
+
+compact_optimization_rules = """
+Optimization Rules:
+1. You must optimize the schedule to best follow the Good Schedule Policy provided below.
+2. You may only change columns that the user allows you to modify. Never change id or kind.
+3. Never add or remove schedule items unless explicitly permitted by the user.
+4. Keep the table format exactly as defined, with the same header line and columns.
+"""
+
+compact_optimizer_output = """
+Output:
+- If changes are needed, output the header line followed by ONLY the rows you changed, in the same format, no explanations.
+- If the schedule is missing columns or has malformed rows, output "Incorrect JSON Object Structure" and then specify what is wrong.
+- If no schedule is provided, output "Empty Schedule Provided".
+- If the schedule already perfectly follows the Good Schedule Policy, output "Perfect Schedule".
+"""
+
+def _build_gemini_compact_optimizer_prompt():
+    return f"""
+You are an AI schedule optimization agent.
+
+Your task:
+- You will receive a schedule as a compact table in this format:
+
+{compact_format}
+
+{compact_optimization_rules}
+
+{policy}
+
+{compact_optimizer_output}
+"""
+
+def _build_gemini_event_generator_prompt():
+    return f"""
 You are an AI agent that generates random, but realistic and sensible, events.
 
 Your task:
@@ -148,12 +195,13 @@ Your task:
 
 {policy}
 
-{constraints}
+{_build_constraints()}
 
 {event_generator_output}
 """
 
-gemini_schedule_generator_prompt = f"""
+def _build_gemini_schedule_generator_prompt():
+    return f"""
 You are an AI agent that generates a random, but realistic and sensible, schedule.
 
 Your task:
@@ -163,12 +211,13 @@ Your task:
 
 {policy}
 
-{constraints}
+{_build_constraints()}
 
 {schedule_generator_output}
 """
 
-gemini_summarizer_prompt = f"""
+def _build_gemini_summarizer_prompt():
+    return f"""
 You are an AI agent that generates a detailed summary of a provided schedule.
 
 Your task:
@@ -186,4 +235,18 @@ Output:
 - Do not include external explanations or additional text outside the summary
 - Do NOT CREATE ANY MULTIPLE LINES. Your output will be compressed to one line, so attempting to have bullet points in it will look concerning. 
 - Use punctuation to separate points, not line breaks.
-"""
\ No newline at end of file
+"""
+
+# Prompts that mention today's date are rebuilt on every access so a long-running server never sends a stale one
+_DATED = {"constraints", "gemini_event_generator_prompt", "gemini_schedule_generator_prompt"}
+_composed = {}
+
+def __getattr__(name):
+    builder = globals().get(f"_build_{name}")
+    if builder is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name in _DATED:
+        return builder()
+    if name not in _composed:
+        _composed[name] = builder()
+    return _composed[name]
@@ -0,0 +1,243 @@
+from config import app
+from dotenv import load_dotenv
+from threading import Lock
+import aiPrompts
+import optimizerCache
+import compactSchedule
+import metrics
+from streamParsers import FenceStripper, JsonEventParser, LineParser
+import json
+import logging
+import os
+import time
+
+load_dotenv()
+
+class StubModel:
+    """Offline stand-in for the Gemini model, selected with EVENTIDE_AI_MODEL=stub.
+    Echoes the schedule back unchanged (or a fixed summary) after EVENTIDE_AI_STUB_DELAY seconds.
+    With stream=True the reply arrives in small pieces spread over the same delay."""
+    STREAM_PIECE = 16
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def _reply(self, prompt):
+        marker = "Schedule to be Improved: "
+        if marker in prompt:
+            return prompt[prompt.index(marker) + len(marker):]
+        return "Stub summary of the provided schedule."
+
+    def _pieces(self, text):
+        pieces = [text[i:i + self.STREAM_PIECE] for i in range(0, len(text), self.STREAM_PIECE)]
+        for piece in pieces:
+            time.sleep(self.delay / len(pieces))
+            yield StubResponse(piece)
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._pieces(self._reply(prompt))
+        time.sleep(self.delay)
+        return StubResponse(self._reply(prompt))
+
+class StubResponse:
+    usage_metadata = None
+
+    def __init__(self, text):
+        self.text = text
+
+_models = {}
+_models_lock = Lock()
+
+def get_model():
+    """The model handle for AI_MODEL, created on first use and shared by every later request.
+    The Gemini SDK is only imported here, so processes that never call the model never load it."""
+    name = app.config["AI_MODEL"]
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _models_lock:
+        if name not in _models:
+            if name == "stub":
+                _models[name] = StubModel(float(os.getenv("EVENTIDE_AI_STUB_DELAY", 0)))
+            else:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _models[name] = genai.GenerativeModel(name)
+        return _models[name]
+
+def generate(kind, prompt):
+    """Sends prompt to the model and returns the reply text, recording latency, sizes and token usage"""
+    metrics.LLM_PROMPT_BYTES.observe(len(prompt.encode("utf-8")), kind=kind)
+    try:
+        with metrics.phase(kind, "model"):
+            response = get_model().generate_content(prompt)
+            text = response.text
+    except Exception:
+        metrics.LLM_CALLS.inc(kind=kind, outcome="error")
+        raise
+    metrics.LLM_CALLS.inc(kind=kind, outcome="ok")
+    _record_reply(kind, text, response)
+    return text
+
+def _record_reply(kind, text, response):
+    metrics.LLM_RESPONSE_BYTES.observe(len(text.encode("utf-8")), kind=kind)
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        metrics.LLM_TOKENS.inc(getattr(usage, "prompt_token_count", 0) or 0, kind=kind, direction="prompt")
+        metrics.LLM_TOKENS.inc(getattr(usage, "candidates_token_count", 0) or 0, kind=kind, direction="response")
+
+def generate_stream(kind, prompt):
+    """Like generate(), but yields the reply text piece by piece as the model produces it"""
+    metrics.LLM_PROMPT_BYTES.observe(len(prompt.encode("utf-8")), kind=kind)
+    started = time.perf_counter()
+    received, response = [], None
+    try:
+        for response in get_model().generate_content(prompt, stream=True):
+            try:
+                text = response.text
+            except ValueError:
+                continue  # a chunk with no text part, e.g. only safety ratings
+            if not received:
+                metrics.LLM_FIRST_TOKEN.observe(time.perf_counter() - started, kind=kind)
+            received.append(text)
+            yield text
+    except Exception:
+        metrics.LLM_CALLS.inc(kind=kind, outcome="error")
+        raise
+    metrics.LLM_PHASE.observe(time.perf_counter() - started, kind=kind, phase="model")
+    metrics.LLM_CALLS.inc(kind=kind, outcome="ok")
+    # The final chunk carries the usage totals for the whole reply
+    _record_reply(kind, "".join(received), response)
+
+# How each allowed modification is described to the model, per prompt format
+JSON_FIELD_NAMES = {'times': "start and end times", 'dates': "startDate and endDate", 'locked': "locked status",
+                    'name': "name", 'description': "description", 'urgency': "urgency"}
+COMPACT_FIELD_NAMES = {'times': "times (start, end)", 'dates': "dates (date, days)", 'locked': "locked status (lock)",
+                       'name': "title", 'description': "description (desc)", 'urgency': "urgency (urg)"}
+
+def _allowed_instructions(allowed, field_names):
+    allowed_str = [name for modification, name in field_names.items() if modification in allowed]
+
+    additional_prompt = f"The user allows you to modify: {', '.join(allowed_str)}." if allowed_str else "The user does not allow any modifications."
+    locked_rule = "\n5. Maintain locked items exactly as they are." if 'locked' not in allowed else "\n5. You may modify locked status as needed."
+    return locked_rule + "\n\n" + additional_prompt
+
+def build_optimizer_prompt(schedule, allowed):
+    return aiPrompts.gemini_optimizer_prompt + _allowed_instructions(allowed, JSON_FIELD_NAMES) + "\n\nSchedule to be Improved: " + json.dumps({"schedule": schedule})
+
+def build_compact_optimizer_prompt(schedule, allowed):
+    return aiPrompts.gemini_compact_optimizer_prompt + _allowed_instructions(allowed, COMPACT_FIELD_NAMES) + "\n\nSchedule to be Improved: \n" + compactSchedule.encode(schedule, allowed)
+
+REPLY_MESSAGES = ["Perfect Schedule", "Empty Schedule Provided"]
+
+def _is_message(output):
+    return output in REPLY_MESSAGES or output.startswith("Incorrect JSON Object Structure")
+
+def is_cacheable(body):
+    # Error replies ("Incorrect JSON Object Structure...") would pin the schedule to that error for the whole TTL
+    return isinstance(body, dict) and ("schedule" in body or body.get("message") == "Perfect Schedule")
+
+def _parse_optimizer_output(output, schedule, allowed, compact):
+    if output.startswith("```json"):
+        output = output[7:-3].strip()
+    if _is_message(output):
+        return {"message": output}
+    if compact:
+        return compactSchedule.decode(output, schedule, allowed)
+    return json.loads(output)
+
+def _build_prompt(schedule, allowed, compact):
+    with metrics.phase("optimize", "prompt"):
+        return build_compact_optimizer_prompt(schedule, allowed) if compact else build_optimizer_prompt(schedule, allowed)
+
+def optimize(schedule, allowed, cache_key):
+    """Asks the model to optimize a non-empty schedule and caches a usable reply under cache_key.
+    Callers check optimizerCache first. Returns (body, status)."""
+    compact = app.config["AI_PROMPT_FORMAT"] == "compact"
+    full_prompt = _build_prompt(schedule, allowed, compact)
+    try:
+        output = generate("optimize", full_prompt).strip()
+        with metrics.phase("optimize", "parse"):
+            improved_schedule = _parse_optimizer_output(output, schedule, allowed, compact)
+        if is_cacheable(improved_schedule):
+            optimizerCache.put(cache_key, improved_schedule)
+        return improved_schedule, 200
+    except Exception as e:
+        logging.error(f"Error optimizing schedule: {str(e)}")
+        return {"message": "Failed to optimize schedule"}, 500
+
+def optimize_stream(schedule, allowed, cache_key):
+    """Streaming optimize(): yields ("event", event) for each changed event as soon as the model has
+    finished writing it, then ("done", body) or ("error", body). The full reply is still parsed and
+    cached at the end, so "done" carries exactly what optimize() would have returned."""
+    compact = app.config["AI_PROMPT_FORMAT"] == "compact"
+    full_prompt = _build_prompt(schedule, allowed, compact)
+    originals = {str(event.get('id')): event for event in schedule}
+    decoder = compactSchedule.Decoder(schedule, allowed) if compact else None
+    parser = LineParser() if compact else JsonEventParser()
+    received = []
+    try:
+        for text in generate_stream("optimize", full_prompt):
+            received.append(text)
+            if compact:
+                events = [decoder.feed_line(line) for line in parser.feed(text)]
+            else:
+                events = [event for event in parser.feed(text) if event != originals.get(str(event.get('id')))]
+            for event in events:
+                if event is not None:
+                    yield "event", event
+        if compact:
+            # The last row usually ends the reply without a newline
+            for event in map(decoder.feed_line, parser.finish()):
+                if event is not None:
+                    yield "event", event
+        with metrics.phase("optimize", "parse"):
+            improved_schedule = _parse_optimizer_output("".join(received).strip(), schedule, allowed, compact)
+    except Exception as e:
+        logging.error(f"Error streaming schedule optimization: {str(e)}")
+        yield "error", {"message": "Failed to optimize schedule"}
+        return
+    if is_cacheable(improved_schedule):
+        optimizerCache.put(cache_key, improved_schedule)
+    yield "done", improved_schedule
+
+def build_summarizer_prompt(schedule):
+    return aiPrompts.gemini_summarizer_prompt + "\n\nSchedule to Summarize: " + json.dumps({"schedule": schedule})
+
+def _clean_summary(summary):
+    lines = summary.strip().split('\n')
+    if lines and lines[0].startswith('```'):
+        lines = lines[1:]  # Remove first line
+    if lines and lines[-1].strip() == '```':
+        lines = lines[:-1]  # Remove last line
+    return '\n'.join(lines).strip()
+
+def summarize(schedule):
+    """Summarizes a non-empty schedule. Returns (body, status)."""
+    try:
+        summary = _clean_summary(generate("summarize", build_summarizer_prompt(schedule)))
+        return {"summary": summary}, 200
+    except Exception as e:
+        logging.error(f"Error summarizing calendar: {str(e)}")
+        return {"message": "Failed to generate summary"}, 500
+
+def summarize_stream(schedule):
+    """Streaming summarize(): yields ("token", text) as the summary is written, then ("done", body)
+    or ("error", body)"""
+    fences = FenceStripper()
+    received = []
+    try:
+        for text in generate_stream("summarize", build_summarizer_prompt(schedule)):
+            received.append(text)
+            visible = fences.feed(text)
+            if visible:
+                yield "token", visible
+        tail = fences.finish()
+        if tail.strip():
+            yield "token", tail
+    except Exception as e:
+        logging.error(f"Error streaming calendar summary: {str(e)}")
+        yield "error", {"message": "Failed to generate summary"}
+        return
+    yield "done", {"summary": _clean_summary("".join(received))}
@@ -0,0 +1,167 @@
+"""Hot/cold split of the schedule table. Events that ended before a horizon are moved, chunk by chunk, into
+schedule_archive, so windowed reads and writes only touch recent rows. Reads stay transparent: windowed reads add
+archived rows when the window reaches back to the newest archived end date, unbounded ones (listing, pages, search,
+changes, export) always read both tables, and writing to an archived event moves it back first. Moves aren't
+writes, so the change log and the search index skip them (see migrations.py).
+Used by db_action.py's archive subcommand and by the optional periodic task."""
+from datetime import date, timedelta
+from sqlalchemy import delete, func, insert, literal, select, text
+from operator import itemgetter
+from threading import Thread
+from config import app, db
+from models import Schedule, ScheduleArchive, SCHEDULE_JSON_COLUMNS, ARCHIVE_JSON_COLUMNS, schedule_row_json
+from dateUtils import DATE_FORMAT
+import heapq
+import logging
+import time
+
+CHUNK_SIZE = 5000
+EVENT_COLUMNS = [column.name for column in Schedule.__table__.columns]
+
+def horizon(days):
+    """The YYYY-MM-DD date days ago; events ending before it are archived"""
+    return (date.today() - timedelta(days=days)).strftime(DATE_FORMAT)
+
+def archive_before(cutoff, chunk_size=CHUNK_SIZE):
+    """Moves every event whose endDate is before cutoff into the archive, one transaction per chunk so the
+    write lock is only held briefly. Must run inside an app context. Returns stats."""
+    started = time.perf_counter()
+    hot, cold = Schedule.__table__, ScheduleArchive.__table__
+    archived = 0
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(select(hot.c.id).where(hot.c.endDate < cutoff).order_by(hot.c.id).limit(chunk_size)).scalars().all()
+            if not ids:
+                break
+            conn.execute(insert(cold).from_select(
+                EVENT_COLUMNS + ['archivedAt'],
+                select(*(hot.c[name] for name in EVENT_COLUMNS), literal(time.time())).where(hot.c.id.in_(ids)),
+            ))
+            # Already in the archive, so the change log and the search index leave these rows alone
+            conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+        archived += len(ids)
+    if archived:
+        # Both tables changed size a lot; without fresh statistics SQLite may scan the archive instead of using its indexes
+        with db.engine.begin() as conn:
+            conn.execute(text("ANALYZE schedule"))
+            conn.execute(text("ANALYZE schedule_archive"))
+    seconds = time.perf_counter() - started
+    logging.info(f"Archived {archived} events ending before {cutoff} in {seconds:.2f} s")
+    return {"archived": archived, "cutoff": cutoff, "seconds": round(seconds, 3)}
+
+def restore(ids):
+    """Moves archived events among ids back into schedule, in the caller's transaction, so they can be
+    updated or deleted like any other event. Returns how many were restored."""
+    ids = [schedule_id for schedule_id in ids if isinstance(schedule_id, int)]
+    if not ids:
+        return 0
+    cold = ScheduleArchive.__table__
+    restored = db.session.execute(insert(Schedule.__table__).from_select(
+        EVENT_COLUMNS, select(*(cold.c[name] for name in EVENT_COLUMNS)).where(cold.c.id.in_(ids)),
+    )).rowcount
+    if restored:
+        db.session.execute(delete(cold).where(cold.c.id.in_(ids)))
+        logging.info(f"Restored {restored} archived events")
+    return restored
+
+def archived_until():
+    """The latest end date in the archive, or None when it is empty; one lookup on ix_schedule_archive_end_start"""
+    return db.session.query(func.max(ScheduleArchive.endDate)).scalar()
+
+def rows_between(start, end, *columns):
+    """Archived rows overlapping start..end with the given Schedule column names, ordered by id.
+    Empty without touching the archive when the window starts after everything in it."""
+    until = archived_until()
+    if until is None or start > until:
+        return []
+    selected = [getattr(ScheduleArchive, name) for name in columns]
+    return db.session.query(*selected) \
+        .filter(ScheduleArchive.startDate <= end, ScheduleArchive.endDate >= start) \
+        .order_by(ScheduleArchive.id).all()
+
+def json_rows_between(start, end):
+    return rows_between(start, end, *(column.key for column in SCHEDULE_JSON_COLUMNS))
+
+def json_rows(start=None, end=None):
+    """Query of every archived row (or those overlapping start..end) as SCHEDULE_JSON_COLUMNS tuples, ordered by id,
+    for merging into reads of schedule"""
+    query = db.session.query(*ARCHIVE_JSON_COLUMNS)
+    if start and end:
+        query = query.filter(ScheduleArchive.startDate <= end, ScheduleArchive.endDate >= start)
+    return query.order_by(ScheduleArchive.id)
+
+# Compaction and the before/after report
+
+def database_size(conn):
+    page_size = conn.execute(text("PRAGMA page_size")).scalar()
+    pages = conn.execute(text("PRAGMA page_count")).scalar()
+    free = conn.execute(text("PRAGMA freelist_count")).scalar()
+    return {"bytes": pages * page_size, "freeBytes": free * page_size}
+
+def compact(incremental=False):
+    """Returns free pages to the file system. VACUUM rewrites the whole file and blocks writers while it runs;
+    incremental mode switches the database to auto_vacuum=INCREMENTAL once (that switch is itself a VACUUM)
+    and afterwards only releases the free pages. Returns the file size before and after."""
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        before = database_size(conn)
+        started = time.perf_counter()
+        if not incremental:
+            conn.execute(text("VACUUM"))
+        elif conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+        else:
+            conn.execute(text("PRAGMA incremental_vacuum"))
+        after = database_size(conn)
+    return {"mode": "incremental" if incremental else "full", "seconds": round(time.perf_counter() - started, 3),
+            "before": before, "after": after}
+
+def read_latency(runs=3):
+    """Best-of-runs milliseconds for the unbounded listing GET /schedule serializes, which reads both tables and
+    so stays about the same, and for a 30-day window ending today, which only reads recent rows"""
+    today = date.today()
+    window = ((today - timedelta(days=30)).strftime(DATE_FORMAT), today.strftime(DATE_FORMAT))
+
+    def listing():
+        rows = heapq.merge(db.session.query(*SCHEDULE_JSON_COLUMNS).order_by(Schedule.id), json_rows(), key=itemgetter(0))
+        return [schedule_row_json(row) for row in rows]
+
+    def recent():
+        return [schedule_row_json(row) for row in db.session.query(*SCHEDULE_JSON_COLUMNS)
+                .filter(Schedule.startDate <= window[1], Schedule.endDate >= window[0])]
+
+    timings = {}
+    for name, read in (("listAllMs", listing), ("recentMonthMs", recent)):
+        best = None
+        for _ in range(runs):
+            started = time.perf_counter()
+            read()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = round(best * 1000, 2)
+    timings["liveRows"] = db.session.query(func.count(Schedule.id)).scalar()
+    db.session.rollback()
+    return timings
+
+def start_periodic_archive(interval, days, chunk_size=CHUNK_SIZE):
+    """Archives events older than days every interval seconds on a daemon thread; interval <= 0 disables it.
+    Free pages are only released when the database already uses incremental auto-vacuum; otherwise SQLite
+    reuses them for new rows, and a full VACUUM is left to db_action.py archive --vacuum."""
+    if interval <= 0:
+        return None
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    archive_before(horizon(days), chunk_size)
+                    with db.engine.begin() as conn:
+                        if conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2:
+                            conn.execute(text("PRAGMA incremental_vacuum"))
+            except Exception as e:
+                logging.warning(f"Periodic archive failed: {str(e)}")
+
+    thread = Thread(target=run, name="eventide-archive", daemon=True)
+    thread.start()
+    return thread
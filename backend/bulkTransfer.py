@@ -0,0 +1,279 @@
+"""Streaming bulk import and export of schedules as NDJSON or iCalendar (.ics), behind db_action.py's
+import and export subcommands. Files are read and written one event at a time and rows are inserted in
+chunks, one transaction per chunk, so memory stays flat however large the file is."""
+from config import db
+from models import Schedule, ScheduleArchive, SCHEDULE_JSON_COLUMNS, schedule_row_json, event_info_columns, time_to_minutes, minutes_to_time, URGENCY_LEVELS
+from dateUtils import parse_date, DATE_FORMAT
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from sqlalchemy import select
+import archive
+import heapq
+import jsonResponses
+import json
+import logging
+import time
+
+CHUNK_SIZE = 1000
+FORMATS = ("ndjson", "ics")
+REQUIRED_FIELDS = ("title", "startDate", "endDate", "start", "end")
+EVENT_TYPES = ("event", "reminder")
+MAX_REPORTED_ERRORS = 20
+
+def detect_format(path):
+    """The format implied by a file name, or None"""
+    lowered = path.lower()
+    if lowered.endswith((".ics", ".ical", ".ifb")):
+        return "ics"
+    if lowered.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return None
+
+# Reading. Each reader yields (line number, eventInfo dict or an error message) so problems can be reported by line.
+
+def read_ndjson(lines):
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, f"invalid JSON: {e.msg}"
+            continue
+        yield line_no, item if isinstance(item, dict) else "expected a JSON object"
+
+def _unfold(lines):
+    """Joins folded iCalendar content lines (continuations start with a space or tab)"""
+    current, start = None, 0
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, line_no
+    if current is not None:
+        yield start, current
+
+def _ics_unescape(value):
+    out, chars = [], iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            out.append("\n" if escaped in ("n", "N") else escaped)
+        else:
+            out.append(char)
+    return "".join(out)
+
+def _ics_datetime(value, params):
+    """(date, minutes past midnight or None for all-day) of a DTSTART/DTEND value"""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d").date(), None
+    moment = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        # Eventide stores wall-clock times, so UTC times are shown in the importing machine's zone
+        moment = moment.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    return moment.date(), moment.hour * 60 + moment.minute
+
+def _ics_event(properties):
+    start_date, start = _ics_datetime(*properties["DTSTART"])
+    end_date, end = _ics_datetime(*properties["DTEND"]) if "DTEND" in properties else (start_date, start)
+    if start is None:
+        # All-day: DTEND is exclusive, and the event fills its days
+        end_date = max(start_date, end_date - timedelta(days=1)) if "DTEND" in properties else start_date
+        start, end = 0, 23 * 60 + 59
+    info = {
+        "title": _ics_unescape(properties.get("SUMMARY", ("", {}))[0]),
+        "startDate": start_date.strftime(DATE_FORMAT),
+        "endDate": end_date.strftime(DATE_FORMAT),
+        "start": minutes_to_time(start),
+        "end": minutes_to_time(end),
+        "description": _ics_unescape(properties.get("DESCRIPTION", ("", {}))[0]),
+        "locked": properties.get("X-EVENTIDE-LOCKED", ("FALSE", {}))[0].upper() == "TRUE",
+        "type": properties.get("X-EVENTIDE-TYPE", ("event", {}))[0].lower(),
+        "urgency": properties.get("X-EVENTIDE-URGENCY", ("trivial", {}))[0].lower(),
+    }
+    if properties.get("X-EVENTIDE-ID", ("", {}))[0].isdigit():
+        info["id"] = int(properties["X-EVENTIDE-ID"][0])
+    return info
+
+def read_ics(lines):
+    properties, start_line, nested = None, 0, 0
+    for line_no, line in _unfold(lines):
+        name, _, value = line.partition(":")
+        name, *raw_params = name.split(";")
+        name, component = name.upper(), value.strip().upper()
+        if name == "BEGIN" and component == "VEVENT":
+            properties, start_line, nested = {}, line_no, 0
+        elif properties is None:
+            continue
+        elif name == "END" and component == "VEVENT":
+            try:
+                yield start_line, _ics_event(properties) if "DTSTART" in properties else "VEVENT without DTSTART"
+            except ValueError as e:
+                yield start_line, f"invalid date or time: {e}"
+            properties = None
+        elif name in ("BEGIN", "END"):
+            # Nested components such as VALARM keep their properties out of the event
+            nested += 1 if name == "BEGIN" else -1
+        elif nested == 0 and name not in properties:
+            params = dict(param.split("=", 1) for param in raw_params if "=" in param)
+            properties[name] = (value, {key.upper(): param.upper() for key, param in params.items()})
+
+READERS = {"ndjson": read_ndjson, "ics": read_ics}
+
+# Validation
+
+def validate_chunk(records, keep_ids=False):
+    """Checks a chunk of (line number, eventInfo) records at once. Dates and times repeat heavily across a
+    calendar, so each distinct value is parsed once per chunk rather than once per event.
+    Returns (rows ready for Schedule's table, [(line number, message)])."""
+    items = [(line_no, item) for line_no, item in records if isinstance(item, dict)]
+    errors = [(line_no, item) for line_no, item in records if not isinstance(item, dict)]
+    dates = {item[key] for _, item in items for key in ("startDate", "endDate") if isinstance(item.get(key), str)}
+    valid_dates = {value for value in dates if parse_date(value)}
+    times = {item[key] for _, item in items for key in ("start", "end") if isinstance(item.get(key), str)}
+    valid_times = {value for value in times if time_to_minutes(value) is not None}
+    is_date = lambda value: isinstance(value, str) and value in valid_dates
+    is_time = lambda value: isinstance(value, str) and value in valid_times
+    rows = []
+    for line_no, item in items:
+        missing = [key for key in REQUIRED_FIELDS if key not in item]
+        if missing:
+            problem = f"missing required fields: {', '.join(missing)}"
+        elif not (is_date(item["startDate"]) and is_date(item["endDate"])):
+            problem = "startDate and endDate must be YYYY-MM-DD dates"
+        elif item["endDate"] < item["startDate"]:
+            problem = "endDate is before startDate"
+        elif not (is_time(item["start"]) and is_time(item["end"])):
+            problem = "start and end must be times like 09:30 AM"
+        elif item.get("urgency", "trivial") not in URGENCY_LEVELS:
+            problem = f"urgency must be one of {', '.join(URGENCY_LEVELS)}"
+        elif item.get("type", "event") not in EVENT_TYPES:
+            problem = "type must be event or reminder"
+        elif keep_ids and not isinstance(item.get("id"), int):
+            problem = "id must be an integer when keeping ids"
+        else:
+            info = {key: value for key, value in item.items() if key != "id"}
+            row = event_info_columns(info)
+            if keep_ids:
+                row["id"] = item["id"]
+            rows.append(row)
+            continue
+        errors.append((line_no, problem))
+    return rows, errors
+
+# Import and export
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_events(lines, fmt, chunk_size=CHUNK_SIZE, keep_ids=False):
+    """Validates and inserts every event read from lines. Each chunk is one executemany in its own
+    transaction, so a failing chunk leaves earlier ones committed. Must run inside an app context.
+    Returns stats including the first MAX_REPORTED_ERRORS problems."""
+    started = time.perf_counter()
+    stats = {"read": 0, "inserted": 0, "rejected": 0, "errors": []}
+    table = Schedule.__table__
+    for chunk in _chunks(READERS[fmt](lines), chunk_size):
+        rows, errors = validate_chunk(chunk, keep_ids)
+        stats["read"] += len(chunk)
+        if rows:
+            try:
+                with db.engine.begin() as conn:
+                    if keep_ids:
+                        # Like an id already in schedule, one held by an archived event fails the chunk
+                        taken = conn.execute(select(ScheduleArchive.id).where(ScheduleArchive.id.in_([row["id"] for row in rows]))).scalars().all()
+                        if taken:
+                            raise ValueError(f"ids already used by archived events: {', '.join(map(str, taken[:5]))}")
+                    conn.execute(table.insert(), rows)
+                stats["inserted"] += len(rows)
+            except Exception as e:
+                logging.error(f"Chunk starting at line {chunk[0][0]} failed: {str(e)}")
+                errors.append((chunk[0][0], f"chunk of {len(rows)} rows not inserted: {str(e).splitlines()[0]}"))
+                stats["rejected"] += len(rows)
+        stats["rejected"] += len(chunk) - len(rows)
+        room = MAX_REPORTED_ERRORS - len(stats["errors"])
+        stats["errors"].extend(sorted(errors)[:max(room, 0)])
+        logging.debug(f"Imported {stats['inserted']} of {stats['read']} events read so far")
+    return _timed(stats, started, stats["inserted"])
+
+def _ics_escape(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def _ics_fold(line):
+    """Splits a content line into 75-octet pieces, never inside a UTF-8 character"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    pieces, limit = [], 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode("utf-8"))
+        encoded, limit = encoded[cut:], 74
+    return "\r\n ".join(pieces) + "\r\n"
+
+def _ics_moment(day, value):
+    minutes = time_to_minutes(value)
+    if minutes is None:
+        return f";VALUE=DATE:{day.replace('-', '')}"
+    return f":{day.replace('-', '')}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+def ics_event(event, stamp):
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:eventide-{event['id']}@eventide",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART{_ics_moment(event['startDate'], event['start'])}",
+        f"DTEND{_ics_moment(event['endDate'], event['end'])}",
+        f"SUMMARY:{_ics_escape(event['title'] or '')}",
+    ]
+    if event["description"]:
+        lines.append(f"DESCRIPTION:{_ics_escape(event['description'])}")
+    lines += [
+        f"X-EVENTIDE-ID:{event['id']}",
+        f"X-EVENTIDE-TYPE:{event['type']}",
+        f"X-EVENTIDE-LOCKED:{'TRUE' if event['locked'] else 'FALSE'}",
+        f"X-EVENTIDE-URGENCY:{event['urgency']}",
+        "END:VEVENT",
+    ]
+    return "".join(_ics_fold(line) for line in lines)
+
+def export_events(out, fmt, start=None, end=None, chunk_size=CHUNK_SIZE):
+    """Writes every event (or those overlapping start..end) to the binary file out, streaming rows from the
+    database chunk_size at a time. Must run inside an app context. Returns stats."""
+    started = time.perf_counter()
+    query = db.session.query(*SCHEDULE_JSON_COLUMNS)
+    if start and end:
+        query = query.filter(Schedule.startDate <= end, Schedule.endDate >= start)
+    # Archived events belong in a backup as much as live ones
+    rows = heapq.merge(query.order_by(Schedule.id).yield_per(chunk_size),
+                       archive.json_rows(start, end).yield_per(chunk_size), key=itemgetter(0))
+    written = 0
+    if fmt == "ics":
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        out.write(b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Eventide//Schedule Export//EN\r\n")
+    for row in rows:
+        event = schedule_row_json(row)
+        out.write(jsonResponses.dumps(event) if fmt == "ndjson" else ics_event(event, stamp).encode("utf-8"))
+        written += 1
+    if fmt == "ics":
+        out.write(b"END:VCALENDAR\r\n")
+    return _timed({"written": written}, started, written)
+
+def _timed(stats, started, rows):
+    seconds = time.perf_counter() - started
+    stats["seconds"] = round(seconds, 3)
+    stats["rowsPerSecond"] = round(rows / seconds, 1) if seconds else None
+    return stats
@@ -0,0 +1,123 @@
+"""Chunked optimization for week-long and multi-day schedules. The schedule is split by day (or into groups
+of overlapping events within a day), the chunks go to the model concurrently on a bounded pool, and the
+replies are merged. A chunk that keeps failing, or whose changes collide with events outside it, keeps its
+original events instead of failing the whole request."""
+from concurrent.futures import ThreadPoolExecutor
+from config import app
+from models import time_to_minutes
+from dateUtils import parse_date
+from intervalIndex import event_interval
+from localOptimizer import BUFFER_MINUTES
+import aiService
+import optimizerCache
+import logging
+
+PARTITIONS = ("day", "component")
+
+_executor = ThreadPoolExecutor(max_workers=app.config["AI_CHUNK_CONCURRENCY"], thread_name_prefix="eventide-chunk")
+
+def _is_fixed(event, allowed):
+    """Events the model only sees as context: locked ones (unless it may unlock them) and multi-day ones,
+    which belong to no single chunk"""
+    return (event.get('locked', False) and 'locked' not in allowed) or event.get('startDate') != event.get('endDate')
+
+def _interval(event):
+    """The minute-of-epoch span an event books, one continuous interval from its start to its end as
+    intervalIndex.event_interval defines it; None when its dates don't parse"""
+    if not (parse_date(event.get('startDate')) and parse_date(event.get('endDate'))):
+        return None
+    return event_interval(event.get('startDate'), event.get('endDate'),
+                          time_to_minutes(event.get('start')), time_to_minutes(event.get('end')))
+
+def _components(events):
+    """Splits one day's events into groups whose intervals overlap or sit within BUFFER_MINUTES of each other"""
+    groups, group_end = [], None
+    for event in sorted(events, key=lambda event: _interval(event) or (0, 0)):
+        start, end = _interval(event) or (0, 0)
+        if groups and start < group_end + BUFFER_MINUTES:
+            groups[-1].append(event)
+            group_end = max(group_end, end)
+        else:
+            groups.append([event])
+            group_end = end
+    return groups
+
+def partition(schedule, allowed, by="day"):
+    """Returns (chunks, fixed): lists of events the model may change, and events passed through untouched"""
+    days, fixed = {}, []
+    for event in schedule:
+        if _is_fixed(event, allowed):
+            fixed.append(event)
+        else:
+            days.setdefault(event.get('startDate'), []).append(event)
+    if by == "component":
+        return [group for events in days.values() for group in _components(events)], fixed
+    return list(days.values()), fixed
+
+def _context(chunk, fixed):
+    """Fixed events covering the chunk's day, sent along so the model schedules around them"""
+    day = str(chunk[0].get('startDate'))
+    return [event for event in fixed if str(event.get('startDate')) <= day <= str(event.get('endDate'))]
+
+def _optimize_chunk(chunk, context, allowed):
+    """Returns the chunk's events as the model left them, or None once every attempt has failed"""
+    payload = chunk + context
+    key = optimizerCache.cache_key(payload, allowed)
+    with app.app_context():
+        cached = optimizerCache.get(key)
+        body = cached if cached is not None and aiService.is_cacheable(cached) else None
+        attempts = 0
+        while body is None and attempts <= app.config["AI_CHUNK_RETRIES"]:
+            attempts += 1
+            reply, status = aiService.optimize(payload, allowed, key)
+            if status < 400 and aiService.is_cacheable(reply):
+                body = reply
+            else:
+                logging.warning(f"Optimizer chunk of {len(chunk)} events failed (attempt {attempts}): {reply.get('message')}")
+    if body is None:
+        return None
+    replies = {str(event.get('id')): event for event in body.get("schedule", [])}
+    # Events the model dropped are kept as they were; it may not remove items
+    return [replies.get(str(event.get('id')), event) for event in chunk]
+
+def _overlaps(interval, others):
+    return any(other[0] < interval[1] and interval[0] < other[1] for other in others)
+
+def optimize(schedule, allowed, cache_key, by="day"):
+    """Optimizes a schedule chunk by chunk. Same contract as aiService.optimize: returns (body, status),
+    and caches the merged reply under cache_key when every chunk was accepted."""
+    chunks, fixed = partition(schedule, allowed, by)
+    futures = [_executor.submit(_optimize_chunk, chunk, _context(chunk, fixed), allowed) for chunk in chunks]
+    originals = {id(event): _interval(event) for event in schedule}
+    placed = []  # new intervals of accepted chunks
+    changed = {}
+    failed = conflicts = 0
+    for chunk, future in zip(chunks, futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            logging.error(f"Optimizer chunk raised: {str(e)}")
+            result = None
+        if result is None:
+            failed += 1
+            continue
+        moved = [(before, after) for before, after in zip(chunk, result) if after != before]
+        # Chunks are optimized without seeing each other, so a move that lands on an event outside the chunk,
+        # or on another chunk's accepted move, is rejected and the chunk keeps its original events.
+        # Changes that leave an event's times and dates alone (a new title, say) can't collide with anything.
+        members = {id(event) for event in chunk}
+        outside = [interval for key, interval in originals.items() if key not in members and interval]
+        new_intervals = [_interval(after) for before, after in moved if _interval(after) != originals[id(before)]]
+        if any(interval and (_overlaps(interval, outside) or _overlaps(interval, placed)) for interval in new_intervals):
+            conflicts += 1
+            continue
+        placed.extend(interval for interval in new_intervals if interval)
+        changed.update((id(before), after) for before, after in moved)
+    summary = {"total": len(chunks), "failed": failed, "conflicts": conflicts}
+    if failed == len(chunks) and chunks:
+        return {"message": "Failed to optimize schedule", "chunks": summary}, 500
+    body = {"schedule": [changed.get(id(event), event) for event in schedule]} if changed else {"message": "Perfect Schedule"}
+    # A failed or rejected chunk may well succeed on the next request, so partial results aren't cached
+    if not failed and not conflicts:
+        optimizerCache.put(cache_key, body)
+    return {**body, "chunks": summary}, 200
@@ -0,0 +1,169 @@
+"""Compact table encoding of schedules for optimizer prompts. JSON repeats every key for every event; here a
+header names the columns once, times are 24-hour, and urgency, type and locked are single characters.
+The model answers with only the rows it changed, and decode() merges those back into the full events."""
+from models import time_to_minutes, minutes_to_time
+from dateUtils import parse_date, DATE_FORMAT
+from datetime import timedelta
+
+URGENCY_CODES = {'trivial': 't', 'ongoing': 'o', 'attention-needed': 'a', 'important': 'i', 'critical': 'c'}
+URGENCY_BY_CODE = {code: level for level, code in URGENCY_CODES.items()}
+
+ALL_COLUMNS = ('id', 'date', 'days', 'start', 'end', 'lock', 'kind', 'urg', 'title', 'desc')
+
+# Column -> the allowed_modifications entry that lets the model change it
+EDITABLE = {
+    'date': 'dates', 'days': 'dates',
+    'start': 'times', 'end': 'times',
+    'lock': 'locked',
+    'urg': 'urgency',
+    'title': 'name',
+    'desc': 'description',
+}
+
+def columns(allowed):
+    """Columns sent for these allowed modifications. Descriptions are only context for rewriting
+    descriptions or re-rating urgency, so they're left out otherwise."""
+    if 'description' in allowed or 'urgency' in allowed:
+        return list(ALL_COLUMNS)
+    return list(ALL_COLUMNS[:-1])
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('|', '\\|').replace('\n', '\\n')
+
+def _split(line):
+    """Splits a row on unescaped "|" and unescapes each cell"""
+    cells, cell, chars = [], [], iter(line)
+    for char in chars:
+        if char == '\\':
+            escaped = next(chars, '')
+            cell.append('\n' if escaped == 'n' else escaped)
+        elif char == '|':
+            cells.append(''.join(cell))
+            cell = []
+        else:
+            cell.append(char)
+    cells.append(''.join(cell))
+    return [cell.strip() for cell in cells]
+
+def _format_time(value):
+    minutes = time_to_minutes(value)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}" if minutes is not None else (value or '')
+
+def _span_days(event):
+    start, end = parse_date(event.get('startDate')), parse_date(event.get('endDate'))
+    return (end - start).days if start and end else 0
+
+def _cell(event, column):
+    if column == 'id':
+        return event.get('id')
+    if column == 'date':
+        return event.get('startDate') or ''
+    if column == 'days':
+        return _span_days(event) or ''
+    if column in ('start', 'end'):
+        return _format_time(event.get(column))
+    if column == 'lock':
+        return '1' if event.get('locked') else ''
+    if column == 'kind':
+        return 'r' if event.get('type') == 'reminder' else ''
+    if column == 'urg':
+        return URGENCY_CODES.get(event.get('urgency', 'trivial'), 't')
+    if column == 'title':
+        return event.get('title') or ''
+    return event.get('description') or ''
+
+def encode(schedule, allowed):
+    names = columns(allowed)
+    lines = ['|'.join(names)]
+    lines.extend('|'.join(_escape(_cell(event, column)) for column in names) for event in schedule)
+    return '\n'.join(lines)
+
+def _apply(event, column, value):
+    """Writes one decoded cell into event; raises ValueError for a value the column can't hold"""
+    if column == 'date':
+        if not parse_date(value):
+            raise ValueError(f"invalid date {value!r}")
+        days = _span_days(event)
+        event['startDate'] = value
+        event['endDate'] = (parse_date(value) + timedelta(days=days)).strftime(DATE_FORMAT)
+    elif column == 'days':
+        days = int(value or 0)
+        if days < 0 or not parse_date(event.get('startDate')):
+            raise ValueError(f"invalid day span {value!r}")
+        event['endDate'] = (parse_date(event['startDate']) + timedelta(days=days)).strftime(DATE_FORMAT)
+    elif column in ('start', 'end'):
+        minutes = time_to_minutes(value)
+        if minutes is None:
+            raise ValueError(f"invalid time {value!r}")
+        event[column] = minutes_to_time(minutes)
+    elif column == 'lock':
+        event['locked'] = value == '1'
+    elif column == 'urg':
+        if value not in URGENCY_BY_CODE:
+            raise ValueError(f"invalid urgency code {value!r}; expected one of {', '.join(URGENCY_BY_CODE)}")
+        event['urgency'] = URGENCY_BY_CODE[value]
+    elif column == 'title':
+        event['title'] = value
+    elif column == 'desc':
+        event['description'] = value
+
+class Decoder:
+    """Decodes the model's reply one line at a time, so a streamed reply yields each changed event
+    as soon as its row is complete. Only columns the user allowed are applied."""
+
+    def __init__(self, schedule, allowed):
+        self.schedule = schedule
+        self.allowed = allowed
+        self.originals = {str(event.get('id')): event for event in schedule}
+        self.header = None
+        self.editable = []
+        self.changed = {}
+
+    def feed_line(self, line):
+        """Returns the updated event when line changes one, otherwise None; raises ValueError on a malformed line"""
+        line = line.strip()
+        if not line or line.startswith('```'):
+            return None
+        if self.header is None:
+            if not line.replace(' ', '').startswith('id|'):
+                return None
+            self.header = _split(line)
+            unknown = set(self.header) - set(ALL_COLUMNS)
+            if unknown:
+                raise ValueError(f"unknown columns {', '.join(sorted(unknown))}")
+            # Dates are applied before spans, so a moved multi-day event keeps its length unless days changed too
+            self.editable = sorted((i for i, column in enumerate(self.header) if EDITABLE.get(column) in self.allowed),
+                                   key=lambda i: self.header[i] != 'date')
+            return None
+        cells = _split(line)
+        if len(cells) != len(self.header):
+            raise ValueError(f"row has {len(cells)} columns, expected {len(self.header)}: {line[:80]}")
+        original = self.originals.get(cells[self.header.index('id')])
+        if original is None:
+            return None  # the model may not add events
+        key = str(original.get('id'))
+        event = dict(self.changed.get(key, original))
+        for i in self.editable:
+            # Unchanged cells are skipped so e.g. "9:00 AM" isn't rewritten as "09:00 AM"
+            if cells[i] != str(_cell(original, self.header[i])):
+                _apply(event, self.header[i], cells[i])
+        if event == original:
+            return None
+        self.changed[key] = event
+        return event
+
+    def result(self):
+        """The optimizer body ({"schedule": [...]} or {"message": "Perfect Schedule"}) for everything fed so far"""
+        if self.header is None:
+            raise ValueError("reply has no header row")
+        if not self.changed:
+            return {"message": "Perfect Schedule"}
+        return {"schedule": [self.changed.get(str(event.get('id')), event) for event in self.schedule]}
+
+def decode(reply, schedule, allowed):
+    """Merges the model's changed rows into schedule. Returns the optimizer body;
+    raises ValueError when the reply isn't a table in the expected format."""
+    decoder = Decoder(schedule, allowed)
+    for line in reply.splitlines():
+        decoder.feed_line(line)
+    return decoder.result()
@@ -1,16 +1,67 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+import sqliteProfile
+import os
 
 # Initializes Flask application
 app = Flask(__name__)
 
 # Enable cross-origin requests
-CORS(app)
+CORS(app, expose_headers=["ETag", "X-Optimizer-Cache", "X-Optimizer-Mode"])
 
 # Configure SQLite database
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///eventide.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("EVENTIDE_DATABASE_URI", "sqlite:///eventide.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# EVENTIDE_DB_PROFILE=production turns on WAL and the tuning in sqliteProfile.py
+app.config["DB_PROFILE"] = os.getenv("EVENTIDE_DB_PROFILE", "default")
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqliteProfile.engine_options(app.config["DB_PROFILE"])
+app.config["DB_OPTIMIZE_INTERVAL"] = int(os.getenv("EVENTIDE_DB_OPTIMIZE_INTERVAL", 3600))
+
+# Optimizer response cache: entries expire after the TTL (seconds) and the least recently used are evicted past the limit
+app.config["OPTIMIZER_CACHE_TTL"] = int(os.getenv("EVENTIDE_OPTIMIZER_CACHE_TTL", 7 * 24 * 3600))
+app.config["OPTIMIZER_CACHE_MAX_ENTRIES"] = int(os.getenv("EVENTIDE_OPTIMIZER_CACHE_MAX_ENTRIES", 500))
+
+# AI calls run on a bounded worker pool; EVENTIDE_AI_MODEL=stub swaps Gemini for an offline echo model
+app.config["AI_MODEL"] = os.getenv("EVENTIDE_AI_MODEL", "gemini-2.5-flash")
+# "compact" sends schedules as a table (see compactSchedule.py); "json" sends the original JSON layout
+app.config["AI_PROMPT_FORMAT"] = os.getenv("EVENTIDE_AI_PROMPT_FORMAT", "compact")
+app.config["AI_MAX_CONCURRENCY"] = int(os.getenv("EVENTIDE_AI_MAX_CONCURRENCY", 4))
+app.config["AI_MAX_QUEUED"] = int(os.getenv("EVENTIDE_AI_MAX_QUEUED", 32))
+app.config["AI_JOB_TTL"] = int(os.getenv("EVENTIDE_AI_JOB_TTL", 600))
+# mode=chunked optimizes each day (or group of overlapping events) as its own model call, on this many workers
+app.config["AI_CHUNK_CONCURRENCY"] = int(os.getenv("EVENTIDE_AI_CHUNK_CONCURRENCY", 4))
+app.config["AI_CHUNK_RETRIES"] = int(os.getenv("EVENTIDE_AI_CHUNK_RETRIES", 1))
+
+# Events that ended more than ARCHIVE_HORIZON_DAYS ago are moved to schedule_archive (see archive.py), by
+# db_action.py archive or, under python main.py, every ARCHIVE_INTERVAL seconds; 0 leaves archiving to the CLI
+app.config["ARCHIVE_HORIZON_DAYS"] = int(os.getenv("EVENTIDE_ARCHIVE_HORIZON_DAYS", 180))
+app.config["ARCHIVE_INTERVAL"] = int(os.getenv("EVENTIDE_ARCHIVE_INTERVAL", 0))
+
+# Seconds between keepalive comments on idle /schedule/stream connections
+app.config["STREAM_KEEPALIVE"] = int(os.getenv("EVENTIDE_STREAM_KEEPALIVE", 15))
+
+# Reminder scheduler (python main.py only): comma-separated delivery sinks out of log, sse and webhook, or empty to turn it off.
+# Events flagged reminder fire REMINDER_LEAD_MINUTES before they start; reminder items fire at their own time.
+app.config["REMINDER_SINKS"] = os.getenv("EVENTIDE_REMINDER_SINKS", "log,sse")
+app.config["REMINDER_WEBHOOK_URL"] = os.getenv("EVENTIDE_REMINDER_WEBHOOK_URL", "http://127.0.0.1:5055/reminders")
+app.config["REMINDER_LEAD_MINUTES"] = int(os.getenv("EVENTIDE_REMINDER_LEAD_MINUTES", 10))
+# Reminders that fell due at most this many seconds before startup are still delivered
+app.config["REMINDER_GRACE_SECONDS"] = int(os.getenv("EVENTIDE_REMINDER_GRACE_SECONDS", 300))
+
+# JSON responses of at least COMPRESSION_MIN_SIZE bytes are gzip/brotli compressed when the client accepts it
+app.config["RESPONSE_COMPRESSION"] = os.getenv("EVENTIDE_RESPONSE_COMPRESSION", "1") == "1"
+app.config["COMPRESSION_MIN_SIZE"] = int(os.getenv("EVENTIDE_COMPRESSION_MIN_SIZE", 1024))
+app.config["COMPRESSION_LEVEL"] = int(os.getenv("EVENTIDE_COMPRESSION_LEVEL", 5))
+
+# Fraction of large read responses whose (truncated) payload is written to the debug log
+app.config["DEBUG_PAYLOAD_SAMPLE_RATE"] = float(os.getenv("EVENTIDE_DEBUG_PAYLOAD_SAMPLE_RATE", 0.01))
+
+# Requests and SQL statements slower than these many seconds are logged as warnings; 0 turns either log off
+app.config["SLOW_REQUEST_THRESHOLD"] = float(os.getenv("EVENTIDE_SLOW_REQUEST_SECONDS", 1.0))
+app.config["SLOW_QUERY_THRESHOLD"] = float(os.getenv("EVENTIDE_SLOW_QUERY_SECONDS", 0.25))
 
 # Create database instance
-db = SQLAlchemy(app)
\ No newline at end of file
+db = SQLAlchemy(app)
+with app.app_context():
+    sqliteProfile.install(db.engine, app.config["DB_PROFILE"])
\ No newline at end of file
@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+
+def parse_date(value):
+    """Parses a YYYY-MM-DD string into a date, or returns None if it isn't one"""
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+def iter_dates(start, end):
+    """Yields every YYYY-MM-DD string from start to end inclusive (both YYYY-MM-DD strings)"""
+    current, last = parse_date(start), parse_date(end)
+    while current <= last:
+        yield current.strftime(DATE_FORMAT)
+        current += timedelta(days=1)
@@ -1,26 +1,31 @@
 from config import app, db
-from models import Schedule
+from models import Schedule, ScheduleArchive, event_info_columns
+from migrations import init_db
 from datetime import datetime
 import bleach
 from sqlalchemy.exc import DatabaseError
-import google.generativeai as genai
-from dotenv import load_dotenv
-import os
-from aiPrompts import gemini_event_generator_prompt, gemini_schedule_generator_prompt
+import aiPrompts
+import aiService
+import bulkTransfer
+import archive
+import argparse
 import json
 import logging
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+import sys
 options = ['Clear','Delete','Create','Generate Event','Generate Schedule','Quit']
 prompt = ''
 confirmation = False
 
 logging.basicConfig(level=logging.DEBUG)
 
+with app.app_context():
+    init_db()
+
 def printDatabase():
     with app.app_context():
         try:
-            schedules = Schedule.query.all()
+            # Archived events are listed with the rest, in id order
+            schedules = sorted(Schedule.query.all() + ScheduleArchive.query.all(), key=lambda schedule: schedule.id)
             if not schedules:
                 print("No events or reminders found in the database.")
                 logging.info("No events or reminders found in the database")
@@ -65,7 +70,77 @@ def validateTime(time):
     except ValueError:
         logging.error("Invalid time format. Use HH:MM AM/PM for times.")
         return False
-    
+
+def runCommand(argv):
+    """Non-interactive subcommands; db_action.py with no arguments still opens the menu below"""
+    parser = argparse.ArgumentParser(prog="db_action.py", description="Eventide database tools. Run without arguments for the interactive menu.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    importer = subcommands.add_parser("import", help="bulk-load events from an NDJSON or .ics file")
+    importer.add_argument("path", help="file to read, or - for stdin")
+    importer.add_argument("--keep-ids", action="store_true", help="insert events under the ids in the file (for restoring a backup)")
+    exporter = subcommands.add_parser("export", help="write events to an NDJSON or .ics file")
+    exporter.add_argument("path", help="file to write, or - for stdout")
+    exporter.add_argument("--from", dest="start", help="only events overlapping this YYYY-MM-DD date onwards (needs --to)")
+    exporter.add_argument("--to", dest="end", help="only events overlapping up to this YYYY-MM-DD date (needs --from)")
+    archiver = subcommands.add_parser("archive", help="move past events into the archive table and compact the database")
+    cutoff = archiver.add_mutually_exclusive_group()
+    cutoff.add_argument("--days", type=int, default=app.config["ARCHIVE_HORIZON_DAYS"], help="archive events that ended more than this many days ago")
+    cutoff.add_argument("--before", help="archive events that ended before this YYYY-MM-DD date")
+    archiver.add_argument("--vacuum", choices=["full", "incremental", "none"], default="full", help="compaction after archiving")
+    archiver.add_argument("--chunk-size", type=int, default=archive.CHUNK_SIZE, help="rows moved per transaction")
+    for subcommand in (importer, exporter):
+        subcommand.add_argument("--format", choices=bulkTransfer.FORMATS, help="defaults to the file extension, then ndjson")
+        subcommand.add_argument("--chunk-size", type=int, default=bulkTransfer.CHUNK_SIZE, help="rows per transaction / fetch")
+    args = parser.parse_args(argv)
+    if args.command == "archive":
+        return runArchive(parser, args)
+    fmt = args.format or bulkTransfer.detect_format(args.path) or "ndjson"
+    if args.command == "export" and bool(args.start) != bool(args.end):
+        parser.error("--from and --to must be given together")
+    # Progress and results go to stderr so "-" can stream the data itself through stdout
+    with app.app_context():
+        if args.command == "import":
+            stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+            with stream:
+                stats = bulkTransfer.import_events(stream, fmt, args.chunk_size, args.keep_ids)
+            for line_no, problem in stats["errors"]:
+                print(f"line {line_no}: {problem}", file=sys.stderr)
+            print(f"Imported {stats['inserted']} of {stats['read']} events ({stats['rejected']} rejected) "
+                  f"in {stats['seconds']} s, {stats['rowsPerSecond']} rows/s", file=sys.stderr)
+            return 1 if stats["rejected"] else 0
+        out = sys.stdout.buffer if args.path == "-" else open(args.path, "wb")
+        with out:
+            stats = bulkTransfer.export_events(out, fmt, args.start, args.end, args.chunk_size)
+        print(f"Exported {stats['written']} events in {stats['seconds']} s, {stats['rowsPerSecond']} rows/s", file=sys.stderr)
+        return 0
+
+def formatBytes(size):
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+def runArchive(parser, args):
+    if args.before and not validateDate(args.before):
+        parser.error("--before must be a YYYY-MM-DD date")
+    cutoff = args.before or archive.horizon(args.days)
+    with app.app_context():
+        before = archive.read_latency()
+        stats = archive.archive_before(cutoff, args.chunk_size)
+        compaction = archive.compact(args.vacuum == "incremental") if args.vacuum != "none" else None
+        after = archive.read_latency()
+    print(f"Archived {stats['archived']} events that ended before {cutoff} in {stats['seconds']} s", file=sys.stderr)
+    if compaction:
+        print(f"{compaction['mode'].capitalize()} vacuum in {compaction['seconds']} s: "
+              f"{formatBytes(compaction['before']['bytes'])} ({formatBytes(compaction['before']['freeBytes'])} free) -> "
+              f"{formatBytes(compaction['after']['bytes'])} ({formatBytes(compaction['after']['freeBytes'])} free)", file=sys.stderr)
+    print(f"{'':<26}{'before':>12}{'after':>12}", file=sys.stderr)
+    print(f"{'live rows':<26}{before['liveRows']:>12}{after['liveRows']:>12}", file=sys.stderr)
+    print(f"{'list all events (ms)':<26}{before['listAllMs']:>12}{after['listAllMs']:>12}", file=sys.stderr)
+    print(f"{'last 30 days (ms)':<26}{before['recentMonthMs']:>12}{after['recentMonthMs']:>12}", file=sys.stderr)
+    return 0
+
+if len(sys.argv) > 1:
+    sys.exit(runCommand(sys.argv[1:]))
+
+
 while not(prompt in options and confirmation):
     prompt = input("""
 What would you like to do?
@@ -96,8 +171,8 @@ What would you like to do?
 if prompt == 'Clear':
     with app.app_context():
         try:
-            # Delete all records from the Schedule table
-            num_deleted = db.session.query(Schedule).delete()
+            # Delete all records from the Schedule table and its archive
+            num_deleted = db.session.query(Schedule).delete() + db.session.query(ScheduleArchive).delete()
             db.session.commit()
             logging.error(f"Successfully deleted {num_deleted} events from the database.")
         except DatabaseError as e:
@@ -117,7 +192,7 @@ if prompt == 'Delete':
                     break
                 except ValueError:
                     print("Error: Please enter a valid integer ID or 'cancel'.")
-            schedule = Schedule.query.get(schedule_id)
+            schedule = Schedule.query.get(schedule_id) or ScheduleArchive.query.get(schedule_id)
             if not schedule:
                 logging.error(f"Schedule with ID {schedule_id} not found")
                 print(f"Error: No event or reminder found with ID {schedule_id}")
@@ -193,8 +268,7 @@ if prompt == 'Create':
 if prompt == 'Generate Event':
     with app.app_context():
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(gemini_event_generator_prompt)
+            response = aiService.get_model().generate_content(aiPrompts.gemini_event_generator_prompt)
             output = response.text.strip()
             if output.startswith("```json"):
                 output = output[7:-3].strip()
@@ -247,8 +321,8 @@ if prompt == 'Generate Event':
 if prompt == 'Generate Schedule':
     with app.app_context():
         try:
-            # Delete all records from the Schedule table
-            num_deleted = db.session.query(Schedule).delete()
+            # Delete all records from the Schedule table and its archive
+            num_deleted = db.session.query(Schedule).delete() + db.session.query(ScheduleArchive).delete()
             db.session.commit()
             logging.error(f"Successfully deleted {num_deleted} events from the database.")
         except DatabaseError as e:
@@ -258,8 +332,7 @@ if prompt == 'Generate Schedule':
             db.session.rollback()
             logging.error(f"Error deleting events: {str(e)}")
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(gemini_schedule_generator_prompt)
+            response = aiService.get_model().generate_content(aiPrompts.gemini_schedule_generator_prompt)
             output = response.text.strip()
             if output.startswith("```json"):
                 output = output[7:-3].strip()
@@ -285,8 +358,8 @@ if prompt == 'Generate Schedule':
                     raise ValueError(f"Urgency ({item['urgency']}) for item {item.get('id','unknown')} is not valid")
                 if 'id' in item:
                     del item['id']
-                new_schedule = Schedule(event_info=item)
-                db.session.add(new_schedule)
+            # Every row goes in with one executemany once the whole schedule has validated
+            db.session.execute(Schedule.__table__.insert(), [event_info_columns(item) for item in schedule_data['schedule']])
             db.session.commit()
             logging.info(f"Successfully created schedule with {len(schedule_data['schedule'])} items")
             print(f"Successfully created schedule with {len(schedule_data['schedule'])} items")
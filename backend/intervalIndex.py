@@ -0,0 +1,116 @@
+"""Sorted interval index over schedule rows, in minutes since 0001-01-01 ("minute-of-epoch"),
+for overlap, conflict and free-slot queries without comparing every pair of events."""
+from bisect import bisect_left, bisect_right
+from heapq import heappush, heappop
+from config import db
+from models import Schedule, time_to_minutes, minutes_to_time
+from dateUtils import parse_date, iter_dates, DATE_FORMAT
+from datetime import date
+from itertools import count
+import recurrence
+import archive
+
+MINUTES_PER_DAY = 24 * 60
+
+def epoch_minutes(date_str, minutes):
+    return parse_date(date_str).toordinal() * MINUTES_PER_DAY + minutes
+
+def format_epoch_minutes(minutes):
+    """Splits a minute-of-epoch back into ("YYYY-MM-DD", "HH:MM AM/PM")"""
+    day, minute_of_day = divmod(minutes, MINUTES_PER_DAY)
+    return date.fromordinal(day).strftime(DATE_FORMAT), minutes_to_time(minute_of_day)
+
+def event_interval(start_date, end_date, start_minutes, end_minutes):
+    """(start, end) of an event in minute-of-epoch; missing times cover the whole day"""
+    start = epoch_minutes(start_date, start_minutes if start_minutes is not None else 0)
+    end = epoch_minutes(end_date, end_minutes if end_minutes is not None else MINUTES_PER_DAY)
+    return start, max(start, end)
+
+def day_spans(start_date, end_date, start_minutes, end_minutes, first=None, last=None):
+    """Splits the event_interval span into [(YYYY-MM-DD, start, end)] minutes past midnight per day covered, optionally
+    only the days from first to last. A multi-day event books its first day from the start time, the days between
+    in full and its last day up to the end time. Empty when either date doesn't parse."""
+    if not (parse_date(start_date) and parse_date(end_date)):
+        return []
+    span_start, span_end = event_interval(start_date, end_date, start_minutes, end_minutes)
+    spans = []
+    for day in iter_dates(max(start_date, first or start_date), min(end_date, last or end_date)):
+        midnight = epoch_minutes(day, 0)
+        spans.append((day, min(max(span_start - midnight, 0), MINUTES_PER_DAY), min(max(span_end - midnight, 0), MINUTES_PER_DAY)))
+    return spans
+
+class IntervalIndex:
+    def __init__(self, intervals):
+        """intervals: iterable of (start, end, id) with half-open [start, end) spans"""
+        # Ids are integers for stored events and strings for occurrences of recurring ones, so they never break ties
+        self.intervals = sorted(intervals, key=lambda interval: interval[:2])
+        self.starts = [interval[0] for interval in self.intervals]
+        # Running maximum of the ends lets a bisect skip every interval that finished before a query
+        self.max_ends = []
+        running = None
+        for _, end, _ in self.intervals:
+            running = end if running is None else max(running, end)
+            self.max_ends.append(running)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """Intervals overlapping [start, end)"""
+        upper = bisect_left(self.starts, end)
+        lower = bisect_right(self.max_ends, start, 0, upper)
+        return [interval for interval in self.intervals[lower:upper] if interval[1] > start]
+
+    def conflicts(self):
+        """Yields (first, second, overlap_start, overlap_end) for every overlapping pair, by sweeping once
+        over the sorted starts with a heap of the intervals still running"""
+        active = []
+        order = count()
+        for interval in self.intervals:
+            start, end, _ = interval
+            while active and active[0][0] <= start:
+                heappop(active)
+            for _, _, other in active:
+                yield other, interval, start, min(end, other[1])
+            heappush(active, (end, next(order), interval))
+
+    def free_slots(self, start, end, duration):
+        """Gaps of at least duration minutes inside [start, end) not covered by any interval"""
+        slots = []
+        cursor = start
+        for busy_start, busy_end, _ in self.overlapping(start, end):
+            if busy_start - cursor >= duration:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+        if end - cursor >= duration:
+            slots.append((cursor, end))
+        return slots
+
+def rows_between(start_date, end_date, locked_only=False):
+    """Indexed date-overlap query returning only the columns the interval index needs,
+    plus archived events and the occurrences of recurring events in the window"""
+    query = db.session.query(
+        Schedule.id, Schedule.startDate, Schedule.endDate, Schedule.startMinutes, Schedule.endMinutes,
+    ).filter(Schedule.startDate <= end_date, Schedule.endDate >= start_date)
+    if locked_only:
+        query = query.filter(Schedule.locked == True)
+    occurrences = [(row[0], row[1], row[2], row[4], row[5]) for row, _, _ in recurrence.occurrence_rows(start_date, end_date)
+                   if row[7] or not locked_only]
+    archived = [row[:5] for row in archive.rows_between(start_date, end_date, 'id', 'startDate', 'endDate', 'startMinutes', 'endMinutes', 'locked')
+                if row[5] or not locked_only]
+    return query.all() + archived + occurrences
+
+def build_index(start_date, end_date, locked_only=False):
+    return IntervalIndex(
+        event_interval(row[1], row[2], row[3], row[4]) + (row[0],)
+        for row in rows_between(start_date, end_date, locked_only)
+    )
+
+def locked_conflicts(event_info, exclude_id=None):
+    """Ids of locked events overlapping the event described by event_info"""
+    start_date, end_date = event_info.get('startDate'), event_info.get('endDate')
+    if not (parse_date(start_date) and parse_date(end_date)):
+        return []
+    start, end = event_interval(start_date, end_date, time_to_minutes(event_info.get('start')), time_to_minutes(event_info.get('end')))
+    index = build_index(start_date, end_date, locked_only=True)
+    return [schedule_id for _, _, schedule_id in index.overlapping(start, end) if schedule_id != exclude_id]
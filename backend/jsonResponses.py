@@ -0,0 +1,71 @@
+"""JSON responses for the large read endpoints: payloads are encoded straight to bytes (with orjson when
+it's installed), compressed for clients that accept gzip or brotli, and only logged when sampled."""
+from flask import request
+from config import app
+import gzip
+import json
+import logging
+import random
+import reprlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bounded repr, so a sampled debug line costs the same for ten events as for ten thousand
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 4
+_payload_repr.maxlist = 5
+_payload_repr.maxdict = 12
+_payload_repr.maxstring = 80
+
+def dumps(payload):
+    """Same document jsonify would produce (sorted keys, compact, trailing newline), as bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass  # e.g. integers past 64 bits stored in extras; the stdlib encoder handles those
+    return (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode()
+
+def json_response(payload, status=200):
+    return app.response_class(dumps(payload), status=status, mimetype="application/json")
+
+def log_payload(message, payload):
+    """Debug-logs message % payload for a sample of calls; the payload isn't formatted at all otherwise"""
+    if random.random() >= app.config["DEBUG_PAYLOAD_SAMPLE_RATE"] or not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    logging.debug(message, _payload_repr.repr(payload))
+
+def _encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+@app.after_request
+def compress_response(response):
+    if (not app.config["RESPONSE_COMPRESSION"] or response.status_code != 200 or response.direct_passthrough
+            or response.is_streamed or response.mimetype != "application/json" or "Content-Encoding" in response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    encoding = _encoding() if len(data) >= app.config["COMPRESSION_MIN_SIZE"] else None
+    if encoding is None:
+        return response
+    level = app.config["COMPRESSION_LEVEL"]
+    response.set_data(brotli.compress(data, quality=level) if encoding == "br" else gzip.compress(data, compresslevel=level, mtime=0))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ per encoding, so a strong validator would be wrong
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
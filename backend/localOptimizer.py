@@ -0,0 +1,129 @@
+"""Deterministic schedule optimizer for the mechanical parts of the Good Schedule Policy in aiPrompts.py:
+buffers between tasks, locked items left alone, 8 AM-10 PM hours and urgency priority.
+Anything that needs rewriting (names, descriptions, re-rating urgency) is left to the model, and so are
+events longer than a 90-minute session, since splitting one into sessions means adding events."""
+from bisect import insort
+from models import time_to_minutes, minutes_to_time, URGENCY_LEVELS
+from intervalIndex import day_spans
+
+DAY_START = 8 * 60
+DAY_END = 22 * 60
+BUFFER_MINUTES = 10
+MAX_SESSION_MINUTES = 90
+
+URGENCY_RANK = {level: rank for rank, level in enumerate(URGENCY_LEVELS)}
+
+# Modifications this module can make on its own; any others need the model
+LOCAL_MODIFICATIONS = {'times'}
+
+def needs_model(allowed, schedule=()):
+    if not set(allowed) <= LOCAL_MODIFICATIONS:
+        return True
+    # Events over the session cap keep their full length here; only the model may break them up
+    return 'times' in allowed and any(_is_long_session(event) for event in schedule)
+
+def _is_long_session(event):
+    start, end = time_to_minutes(event.get('start')), time_to_minutes(event.get('end'))
+    return _is_movable(event, start, end) and end - start > MAX_SESSION_MINUTES
+
+def _is_movable(event, start, end):
+    return (
+        not event.get('locked', False)
+        and event.get('type', 'event') != 'reminder'
+        and event.get('startDate') == event.get('endDate')
+        and start is not None and end is not None and end > start
+    )
+
+def _find_slot(occupied, preferred, duration):
+    """Earliest start at or after preferred (else the latest before it) that keeps BUFFER_MINUTES
+    clear of every occupied interval and stays inside the day window; None if nothing fits."""
+    latest_start = DAY_END - duration
+    if latest_start < DAY_START:
+        return None
+    preferred = min(max(preferred, DAY_START), latest_start)
+    # occupied is sorted by start, so walking forward only ever pushes the candidate later
+    candidate = preferred
+    for busy_start, busy_end in occupied:
+        if busy_start >= candidate + duration + BUFFER_MINUTES:
+            break
+        if busy_end + BUFFER_MINUTES > candidate:
+            candidate = busy_end + BUFFER_MINUTES
+    if candidate <= latest_start:
+        return candidate
+    # Nothing fits later in the day, so walk backwards from the preferred start instead
+    candidate = preferred
+    for busy_start, busy_end in reversed(occupied):
+        if busy_start < candidate + duration + BUFFER_MINUTES and busy_end + BUFFER_MINUTES > candidate:
+            candidate = busy_start - BUFFER_MINUTES - duration
+    return candidate if candidate >= DAY_START else None
+
+def _place(occupied, movable, reserve):
+    """Places movable events in order around occupied. With reserve, the original slots of events not yet
+    placed stay occupied too. Returns {id(event): (start, end)} for the events that move, or None when an
+    event finds no slot and its original one has already been taken."""
+    occupied = sorted(occupied + [(start, end) for _, start, end in movable]) if reserve else list(occupied)
+    changes = {}
+    for event, start, end in movable:
+        if reserve:
+            occupied.remove((start, end))
+        duration = end - start
+        new_start = _find_slot(occupied, start, duration)
+        if new_start is None:
+            # Nothing fits, so the event stays put, which must not land it on an event already moved there
+            if any(moved_start < end and start < moved_end for moved_start, moved_end in changes.values()):
+                return None
+            new_start = start
+        insort(occupied, (new_start, new_start + duration))
+        if (new_start, new_start + duration) != (start, end):
+            changes[id(event)] = (new_start, new_start + duration)
+    return changes
+
+def _optimize_day(events, blocked):
+    """Returns {id(event): (start, end)} for the movable events of one day that should change.
+    blocked holds the (start, end) minutes of the day taken by multi-day events."""
+    occupied = list(blocked)
+    movable = []
+    for event in events:
+        start, end = time_to_minutes(event.get('start')), time_to_minutes(event.get('end'))
+        if _is_movable(event, start, end):
+            movable.append((event, start, end))
+        elif start is not None and end is not None and end > start:
+            occupied.append((start, end))
+    occupied.sort()
+    # More urgent events claim their preferred slot first; ties keep their original order
+    movable.sort(key=lambda item: (-URGENCY_RANK.get(item[0].get('urgency'), 0), item[1]))
+    changes = _place(occupied, movable, reserve=False)
+    if changes is None:
+        # Moved events never cover a reserved slot, so no event can be left stranded on one
+        changes = _place(occupied, movable, reserve=True) or {}
+    return changes
+
+def optimize(schedule, allowed):
+    """Optimizes a schedule in the optimizer's JSON shape. Returns {"schedule": [...]} with the
+    improved events, or {"message": "Perfect Schedule"} when nothing needs to move."""
+    if 'times' not in allowed:
+        return {"message": "Perfect Schedule"}
+    days = {}
+    blocked = {}
+    for event in schedule:
+        if event.get('startDate') == event.get('endDate'):
+            days.setdefault(event.get('startDate'), []).append(event)
+            continue
+        # A multi-day event runs from its start time on the first day to its end time on the last
+        spans = day_spans(event.get('startDate'), event.get('endDate'),
+                          time_to_minutes(event.get('start')), time_to_minutes(event.get('end')))
+        for day, start, end in spans:
+            if end > start:
+                blocked.setdefault(day, []).append((start, end))
+    changes = {}
+    for day, events in days.items():
+        changes.update(_optimize_day(events, blocked.get(day, [])))
+    if not changes:
+        return {"message": "Perfect Schedule"}
+    improved = []
+    for event in schedule:
+        if id(event) in changes:
+            start, end = changes[id(event)]
+            event = {**event, 'start': minutes_to_time(start), 'end': minutes_to_time(end)}
+        improved.append(event)
+    return {"schedule": improved}
@@ -1,33 +1,313 @@
 # main.py
 from flask import request, jsonify
 from config import app, db
-from models import Schedule
+from models import Schedule, RecurringEvent, RecurrenceOverride, SCHEDULE_JSON_COLUMNS, schedule_row_json, time_to_minutes, URGENCY_LEVELS
+from migrations import init_db
+from dateUtils import parse_date, iter_dates, DATE_FORMAT
+from datetime import timedelta
+from functools import partial
+from itertools import chain
+from operator import itemgetter
+import optimizerCache
+import aiService
+import localOptimizer
+import chunkedOptimizer
+import intervalIndex
+import recurrence
+import scheduleSearch
+import scheduleListing
+import reminders
+import archive
+import scheduleChanges
+import metrics
+import jsonResponses
+import sqliteProfile
+from scheduleEvents import broker
+from werkzeug.serving import is_running_from_reloader
+from aiJobs import ai_jobs, QueueFullError
+from threading import BoundedSemaphore
 import logging
-from os import system
-from dotenv import load_dotenv
-import os
+import hashlib
+import heapq
 import json
-import google.generativeai as genai
-from aiPrompts import gemini_optimizer_prompt, gemini_summarizer_prompt
 
-system("clear||cls")
 logging.basicConfig(level=logging.DEBUG)
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 
 
 @app.route("/schedule", methods=["GET"])
 def get_schedule_info():
     logging.debug("Received GET request to /schedule")
+    # Any write bumps the change version, so an unchanged version means the client's copy is current
+    version = scheduleChanges.current_version()
+    if request.if_none_match.contains_weak(f"v{version}"):
+        return app.response_class(status=304, headers={"ETag": f'"v{version}"', "Cache-Control": "no-cache"})
+    response, status = get_schedule_body()
+    if status == 200:
+        # A stream's body is read later, but never from before this version, so syncing from it misses nothing
+        response.set_etag(f"v{version}")
+        response.headers["Cache-Control"] = "no-cache"
+    return response, status
+
+def get_schedule_body():
     date = request.args.get("date")
-    schedules = Schedule.query.all()
+    if request.args.get("from") or request.args.get("to"):
+        return get_schedule_range(request.args.get("from"), request.args.get("to"))
+    if not date and (request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson"):
+        return get_schedule_stream()
+    if not date and ("limit" in request.args or "after" in request.args):
+        return get_schedule_page()
+    # Row tuples straight to JSON bytes; no Schedule objects are built on this path
+    query = db.session.query(*SCHEDULE_JSON_COLUMNS)
     if date:
-        # Include events where date is between startDate and endDate
-        schedules = [s for s in schedules if s.eventInfo.get('startDate') <= date <= s.eventInfo.get('endDate')]
-    json_schedule = list(map(lambda x: x.to_json(), schedules))
-    logging.debug(f"Returning schedules: {json_schedule}")
-    return jsonify({"schedule": json_schedule}), 200
+        # Include events where date is between startDate and endDate, answered from the date indexes
+        query = query.filter(Schedule.startDate <= date, Schedule.endDate >= date)
+    rows = query.order_by(Schedule.id)
+    if date and parse_date(date):
+        # Archived events are only looked up for a day old enough to have any
+        rows = heapq.merge(rows, archive.json_rows_between(date, date), key=itemgetter(0))
+    elif not date:
+        rows = heapq.merge(rows, archive.json_rows(), key=itemgetter(0))
+    json_schedule = [schedule_row_json(row) for row in rows]
+    if date and parse_date(date):
+        # Recurring events are expanded for the requested day only; an unbounded listing has no window to expand into
+        json_schedule += recurrence.occurrences(date, date)
+    metrics.record_rows(len(json_schedule))
+    jsonResponses.log_payload("Returning schedules: %s", json_schedule)
+    return jsonResponses.json_response({"schedule": json_schedule}), 200
+
+def parse_listing_args():
+    """Returns (order, cursor, error response) for the keyset arguments of the unbounded listing"""
+    after = request.args.get("after")
+    order = request.args.get("order", scheduleListing.default_order(after))
+    if order not in scheduleListing.ORDERS:
+        return None, None, (jsonify({"message": f"order must be one of {', '.join(scheduleListing.ORDERS)}"}), 400)
+    try:
+        return order, scheduleListing.parse_cursor(order, after), None
+    except ValueError as e:
+        return None, None, (jsonify({"message": str(e)}), 400)
+
+def get_schedule_page():
+    # Keyset pagination: ?limit=&after=<id> in id order, or ?order=start&after=<startDate>,<id>
+    order, cursor, error = parse_listing_args()
+    if error:
+        return error
+    limit = request.args.get("limit", scheduleListing.DEFAULT_LIMIT, type=int)
+    if limit is None or not 0 < limit <= scheduleListing.MAX_LIMIT:
+        return jsonify({"message": f"limit must be between 1 and {scheduleListing.MAX_LIMIT}"}), 400
+    json_schedule, next_after = scheduleListing.page(order, cursor, limit)
+    metrics.record_rows(len(json_schedule))
+    return jsonResponses.json_response({"schedule": json_schedule, "order": order, "limit": limit,
+                                        "more": next_after is not None, "nextAfter": next_after}), 200
+
+def get_schedule_stream():
+    # One event per line, read a keyset page at a time; after= resumes an interrupted stream
+    order, cursor, error = parse_listing_args()
+    if error:
+        return error
+    chunks = scheduleListing.stream(order, cursor)
+    return app.response_class(chunks, mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"}), 200
+
+def get_schedule_range(start, end):
+    # Answers a whole day/week window with one overlap query instead of one request per date
+    if not (parse_date(start) and parse_date(end)):
+        return jsonify({"message": "from and to must both be dates in YYYY-MM-DD format"}), 400
+    if start > end:
+        return jsonify({"message": "from must be on or before to"}), 400
+    rows = db.session.query(*SCHEDULE_JSON_COLUMNS) \
+        .filter(Schedule.startDate <= end, Schedule.endDate >= start).order_by(Schedule.id)
+    rows = heapq.merge(rows, archive.json_rows_between(start, end), key=itemgetter(0))
+    days = {day: [] for day in iter_dates(start, end)}
+    json_schedule = []
+    for event in chain(map(schedule_row_json, rows), recurrence.occurrences(start, end)):
+        # Multi-day events are listed once, with the dates inside the window they cover
+        try:
+            event['dates'] = list(iter_dates(max(event['startDate'], start), min(event['endDate'], end)))
+        except TypeError:
+            # Stored dates aren't validated on create; one malformed row shouldn't fail the whole window
+            logging.warning("Skipping event %s with malformed dates %r to %r", event['id'], event['startDate'], event['endDate'])
+            continue
+        for day in event['dates']:
+            days[day].append(event['id'])
+        json_schedule.append(event)
+    metrics.record_rows(len(json_schedule))
+    logging.debug("Returning %d schedules for %s to %s", len(json_schedule), start, end)
+    return jsonResponses.json_response({"schedule": json_schedule, "days": days}), 200
+
+@app.route("/schedule/changes", methods=["GET"])
+def get_schedule_changes():
+    # Delta sync: rows written since the client's version, plus tombstones for deleted ids
+    logging.debug("Received GET request to /schedule/changes")
+    since = request.args.get("since", 0, type=int)
+    limit = request.args.get("limit", type=int)
+    if since is None or since < 0 or (limit is not None and limit <= 0):
+        return jsonify({"message": "since must be a non-negative version and limit a positive number"}), 400
+    upserts, deletes, recurring, version, more = scheduleChanges.changes_since(since, limit)
+    return jsonify({
+        "since": since,
+        "version": version,
+        "more": more,
+        "upserts": upserts,
+        "deletes": deletes,
+        # Recurring events whose rule or overrides changed; their occurrences are refetched by window
+        "recurring": recurring,
+    }), 200
+
+@app.route("/schedule/stream", methods=["GET"])
+def stream_schedule():
+    # Server-sent events for creates/updates/deletes touching the optional from/to window
+    logging.debug("Received GET request to /schedule/stream")
+    start, end = request.args.get("from"), request.args.get("to")
+    if (start or end) and not (parse_date(start) and parse_date(end) and start <= end):
+        return jsonify({"message": "from and to must both be dates in YYYY-MM-DD format, from on or before to"}), 400
+    subscription = broker.subscribe(start, end)
+    version = scheduleChanges.current_version()
+    keepalive = app.config["STREAM_KEEPALIVE"]
+
+    def events():
+        try:
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'version': version})}\n\n"
+            while True:
+                message = subscription.get(timeout=keepalive)
+                if subscription.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['op']}\ndata: {json.dumps({'id': message['id'], 'event': message['event']})}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    # Not wrapped in stream_with_context: the request's DB session is released before the stream starts
+    return app.response_class(events(), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/schedule/summary", methods=["GET"])
+def get_month_summary():
+    # Per-day counts, top urgency and booked minutes for a month grid, from one narrow query
+    logging.debug("Received GET request to /schedule/summary")
+    month = request.args.get("month", "")
+    first_day = parse_date(f"{month}-01")
+    if not first_day or len(month) != 7:
+        return jsonify({"message": "month must be in YYYY-MM format"}), 400
+    next_month = (first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    start, end = first_day.strftime(DATE_FORMAT), (next_month - timedelta(days=1)).strftime(DATE_FORMAT)
+    rows = db.session.query(
+        Schedule.startDate, Schedule.endDate, Schedule.startMinutes, Schedule.endMinutes, Schedule.urgency,
+    ).filter(Schedule.startDate <= end, Schedule.endDate >= start).all()
+    rows += archive.rows_between(start, end, 'startDate', 'endDate', 'startMinutes', 'endMinutes', 'urgency')
+    rows += [(row[1], row[2], row[4], row[5], row[9]) for row, _, _ in recurrence.occurrence_rows(start, end)]
+    days, booked = {}, {}
+    for start_date, end_date, start_minutes, end_minutes, urgency in rows:
+        rank = urgency or 0
+        if not (parse_date(start_date) and parse_date(end_date)):
+            logging.warning("Skipping an event with malformed dates %r to %r in the %s summary", start_date, end_date, month)
+            continue
+        for day, day_start, day_end in intervalIndex.day_spans(start_date, end_date, start_minutes, end_minutes, start, end):
+            summary = days.setdefault(day, {"count": 0, "urgencyRank": 0})
+            summary["count"] += 1
+            summary["urgencyRank"] = max(summary["urgencyRank"], rank)
+            booked.setdefault(day, []).append((day_start, day_end))
+    for day, summary in days.items():
+        summary["highestUrgency"] = URGENCY_LEVELS[summary.pop("urgencyRank")]
+        # Minutes covered by at least one event, so overlapping events are only counted once
+        summary["bookedMinutes"], covered_to = 0, 0
+        for day_start, day_end in sorted(booked[day]):
+            if day_end > covered_to:
+                summary["bookedMinutes"] += day_end - max(day_start, covered_to)
+                covered_to = day_end
+    return jsonify({"month": month, "days": dict(sorted(days.items()))}), 200
+
+@app.route("/schedule/conflicts", methods=["GET"])
+def get_schedule_conflicts():
+    logging.debug("Received GET request to /schedule/conflicts")
+    start, end = request.args.get("from"), request.args.get("to")
+    if not (parse_date(start) and parse_date(end)):
+        return jsonify({"message": "from and to must both be dates in YYYY-MM-DD format"}), 400
+    if start > end:
+        return jsonify({"message": "from must be on or before to"}), 400
+    window_start = intervalIndex.epoch_minutes(start, 0)
+    window_end = intervalIndex.epoch_minutes(end, intervalIndex.MINUTES_PER_DAY)
+    index = intervalIndex.build_index(start, end)
+    conflicts = []
+    for first, second, overlap_start, overlap_end in index.conflicts():
+        if overlap_end <= window_start or overlap_start >= window_end:
+            continue
+        start_date, start_time = intervalIndex.format_epoch_minutes(overlap_start)
+        end_date, end_time = intervalIndex.format_epoch_minutes(overlap_end)
+        conflicts.append({"ids": [first[2], second[2]], "startDate": start_date, "start": start_time, "endDate": end_date, "end": end_time})
+    return jsonify({"conflicts": conflicts, "count": len(conflicts)}), 200
+
+@app.route("/schedule/free", methods=["GET"])
+def get_free_slots():
+    logging.debug("Received GET request to /schedule/free")
+    date = request.args.get("date")
+    duration = request.args.get("duration", 30, type=int)
+    day_start = time_to_minutes(request.args.get("start", "08:00 AM"))
+    day_end = time_to_minutes(request.args.get("end", "10:00 PM"))
+    if not parse_date(date):
+        return jsonify({"message": "date must be in YYYY-MM-DD format"}), 400
+    if duration is None or duration <= 0 or day_start is None or day_end is None or day_end <= day_start:
+        return jsonify({"message": "duration must be a positive number of minutes and start must be before end"}), 400
+    index = intervalIndex.build_index(date, date)
+    slots = []
+    for slot_start, slot_end in index.free_slots(intervalIndex.epoch_minutes(date, day_start), intervalIndex.epoch_minutes(date, day_end), duration):
+        slots.append({
+            "start": intervalIndex.format_epoch_minutes(slot_start)[1],
+            "end": intervalIndex.format_epoch_minutes(slot_end)[1],
+            "minutes": slot_end - slot_start,
+        })
+    return jsonify({"date": date, "duration": duration, "slots": slots}), 200
+
+@app.route("/schedule/search", methods=["GET"])
+def search_schedule():
+    # Ranked full-text search over titles and descriptions; each word matches as a prefix
+    logging.debug("Received GET request to /schedule/search")
+    query = scheduleSearch.match_query(request.args.get("q"))
+    start, end = request.args.get("from"), request.args.get("to")
+    urgency = request.args.get("urgency")
+    limit = request.args.get("limit", scheduleSearch.DEFAULT_LIMIT, type=int)
+    offset = request.args.get("offset", 0, type=int)
+    if query is None:
+        return jsonify({"message": "q must contain at least one word"}), 400
+    if (start or end) and not (parse_date(start) and parse_date(end) and start <= end):
+        return jsonify({"message": "from and to must both be dates in YYYY-MM-DD format, from on or before to"}), 400
+    if urgency is not None and urgency not in URGENCY_LEVELS:
+        return jsonify({"message": f"urgency must be one of {', '.join(URGENCY_LEVELS)}"}), 400
+    if limit is None or not 0 < limit <= scheduleSearch.MAX_LIMIT or offset is None or offset < 0:
+        return jsonify({"message": f"limit must be between 1 and {scheduleSearch.MAX_LIMIT} and offset not negative"}), 400
+    results, more = scheduleSearch.search(query, start, end, URGENCY_LEVELS.index(urgency) if urgency else None, limit, offset)
+    metrics.record_rows(len(results))
+    return jsonResponses.json_response({
+        "schedule": results,
+        "offset": offset,
+        "limit": limit,
+        "more": more,
+        "nextOffset": offset + len(results) if more else None,
+    }), 200
+
+def check_locked_conflicts(data, event_info, schedule_id=None):
+    """Honours the optional "conflicts" request field: "reject" turns an overlap with a locked event
+    into a 409 response, "flag" just reports it. Returns (conflicting ids, error response)."""
+    mode = data.get("conflicts")
+    if mode not in ("reject", "flag"):
+        return [], None
+    conflicting = intervalIndex.locked_conflicts(event_info, exclude_id=schedule_id)
+    if conflicting and mode == "reject":
+        logging.error(f"Rejecting schedule that overlaps locked events {conflicting}")
+        return conflicting, (jsonify({"message": "Schedule overlaps locked events", "conflicts": conflicting}), 409)
+    return conflicting, None
+
+def normalize_reminder(event_info, default=False):
+    """Makes eventInfo's reminder flag a bool, falling back to default when it's missing or not one"""
+    event_info['reminder'] = event_info['reminder'] if isinstance(event_info.get('reminder'), bool) else default
+    return event_info
+
+def occurrence_reminder(recurring, occurrence_date):
+    """The reminder flag an occurrence has now: its override's, else its rule's"""
+    override = db.session.get(RecurrenceOverride, (recurring.id, occurrence_date))
+    return ((override and override.eventInfo) or recurring.eventInfo).get('reminder', False)
 
 @app.route("/create_schedule", methods=["POST"])
 def create_schedule():
@@ -37,7 +317,10 @@ def create_schedule():
     if not event_info or not all(key in event_info for key in ["title", "startDate", "endDate", "start", "end"]):
         logging.error("Missing or invalid eventInfo; required fields: title, startDate, endDate, start, end")
         return jsonify({"message": "Error: Missing required fields: title, startDate, endDate, start, end"}), 400
-    event_info['reminder'] = event_info.get('reminder', False) if isinstance(event_info.get('reminder'), bool) else False
+    normalize_reminder(event_info)
+    conflicts, error = check_locked_conflicts(data, event_info)
+    if error:
+        return error
     logging.debug(f"Creating schedule with eventInfo: {event_info}")
     new_schedule = Schedule(eventInfo=event_info)
     try:
@@ -47,12 +330,16 @@ def create_schedule():
     except Exception as e:
         logging.error(f"Error creating schedule: {str(e)}")
         return jsonify({"message": str(e)}), 400
-    return jsonify({"message": "Schedule created!", "id": new_schedule.id, "eventInfo": new_schedule.eventInfo}), 201
+    response = {"message": "Schedule created!", "id": new_schedule.id, "eventInfo": event_info}
+    if "conflicts" in data:
+        response["conflicts"] = conflicts
+    return jsonify(response), 201
 
 @app.route("/update_schedule/<int:schedule_id>", methods=["PATCH"])
 def update_schedule(schedule_id):
     logging.debug(f"Received PATCH request to /update_schedule/{schedule_id}")
-    schedule = Schedule.query.get(schedule_id)
+    # An archived event is moved back first; it is rolled back with the request if the update fails
+    schedule = Schedule.query.get(schedule_id) or (archive.restore([schedule_id]) and Schedule.query.get(schedule_id))
     if not schedule:
         logging.error(f"Schedule with ID {schedule_id} not found")
         return jsonify({"message": "Schedule not found"}), 404
@@ -61,17 +348,23 @@ def update_schedule(schedule_id):
     if not all(key in event_info for key in ["title", "startDate", "endDate", "start", "end", "urgency"]):
         logging.error("Missing or invalid eventInfo; required fields: title, startDate, endDate, start, end","urgency")
         return jsonify({"message": "Missing required fields: title, startDate, endDate, start, end, urgency"}), 400
-    event_info['reminder'] = event_info.get('reminder', schedule.eventInfo.get('reminder', False)) if isinstance(event_info.get('reminder'), bool) else schedule.eventInfo.get('reminder', False)
+    normalize_reminder(event_info, schedule.eventInfo.get('reminder', False))
+    conflicts, error = check_locked_conflicts(data, event_info, schedule_id)
+    if error:
+        return error
     logging.debug(f"Updating schedule with eventInfo: {event_info}")
     schedule.eventInfo = event_info
     db.session.commit()
     logging.info("Schedule updated successfully")
-    return jsonify({"message": "Schedule updated"}), 200
+    response = {"message": "Schedule updated"}
+    if "conflicts" in data:
+        response["conflicts"] = conflicts
+    return jsonify(response), 200
 
 @app.route("/delete_schedule/<int:schedule_id>", methods=["DELETE"])
 def delete_schedule(schedule_id):
     logging.debug(f"Received DELETE request to /delete_schedule/{schedule_id}")
-    schedule = Schedule.query.get(schedule_id)
+    schedule = Schedule.query.get(schedule_id) or (archive.restore([schedule_id]) and Schedule.query.get(schedule_id))
     if not schedule:
         logging.error(f"Schedule with ID {schedule_id} not found")
         return jsonify({"message": "Schedule not found"}), 404
@@ -80,47 +373,310 @@ def delete_schedule(schedule_id):
     logging.info("Schedule deleted successfully")
     return jsonify({"message": "Schedule deleted"}), 200
 
+def missing_fields(event_info, fields):
+    return not isinstance(event_info, dict) or not all(key in event_info for key in fields)
+
+@app.route("/update_schedule/r<int:recurring_id>:<occurrence_date>", methods=["PATCH"])
+def update_occurrence(recurring_id, occurrence_date):
+    # Editing one occurrence of a recurring event stores an override; the rule itself is unchanged
+    logging.debug(f"Received PATCH request to /update_schedule/r{recurring_id}:{occurrence_date}")
+    recurring = db.session.get(RecurringEvent, recurring_id)
+    if not recurring or not recurrence.is_occurrence(recurring, occurrence_date):
+        return jsonify({"message": "Schedule not found"}), 404
+    data = request.json
+    event_info = data.get("eventInfo")
+    if missing_fields(event_info, ["title", "startDate", "endDate", "start", "end", "urgency"]) \
+            or not (parse_date(event_info["startDate"]) and parse_date(event_info["endDate"])):
+        return jsonify({"message": "Missing required fields: title, startDate, endDate, start, end, urgency"}), 400
+    normalize_reminder(event_info, occurrence_reminder(recurring, occurrence_date))
+    conflicts, error = check_locked_conflicts(data, event_info, f"r{recurring_id}:{occurrence_date}")
+    if error:
+        return error
+    recurrence.set_override(recurring_id, occurrence_date, event_info)
+    db.session.commit()
+    response = {"message": "Schedule updated"}
+    if "conflicts" in data:
+        response["conflicts"] = conflicts
+    return jsonify(response), 200
+
+@app.route("/delete_schedule/r<int:recurring_id>:<occurrence_date>", methods=["DELETE"])
+def delete_occurrence(recurring_id, occurrence_date):
+    logging.debug(f"Received DELETE request to /delete_schedule/r{recurring_id}:{occurrence_date}")
+    recurring = db.session.get(RecurringEvent, recurring_id)
+    if not recurring or not recurrence.is_occurrence(recurring, occurrence_date):
+        return jsonify({"message": "Schedule not found"}), 404
+    recurrence.set_override(recurring_id, occurrence_date, None)
+    db.session.commit()
+    return jsonify({"message": "Schedule deleted"}), 200
+
+def parse_recurring_request(data, recurring=None):
+    """Returns (eventInfo, rule columns, error response) for a create, or an update of recurring"""
+    event_info = data.get("eventInfo", recurring.eventInfo if recurring else None)
+    if missing_fields(event_info, ["title", "startDate", "endDate", "start", "end"]) \
+            or not (parse_date(event_info["startDate"]) and parse_date(event_info["endDate"])) \
+            or event_info["endDate"] < event_info["startDate"]:
+        return None, None, (jsonify({"message": "eventInfo needs title, start, end and YYYY-MM-DD startDate and endDate, endDate not before startDate"}), 400)
+    normalize_reminder(event_info, recurring.eventInfo.get('reminder', False) if recurring else False)
+    rule = data.get("recurrence", recurrence.recurrence_json(recurring) if recurring else None)
+    try:
+        columns = recurrence.parse_recurrence(rule, event_info["startDate"])
+    except ValueError as e:
+        return None, None, (jsonify({"message": str(e)}), 400)
+    return event_info, columns, None
+
+@app.route("/recurring", methods=["GET"])
+def get_recurring():
+    logging.debug("Received GET request to /recurring")
+    return jsonify({"recurring": [recurrence.to_json(recurring) for recurring in RecurringEvent.query.order_by(RecurringEvent.id)]}), 200
+
+@app.route("/create_recurring", methods=["POST"])
+def create_recurring():
+    # Stores the rule once; occurrences are expanded by the windowed /schedule reads
+    logging.debug("Received POST request to /create_recurring")
+    event_info, columns, error = parse_recurring_request(request.get_json() or {})
+    if error:
+        return error
+    recurring = RecurringEvent()
+    recurrence.apply_rule(recurring, event_info, columns)
+    db.session.add(recurring)
+    db.session.commit()
+    logging.info(f"Recurring event created: {recurring.id}")
+    return jsonify({"message": "Recurring event created!", **recurrence.to_json(recurring)}), 201
+
+@app.route("/update_recurring/<int:recurring_id>", methods=["PATCH"])
+def update_recurring(recurring_id):
+    logging.debug(f"Received PATCH request to /update_recurring/{recurring_id}")
+    recurring = db.session.get(RecurringEvent, recurring_id)
+    if not recurring:
+        return jsonify({"message": "Recurring event not found"}), 404
+    event_info, columns, error = parse_recurring_request(request.get_json() or {}, recurring)
+    if error:
+        return error
+    recurrence.apply_rule(recurring, event_info, columns)
+    dropped = recurrence.drop_stale_overrides(recurring)
+    db.session.commit()
+    return jsonify({"message": "Recurring event updated", "droppedOverrides": dropped, **recurrence.to_json(recurring)}), 200
+
+@app.route("/delete_recurring/<int:recurring_id>", methods=["DELETE"])
+def delete_recurring(recurring_id):
+    logging.debug(f"Received DELETE request to /delete_recurring/{recurring_id}")
+    recurring = db.session.get(RecurringEvent, recurring_id)
+    if not recurring:
+        return jsonify({"message": "Recurring event not found"}), 404
+    RecurrenceOverride.query.filter_by(recurringId=recurring_id).delete()
+    db.session.delete(recurring)
+    db.session.commit()
+    return jsonify({"message": "Recurring event deleted"}), 200
+
+def batch_operation_problem(operation):
+    """Why a batch operation is malformed, or None"""
+    if not isinstance(operation, dict):
+        return "each operation must be an object"
+    if "eventInfo" in operation and not isinstance(operation["eventInfo"], dict):
+        return "eventInfo must be an object"
+    schedule_id = operation.get("id")
+    if operation.get("op") in ("update", "delete") and (isinstance(schedule_id, bool) or not isinstance(schedule_id, (int, str))):
+        return "id must be an event id or an occurrence id"
+    return None
+
+@app.route("/schedule/batch", methods=["POST"])
+def batch_schedule():
+    # Applies create/update/delete operations in one transaction so multi-event flows cost a single commit
+    logging.debug("Received POST request to /schedule/batch")
+    data = request.get_json() or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"message": "Missing operations list"}), 400
+    # Shapes are checked up front, so a malformed operation is a 400 naming it rather than an error mid-transaction
+    for index, operation in enumerate(operations):
+        problem = batch_operation_problem(operation)
+        if problem:
+            return jsonify({"message": f"Operation {index}: {problem}", "index": index}), 400
+    target_ids = {operation.get("id") for operation in operations if isinstance(operation, dict) and operation.get("op") in ("update", "delete")
+                  and not recurrence.parse_occurrence_id(operation.get("id"))}
+    if target_ids:
+        archive.restore(target_ids)
+    targets = {schedule.id: schedule for schedule in Schedule.query.filter(Schedule.id.in_(target_ids)).all()} if target_ids else {}
+    results = []
+    created = []
+    for index, operation in enumerate(operations):
+        op = operation.get("op") if isinstance(operation, dict) else None
+        if op == "create":
+            event_info = operation.get("eventInfo")
+            if not event_info or not all(key in event_info for key in ["title", "startDate", "endDate", "start", "end"]):
+                db.session.rollback()
+                return jsonify({"message": f"Operation {index}: missing required fields: title, startDate, endDate, start, end", "index": index}), 400
+            normalize_reminder(event_info)
+            new_schedule = Schedule(eventInfo=event_info)
+            db.session.add(new_schedule)
+            created.append(new_schedule)
+            results.append({"op": op, "schedule": new_schedule})
+        elif op in ("update", "delete") and recurrence.parse_occurrence_id(operation.get("id")):
+            # Occurrences of recurring events are updated or deleted through overrides
+            recurring_id, occurrence_date = recurrence.parse_occurrence_id(operation.get("id"))
+            recurring = db.session.get(RecurringEvent, recurring_id)
+            if not recurring or not recurrence.is_occurrence(recurring, occurrence_date):
+                db.session.rollback()
+                return jsonify({"message": f"Operation {index}: schedule {operation.get('id')} not found", "index": index}), 404
+            event_info = operation.get("eventInfo") if op == "update" else None
+            if op == "update" and (missing_fields(event_info, ["title", "startDate", "endDate", "start", "end", "urgency"])
+                                   or not (parse_date(event_info["startDate"]) and parse_date(event_info["endDate"]))):
+                db.session.rollback()
+                return jsonify({"message": f"Operation {index}: missing required fields: title, startDate, endDate, start, end, urgency", "index": index}), 400
+            if event_info:
+                normalize_reminder(event_info, occurrence_reminder(recurring, occurrence_date))
+            recurrence.set_override(recurring_id, occurrence_date, event_info)
+            results.append({"op": op, "id": operation.get("id")})
+        elif op in ("update", "delete"):
+            schedule = targets.get(operation.get("id"))
+            if not schedule:
+                db.session.rollback()
+                return jsonify({"message": f"Operation {index}: schedule {operation.get('id')} not found", "index": index}), 404
+            if op == "update":
+                event_info = operation.get("eventInfo", schedule.eventInfo)
+                if not all(key in event_info for key in ["title", "startDate", "endDate", "start", "end", "urgency"]):
+                    db.session.rollback()
+                    return jsonify({"message": f"Operation {index}: missing required fields: title, startDate, endDate, start, end, urgency", "index": index}), 400
+                normalize_reminder(event_info, schedule.eventInfo.get('reminder', False))
+                schedule.eventInfo = event_info
+            else:
+                db.session.delete(schedule)
+                # Later operations must not see a deleted row
+                del targets[schedule.id]
+            results.append({"op": op, "id": schedule.id})
+        else:
+            db.session.rollback()
+            return jsonify({"message": f"Operation {index}: unknown op {op!r}; expected create, update or delete", "index": index}), 400
+    try:
+        # One flush assigns every new id; reading them before commit avoids a reload per row afterwards
+        db.session.flush()
+        for result in results:
+            if "schedule" in result:
+                result["id"] = result.pop("schedule").id
+        new_ids = [schedule.id for schedule in created]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error applying schedule batch: {str(e)}")
+        return jsonify({"message": str(e)}), 400
+    logging.info(f"Applied schedule batch of {len(operations)} operations")
+    return jsonify({"message": "Batch applied", "results": results, "ids": new_ids}), 200
+
+OPTIMIZE_MODES = ["auto", "fast", "ai", "chunked"]
+
+def parse_optimize_request(data):
+    """Returns (schedule, allowed, cache_key, local_result, optimizer). local_result is set when the local
+    optimizer answered on its own, otherwise optimizer(schedule, allowed, cache_key) runs the model."""
+    schedule = data.get("schedule")
+    allowed = data.get("allowed_modifications", [])
+    mode = data.get("mode", "auto") if data.get("mode") in OPTIMIZE_MODES else "auto"
+    if not schedule:
+        return schedule, allowed, None, None, None
+    if mode != "ai":
+        # Mechanical fixes (buffers, day window, urgency order) are done locally in milliseconds
+        with metrics.phase("optimize", "local"):
+            local_result = localOptimizer.optimize(schedule, allowed)
+        if mode == "fast" or not localOptimizer.needs_model(allowed, schedule):
+            return schedule, allowed, None, local_result, None
+        # The model only has to do the creative rewriting on top of the local result
+        schedule = local_result.get("schedule", schedule)
+    if mode == "chunked":
+        # Week views go out as one model call per day (or per group of overlapping events) in parallel
+        by = data.get("chunk_by") if data.get("chunk_by") in chunkedOptimizer.PARTITIONS else "day"
+        return schedule, allowed, optimizerCache.cache_key(schedule, allowed, f"chunked:{by}"), None, partial(chunkedOptimizer.optimize, by=by)
+    return schedule, allowed, optimizerCache.cache_key(schedule, allowed), None, aiService.optimize
+
+def submit_ai_job(kind, key, fn, *args):
+    # Returns (job, coalesced, error response); job is None when the AI queue is full
+    try:
+        job, coalesced = ai_jobs.submit(kind, key, fn, *args)
+        return job, coalesced, None
+    except QueueFullError as e:
+        logging.error(f"Rejecting {kind} request: {str(e)}")
+        return None, False, (jsonify({"message": str(e)}), 503)
+
 @app.route("/optimize_schedule", methods=["POST"])
 def optimize_schedule():
     logging.debug("Received POST request to /optimize_schedule")
-    data = request.get_json()
-    schedule = data.get("schedule")
-    allowed = data.get("allowed_modifications", [])
+    schedule, allowed, cache_key, local_result, optimizer = parse_optimize_request(request.get_json())
     if not schedule:
         return jsonify({"message": "Empty Schedule Provided"}), 400
+    if local_result:
+        return jsonify(local_result), 200, {"X-Optimizer-Mode": "local"}
 
-    allowed_str = []
-    if 'times' in allowed:
-        allowed_str.append("start and end times")
-    if 'dates' in allowed:
-        allowed_str.append("startDate and endDate")
-    if 'locked' in allowed:
-        allowed_str.append("locked status")
-    if 'name' in allowed:
-        allowed_str.append("name")
-    if 'description' in allowed:
-        allowed_str.append("description")
-    if 'urgency' in allowed:
-        allowed_str.append("urgency")
-
-    additional_prompt = f"The user allows you to modify: {', '.join(allowed_str)}." if allowed_str else "The user does not allow any modifications."
-    locked_rule = "\n5. Maintain locked items exactly as they are." if 'locked' not in allowed else "\n5. You may modify locked status as needed."
-
-    full_prompt = gemini_optimizer_prompt + locked_rule + "\n\n" + additional_prompt + "\n\nSchedule to be Improved: " + json.dumps({"schedule": schedule})
+    # Re-running the optimizer on an unchanged day returns the stored reply instead of calling Gemini again
+    cached = optimizerCache.get(cache_key)
+    if cached is not None:
+        logging.debug(f"Optimizer cache hit for {cache_key}")
+        return jsonify(cached), 200, {"X-Optimizer-Cache": "hit"}
+    # Still goes through the job queue so the concurrency cap and coalescing apply to blocking callers too
+    job, coalesced, error = submit_ai_job("optimize", cache_key, optimizer, schedule, allowed, cache_key)
+    if not job:
+        return error
+    job.wait()
+    return jsonify(job.result), job.statusCode, {"X-Optimizer-Cache": "miss"}
 
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(full_prompt)
-        output = response.text.strip()
-        if output.startswith("```json"):
-            output = output[7:-3].strip()
-        if output in ["Perfect Schedule", "Empty Schedule Provided"] or output.startswith("Incorrect JSON Object Structure"):
-            return jsonify({"message": output}), 200
-        improved_schedule = json.loads(output)
-        return jsonify(improved_schedule), 200
-    except Exception as e:
-        logging.error(f"Error optimizing schedule: {str(e)}")
-        return jsonify({"message": "Failed to optimize schedule"}), 500
+# Streamed calls hold a request thread for the whole reply instead of going through the job queue,
+# so they get their own cap of the same size
+stream_slots = BoundedSemaphore(app.config["AI_MAX_CONCURRENCY"])
+
+def sse_message(op, data):
+    return f"event: {op}\ndata: {json.dumps(data)}\n\n"
+
+def stream_ai(stream, *args):
+    """SSE response forwarding the (op, data) pairs yielded by stream(*args)"""
+    def events():
+        if not stream_slots.acquire(blocking=False):
+            yield sse_message("error", {"message": "Too many AI requests in progress", "statusCode": 503})
+            return
+        try:
+            messages = stream(*args)
+            while True:
+                # The context is pushed per step rather than held across yields, so a client that disconnects
+                # mid-stream never pops it from under another request's context
+                with app.app_context():
+                    message = next(messages, None)
+                if message is None:
+                    return
+                yield sse_message(*message)
+        finally:
+            stream_slots.release()
+
+    return app.response_class(events(), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def replay_result(body, schedule=()):
+    # Results that are already known are sent in the same shape as a live stream
+    originals = {str(event.get('id')): event for event in schedule}
+    for event in body.get("schedule", []):
+        if event != originals.get(str(event.get('id'))):
+            yield "event", event
+    yield "done", body
+
+def run_optimizer(optimizer, schedule, allowed, cache_key):
+    body, status = optimizer(schedule, allowed, cache_key)
+    yield from replay_result(body, schedule) if status < 400 else [("error", body)]
+
+@app.route("/optimize_schedule/stream", methods=["POST"])
+def stream_optimize_schedule():
+    # Same request as /optimize_schedule; answers with "event" messages for each changed event, then "done"
+    logging.debug("Received POST request to /optimize_schedule/stream")
+    schedule, allowed, cache_key, local_result, optimizer = parse_optimize_request(request.get_json())
+    if not schedule:
+        return jsonify({"message": "Empty Schedule Provided"}), 400
+    if local_result:
+        return stream_ai(replay_result, local_result, schedule)
+    cached = optimizerCache.get(cache_key)
+    if cached is not None:
+        return stream_ai(replay_result, cached, schedule)
+    if optimizer is not aiService.optimize:
+        # Chunked mode merges whole chunk replies, so there is nothing to stream before it finishes
+        return stream_ai(run_optimizer, optimizer, schedule, allowed, cache_key)
+    return stream_ai(aiService.optimize_stream, schedule, allowed, cache_key)
+
+@app.route("/optimize_schedule/cache", methods=["GET"])
+def optimizer_cache_stats():
+    return jsonify(optimizerCache.stats()), 200
 
 @app.route("/summarize_calendar", methods=["POST"])
 def summarize_calendar():
@@ -129,22 +685,74 @@ def summarize_calendar():
     schedule = data.get("schedule", [])
     if not schedule:
         return jsonify({"message": "No events to summarize", "summary": "No events scheduled for this date."}), 200
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(gemini_summarizer_prompt)
-        summary = response.text.strip()
-        lines = summary.split('\n')
-        if lines and lines[0].startswith('```'):
-            lines = lines[1:]  # Remove first line
-        if lines and lines[-1].strip() == '```':
-            lines = lines[:-1]  # Remove last line
-        summary = '\n'.join(lines).strip()
-        return jsonify({"summary": summary}), 200
-        
-    except Exception as e:
-        logging.error(f"Error summarizing calendar: {str(e)}")
-        return jsonify({"message": "Failed to generate summary"}), 500
+    job, coalesced, error = submit_ai_job("summarize", summary_key(schedule), aiService.summarize, schedule)
+    if not job:
+        return error
+    job.wait()
+    return jsonify(job.result), job.statusCode
+
+@app.route("/summarize_calendar/stream", methods=["POST"])
+def stream_summarize_calendar():
+    # Same request as /summarize_calendar; answers with "token" messages as the summary is written, then "done"
+    logging.debug("Received POST request to /summarize_calendar/stream")
+    schedule = request.get_json().get("schedule", [])
+    if not schedule:
+        return stream_ai(replay_result, {"message": "No events to summarize", "summary": "No events scheduled for this date."})
+    return stream_ai(aiService.summarize_stream, schedule)
+
+def summary_key(schedule):
+    return hashlib.sha256(json.dumps(schedule, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+@app.route("/jobs/optimize_schedule", methods=["POST"])
+def submit_optimize_job():
+    logging.debug("Received POST request to /jobs/optimize_schedule")
+    schedule, allowed, cache_key, local_result, optimizer = parse_optimize_request(request.get_json())
+    if not schedule:
+        return jsonify({"message": "Empty Schedule Provided"}), 400
+    if local_result:
+        return jsonify({"jobId": None, "status": "done", "result": local_result, "statusCode": 200}), 200, {"X-Optimizer-Mode": "local"}
+    cached = optimizerCache.get(cache_key)
+    if cached is not None:
+        # Nothing to wait for, so the result comes back directly instead of a job id
+        return jsonify({"jobId": None, "status": "done", "result": cached, "statusCode": 200}), 200, {"X-Optimizer-Cache": "hit"}
+    job, coalesced, error = submit_ai_job("optimize", cache_key, optimizer, schedule, allowed, cache_key)
+    if not job:
+        return error
+    return jsonify({"jobId": job.id, "status": job.status, "coalesced": coalesced}), 202
+
+@app.route("/jobs/summarize_calendar", methods=["POST"])
+def submit_summarize_job():
+    logging.debug("Received POST request to /jobs/summarize_calendar")
+    schedule = request.get_json().get("schedule", [])
+    if not schedule:
+        return jsonify({"jobId": None, "status": "done", "result": {"message": "No events to summarize", "summary": "No events scheduled for this date."}, "statusCode": 200}), 200
+    job, coalesced, error = submit_ai_job("summarize", summary_key(schedule), aiService.summarize, schedule)
+    if not job:
+        return error
+    return jsonify({"jobId": job.id, "status": job.status, "coalesced": coalesced}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = ai_jobs.get(job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+    # ?wait=N long-polls for up to N seconds (capped at 30) before answering
+    wait = min(request.args.get("wait", 0, type=float), 30)
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job.to_json()), 200
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        init_db()
+    # debug=True runs this file in a file-watching parent as well; only the serving child runs background work
+    if is_running_from_reloader():
+        with app.app_context():
+            sqliteProfile.start_periodic_optimize(db.engine, app.config["DB_OPTIMIZE_INTERVAL"])
+        reminders.start_scheduler()
+        archive.start_periodic_archive(app.config["ARCHIVE_INTERVAL"], app.config["ARCHIVE_HORIZON_DAYS"])
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""In-process metrics for HTTP requests, SQL queries and model calls, rendered in the Prometheus text
+format by GET /metrics. Each server process reports its own numbers."""
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from config import app, db
+from threading import Lock
+import logging
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000, 100000)
+
+_lock = Lock()
+_registry = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}" if pairs else ""
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(key)} {_number(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]
+        self.values = {}
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+def render():
+    with _lock:
+        lines = [line for metric in _registry for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+REQUESTS = Counter("eventide_http_requests_total", "HTTP requests by route, method and status")
+REQUEST_LATENCY = Histogram("eventide_http_request_duration_seconds", "Time to build the response, by route", LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("eventide_http_request_queries", "SQL statements executed per request, by route", COUNT_BUCKETS)
+REQUEST_ROWS = Histogram("eventide_http_request_rows_read", "Schedule rows read per request, by route", COUNT_BUCKETS)
+QUERY_LATENCY = Histogram("eventide_db_query_duration_seconds", "SQL statement latency, by statement type", LATENCY_BUCKETS)
+LLM_CALLS = Counter("eventide_llm_calls_total", "Model calls by kind and outcome")
+LLM_PHASE = Histogram("eventide_llm_phase_duration_seconds", "Time spent per phase of an AI request (local, prompt, model, parse)", LATENCY_BUCKETS)
+LLM_FIRST_TOKEN = Histogram("eventide_llm_first_token_seconds", "Time from sending a streamed prompt to the first reply text", LATENCY_BUCKETS)
+LLM_PROMPT_BYTES = Histogram("eventide_llm_prompt_bytes", "Prompt size sent to the model", SIZE_BUCKETS)
+LLM_RESPONSE_BYTES = Histogram("eventide_llm_response_bytes", "Response size returned by the model", SIZE_BUCKETS)
+LLM_TOKENS = Counter("eventide_llm_tokens_total", "Tokens reported by the model, by kind and direction")
+REMINDERS = Counter("eventide_reminders_total", "Reminders delivered, by sink and outcome")
+REMINDER_LAG = Histogram("eventide_reminder_lag_seconds", "Delay between a reminder's due time and its delivery", LATENCY_BUCKETS)
+OPTIMIZER_CACHE = Counter("eventide_optimizer_cache_total", "Optimizer cache hits, misses and evictions")
+
+@contextmanager
+def phase(kind, name):
+    """Times one phase of an AI request into LLM_PHASE"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        LLM_PHASE.observe(time.perf_counter() - started, kind=kind, phase=name)
+
+def record_rows(count):
+    """Adds count schedule rows to the current request's read total"""
+    if has_request_context() and "metrics" in g:
+        g.metrics["rows"] += count
+
+@app.before_request
+def start_request_metrics():
+    g.metrics = {"started": time.perf_counter(), "queries": 0, "queryTime": 0.0, "rows": 0}
+
+@app.after_request
+def record_request_metrics(response):
+    stats = g.pop("metrics", None)
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats["started"]
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    REQUEST_LATENCY.observe(elapsed, route=route, method=request.method)
+    REQUEST_QUERIES.observe(stats["queries"], route=route)
+    if stats["rows"]:
+        REQUEST_ROWS.observe(stats["rows"], route=route)
+    threshold = app.config["SLOW_REQUEST_THRESHOLD"]
+    if threshold and elapsed >= threshold:
+        logging.warning(
+            f"Slow request {request.method} {request.full_path.rstrip('?')}: {elapsed * 1000:.1f} ms, "
+            f"{stats['queries']} queries in {stats['queryTime'] * 1000:.1f} ms, {stats['rows']} rows"
+        )
+    return response
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    words = statement.split(None, 1)
+    QUERY_LATENCY.observe(elapsed, operation=words[0].upper() if words else "OTHER")
+    if has_request_context() and "metrics" in g:
+        g.metrics["queries"] += 1
+        g.metrics["queryTime"] += elapsed
+    threshold = app.config["SLOW_QUERY_THRESHOLD"]
+    if threshold and elapsed >= threshold:
+        logging.warning(f"Slow query ({elapsed * 1000:.1f} ms): {' '.join(statement.split())[:300]}")
+
+def _discard_query_timer(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+with app.app_context():
+    event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(db.engine, "handle_error", _discard_query_timer)
@@ -0,0 +1,175 @@
+from sqlalchemy import inspect, text
+from config import db
+import sqliteProfile
+from models import Schedule, ScheduleArchive, event_info_columns
+import json
+import logging
+
+MIGRATION_BATCH_SIZE = 1000
+
+# Every write to schedule (ORM, bulk or raw SQL, from the API or db_action.py) bumps the change version.
+# Older entries for the same id are dropped, so the log holds one row per id and deletes stay as tombstones.
+# Moves between schedule and schedule_archive (see archive.py) aren't writes. A moved row is already in its
+# destination when it leaves its source, which is how the WHEN clauses tell a move from a real insert or delete.
+CHANGE_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+NOT_ARCHIVED = "NOT EXISTS (SELECT 1 FROM schedule_archive WHERE id = {row}.id)"
+NOT_RESTORED = "NOT EXISTS (SELECT 1 FROM schedule WHERE id = OLD.id)"
+CHANGE_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS {table}_changes_{event.lower()} AFTER {event} ON {table}{f" WHEN {when}" if when else ""} BEGIN
+        DELETE FROM schedule_changes WHERE "scheduleId" = {row}.id;
+        INSERT INTO schedule_changes ("scheduleId", op, "changedAt") VALUES ({row}.id, '{op}', {CHANGE_NOW});
+    END'''
+    for table, event, row, op, when in [
+        ('schedule', 'INSERT', 'NEW', 'upsert', NOT_ARCHIVED.format(row='NEW')),
+        ('schedule', 'UPDATE', 'NEW', 'upsert', None),
+        ('schedule', 'DELETE', 'OLD', 'delete', NOT_ARCHIVED.format(row='OLD')),
+        ('schedule_archive', 'DELETE', 'OLD', 'delete', NOT_RESTORED),
+    ]
+]
+# Writes to a recurring event or one of its overrides are logged as a 'series' entry under the negated rule id,
+# so they bump the same version (and ETag) as event writes without colliding with schedule ids
+CHANGE_TRIGGERS += [
+    f'''CREATE TRIGGER IF NOT EXISTS {table}_changes_{event.lower()} AFTER {event} ON {table} BEGIN
+        DELETE FROM schedule_changes WHERE "scheduleId" = -{row}.{column};
+        INSERT INTO schedule_changes ("scheduleId", op, "changedAt") VALUES (-{row}.{column}, 'series', {CHANGE_NOW});
+    END'''
+    for table, column in [('recurring_event', 'id'), ('recurrence_override', '"recurringId"')]
+    for event, row in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]
+]
+
+# Full-text index over titles and descriptions for /schedule/search. It is an external-content FTS5 table, so
+# the text lives only in schedule and the triggers below keep the index in step with every write.
+# Archived events stay in the index (their rowids join schedule_archive instead), so only real deletes drop them.
+# prefix='2 3' adds prefix indexes so the short, as-you-type prefixes don't scan the whole term list.
+SEARCH_TABLE = '''CREATE VIRTUAL TABLE schedule_fts USING fts5(
+    title, description, content='schedule', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)'''
+# Title matches count ten times as much as description matches in the bm25 rank
+SEARCH_RANK = "bm25(10.0, 1.0)"
+SEARCH_TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS schedule_fts_insert AFTER INSERT ON schedule WHEN {NOT_ARCHIVED.format(row='NEW')} BEGIN
+        INSERT INTO schedule_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS schedule_fts_delete AFTER DELETE ON schedule WHEN {NOT_ARCHIVED.format(row='OLD')} BEGIN
+        INSERT INTO schedule_fts (schedule_fts, rowid, title, description) VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS schedule_archive_fts_delete AFTER DELETE ON schedule_archive WHEN {NOT_RESTORED} BEGIN
+        INSERT INTO schedule_fts (schedule_fts, rowid, title, description) VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END''',
+    # Only updates that touch the indexed text re-index the row
+    '''CREATE TRIGGER IF NOT EXISTS schedule_fts_update AFTER UPDATE OF title, description ON schedule BEGIN
+        INSERT INTO schedule_fts (schedule_fts, rowid, title, description) VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        INSERT INTO schedule_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+    END''',
+]
+
+def init_db():
+    """Creates missing tables and upgrades existing ones in place. Must run inside an app context."""
+    db.create_all()
+    migrated = migrate_to_typed_columns()
+    migrated = migrate_to_autoincrement() or migrated
+    # create_all only adds indexes along with new tables; ones added to an existing table are created here
+    for table in (Schedule.__table__, ScheduleArchive.__table__):
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    repair = drop_pre_archive_triggers()
+    ensure_change_triggers(repair_archived=repair)
+    ensure_search_index(rebuild=migrated, repair_archived=repair)
+    # A rebuilt table gets fresh planner statistics; otherwise only stale ones are refreshed
+    sqliteProfile.analyze(db.engine, full=migrated)
+
+def migrate_to_typed_columns():
+    """Rebuilds a schedule table still keyed on the eventInfo JSON blob into the typed-column layout.
+    Ids are kept, and the change log is left alone since no event's API payload changes.
+    Returns whether a rebuild happened."""
+    existing = {column['name'] for column in inspect(db.engine).get_columns('schedule')}
+    if 'eventInfo' not in existing:
+        return False
+    with db.engine.begin() as conn:
+        _replace_schedule_table(conn)
+        migrated = 0
+        result = conn.execute(text('SELECT id, "eventInfo" FROM schedule_legacy ORDER BY id'))
+        while rows := result.fetchmany(MIGRATION_BATCH_SIZE):
+            conn.execute(Schedule.__table__.insert(), [
+                {'id': row[0], **event_info_columns(json.loads(row[1]) if row[1] else {})} for row in rows
+            ])
+            migrated += len(rows)
+        conn.execute(text('DROP TABLE schedule_legacy'))
+    logging.info(f"Migrated {migrated} schedule rows to typed columns")
+    return True
+
+def migrate_to_autoincrement():
+    """Rebuilds a schedule table created without AUTOINCREMENT. Without it SQLite reuses the highest id once
+    that row is deleted, which would let a new event take the id of an archived one. Returns whether a rebuild happened."""
+    with db.engine.begin() as conn:
+        created = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'schedule'")).scalar()
+        if 'AUTOINCREMENT' in created.upper():
+            return False
+        _replace_schedule_table(conn)
+        columns = ', '.join(f'"{column.name}"' for column in Schedule.__table__.columns)
+        migrated = conn.execute(text(f'INSERT INTO schedule ({columns}) SELECT {columns} FROM schedule_legacy')).rowcount
+        conn.execute(text('DROP TABLE schedule_legacy'))
+    logging.info(f"Rebuilt the schedule table ({migrated} rows) with AUTOINCREMENT ids")
+    return True
+
+def _replace_schedule_table(conn):
+    """Renames schedule to schedule_legacy and creates an empty schedule table in the current layout"""
+    # Renaming would carry the old indexes and triggers along; they are recreated on the new table
+    for index in inspect(conn).get_indexes('schedule'):
+        conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+    for trigger in ('insert', 'update', 'delete'):
+        conn.execute(text(f'DROP TRIGGER IF EXISTS schedule_changes_{trigger}'))
+        conn.execute(text(f'DROP TRIGGER IF EXISTS schedule_fts_{trigger}'))
+    conn.execute(text('ALTER TABLE schedule RENAME TO schedule_legacy'))
+    Schedule.__table__.create(conn)
+
+def drop_pre_archive_triggers():
+    """Drops insert and delete triggers from before moves to the archive were skipped, so they are recreated
+    with their WHEN clause. Returns whether events were archived under them: those were logged as deletes
+    and dropped from the search index, and need repairing."""
+    with db.engine.begin() as conn:
+        stale = conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN "
+            "('schedule_changes_insert', 'schedule_changes_delete', 'schedule_fts_insert', 'schedule_fts_delete') "
+            "AND sql NOT LIKE '%schedule_archive%'"
+        )).scalars().all()
+        for name in stale:
+            conn.execute(text(f'DROP TRIGGER "{name}"'))
+        return bool(stale) and conn.execute(text('SELECT 1 FROM schedule_archive LIMIT 1')).first() is not None
+
+def ensure_change_triggers(repair_archived=False):
+    with db.engine.begin() as conn:
+        for statement in CHANGE_TRIGGERS:
+            conn.execute(text(statement))
+        if repair_archived:
+            # Tombstones of archived events become upserts under new versions, so clients that applied them get the events back
+            revived = conn.execute(text(
+                f'INSERT INTO schedule_changes ("scheduleId", op, "changedAt") SELECT "scheduleId", \'upsert\', {CHANGE_NOW} '
+                'FROM schedule_changes WHERE op = \'delete\' AND "scheduleId" IN (SELECT id FROM schedule_archive) ORDER BY version'
+            )).rowcount
+            conn.execute(text('DELETE FROM schedule_changes WHERE op = \'delete\' AND "scheduleId" IN (SELECT id FROM schedule_archive)'))
+            logging.info(f"Replaced {revived} archived events' tombstones in the change log")
+        # Rows that predate the change log are recorded once so a sync from version 0 sees them
+        if conn.execute(text('SELECT 1 FROM schedule_changes LIMIT 1')).first() is None:
+            seeded = conn.execute(text(
+                f'INSERT INTO schedule_changes ("scheduleId", op, "changedAt") SELECT id, \'upsert\', {CHANGE_NOW} FROM schedule ORDER BY id'
+            )).rowcount
+            if seeded:
+                logging.info(f"Seeded change log with {seeded} existing schedule rows")
+
+def ensure_search_index(rebuild=False, repair_archived=False):
+    """Creates the full-text index and its triggers if missing. A new index, or one whose schedule table was
+    just rebuilt, is filled from the existing rows, archived ones included."""
+    with db.engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'schedule_fts'")).first() is None:
+            conn.execute(text(SEARCH_TABLE))
+            conn.execute(text(f"INSERT INTO schedule_fts (schedule_fts, rank) VALUES ('rank', '{SEARCH_RANK}')"))
+            rebuild = True
+        for statement in SEARCH_TRIGGERS:
+            conn.execute(text(statement))
+        if rebuild:
+            conn.execute(text("INSERT INTO schedule_fts (schedule_fts) VALUES ('rebuild')"))
+            logging.info("Rebuilt the schedule search index")
+        if rebuild or repair_archived:
+            # 'rebuild' only reads the content table, schedule
+            conn.execute(text("INSERT INTO schedule_fts (rowid, title, description) SELECT id, title, description FROM schedule_archive"))
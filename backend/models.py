@@ -1,20 +1,197 @@
+import re
 from config import db
 
-class Schedule(db.Model):
+# Same formats the frontend's parseTime accepts: "HH:MM AM/PM" or 24-hour "HH:MM"
+TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})\s*(AM|PM)?$', re.IGNORECASE)
+
+def time_to_minutes(time_str):
+    """Converts an event time string to minutes past midnight, or None if it can't be parsed"""
+    match = TIME_PATTERN.match(time_str.strip()) if isinstance(time_str, str) else None
+    if not match:
+        return None
+    hours, minutes, period = int(match.group(1)), int(match.group(2)), match.group(3)
+    if period:
+        hours = hours % 12 + (12 if period.upper() == 'PM' else 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+# Ordered from least to most urgent
+URGENCY_LEVELS = ['trivial', 'ongoing', 'attention-needed', 'important', 'critical']
+
+def minutes_to_time(minutes):
+    """Formats minutes past midnight the way the frontend's minutesToTime does, e.g. "02:30 PM" """
+    hours, mins = divmod(minutes, 60)
+    return f"{hours % 12 or 12:02d}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+# eventInfo keys with a typed column of their own; other keys, and values a column can't hold as-is, go to extras
+TEXT_FIELDS = ('title', 'startDate', 'endDate', 'description', 'type')
+BOOL_FIELDS = ('locked', 'reminder')
+TIME_FIELDS = (('start', 'startMinutes'), ('end', 'endMinutes'))
+
+def event_info_columns(info):
+    """Splits an eventInfo dict into Schedule column values; event_info_columns(x) round-trips through Schedule.eventInfo"""
+    columns = {'title': None, 'startDate': None, 'endDate': None, 'startMinutes': None, 'endMinutes': None,
+               'description': None, 'locked': None, 'type': None, 'urgency': None, 'reminder': None}
+    extras = {}
+    for key, value in info.items():
+        if key in TEXT_FIELDS and isinstance(value, str):
+            columns[key] = value
+        elif key in BOOL_FIELDS and isinstance(value, bool):
+            columns[key] = value
+        elif key == 'urgency' and value in URGENCY_LEVELS:
+            columns[key] = URGENCY_LEVELS.index(value)
+        elif key in ('start', 'end'):
+            minutes = time_to_minutes(value)
+            columns[key + 'Minutes'] = minutes
+            # Times not already in "HH:MM AM/PM" form keep their original spelling for the API
+            if minutes is None or minutes_to_time(minutes) != value:
+                extras[key] = value
+        else:
+            extras[key] = value
+    columns['extras'] = extras or None
+    return columns
+
+# Rows the reminder scheduler fires for; queries repeat this exact text so SQLite can use the partial index below
+REMINDER_DUE = "(reminder = 1 OR type = 'reminder')"
+
+def _field(extras, key, value, default=None):
+    if key in extras:
+        return extras[key]
+    return default if value is None else value
+
+class EventColumns:
+    """Typed event columns shared by the live schedule table and its archive"""
     id = db.Column(db.Integer, primary_key=True)
-    eventInfo = db.Column(db.JSON, unique=False, nullable=False)
+    # NULL means the key was absent from eventInfo, so defaults are applied on read exactly as before
+    title = db.Column(db.String)
+    startDate = db.Column(db.String(10))
+    endDate = db.Column(db.String(10))
+    startMinutes = db.Column(db.Integer)
+    endMinutes = db.Column(db.Integer)
+    description = db.Column(db.Text)
+    locked = db.Column(db.Boolean)
+    type = db.Column(db.String(10))
+    urgency = db.Column(db.SmallInteger)  # index into URGENCY_LEVELS
+    reminder = db.Column(db.Boolean)
+    extras = db.Column(db.JSON)
+
+    @property
+    def eventInfo(self):
+        info = {key: getattr(self, key) for key in TEXT_FIELDS + BOOL_FIELDS if getattr(self, key) is not None}
+        for key, column in TIME_FIELDS:
+            if getattr(self, column) is not None:
+                info[key] = minutes_to_time(getattr(self, column))
+        if self.urgency is not None:
+            info['urgency'] = URGENCY_LEVELS[self.urgency]
+        info.update(self.extras or {})
+        return info
+
+    @eventInfo.setter
+    def eventInfo(self, info):
+        for column, value in event_info_columns(info).items():
+            setattr(self, column, value)
 
     def to_json(self):
-        return {
-            'id': self.id,
-            'startDate': self.eventInfo.get('startDate'),
-            'endDate': self.eventInfo.get('endDate'),
-            'title': self.eventInfo.get('title'),
-            'start': self.eventInfo.get('start'),
-            'end': self.eventInfo.get('end'),
-            'description': self.eventInfo.get('description', ''),
-            'locked': self.eventInfo.get('locked', False),
-            'type': self.eventInfo.get('type', 'event'),
-            'urgency': self.eventInfo.get('urgency','trivial')
-            # trivial, ongoing, attention-needed, important, critical
-        }
\ No newline at end of file
+        return schedule_row_json((
+            self.id, self.startDate, self.endDate, self.title, self.startMinutes, self.endMinutes,
+            self.description, self.locked, self.type, self.urgency, self.extras,
+        ))
+
+class Schedule(EventColumns, db.Model):
+    # Both orderings so the planner can start from whichever side of the window is more selective
+    __table_args__ = (
+        db.Index('ix_schedule_start_end', 'startDate', 'endDate'),
+        db.Index('ix_schedule_end_start', 'endDate', 'startDate'),
+        # Keyset pages of the full listing in start order (see scheduleListing.py)
+        db.Index('ix_schedule_start_id', 'startDate', 'id'),
+        # Only the rows the reminder scheduler loads, in due order
+        db.Index('ix_schedule_reminder_due', 'startDate', 'startMinutes', sqlite_where=db.text(REMINDER_DUE)),
+        # Ids of deleted and archived events are never handed out again
+        {'sqlite_autoincrement': True},
+    )
+
+class ScheduleArchive(EventColumns, db.Model):
+    """Past events moved out of schedule by archive.py; ids are the ones they had in schedule"""
+    __tablename__ = 'schedule_archive'
+    __table_args__ = (
+        db.Index('ix_schedule_archive_start_end', 'startDate', 'endDate'),
+        db.Index('ix_schedule_archive_end_start', 'endDate', 'startDate'),
+        db.Index('ix_schedule_archive_start_id', 'startDate', 'id'),
+    )
+
+    archivedAt = db.Column(db.Float)
+
+# Columns schedule_row_json needs, for read paths that select row tuples instead of loading Schedule objects
+SCHEDULE_JSON_COLUMNS = (
+    Schedule.id, Schedule.startDate, Schedule.endDate, Schedule.title, Schedule.startMinutes, Schedule.endMinutes,
+    Schedule.description, Schedule.locked, Schedule.type, Schedule.urgency, Schedule.extras,
+)
+ARCHIVE_JSON_COLUMNS = tuple(getattr(ScheduleArchive, column.key) for column in SCHEDULE_JSON_COLUMNS)
+# Per table, for reads that take rows from both schedule and its archive
+JSON_COLUMNS = {Schedule: SCHEDULE_JSON_COLUMNS, ScheduleArchive: ARCHIVE_JSON_COLUMNS}
+
+def schedule_row_json(row):
+    """API shape of one event from a SCHEDULE_JSON_COLUMNS row"""
+    schedule_id, start_date, end_date, title, start_minutes, end_minutes, description, locked, event_type, urgency, extras = row
+    extras = extras or {}
+    return {
+        'id': schedule_id,
+        'startDate': _field(extras, 'startDate', start_date),
+        'endDate': _field(extras, 'endDate', end_date),
+        'title': _field(extras, 'title', title),
+        'start': _field(extras, 'start', None if start_minutes is None else minutes_to_time(start_minutes)),
+        'end': _field(extras, 'end', None if end_minutes is None else minutes_to_time(end_minutes)),
+        'description': _field(extras, 'description', description, ''),
+        'locked': _field(extras, 'locked', locked, False),
+        'type': _field(extras, 'type', event_type, 'event'),
+        'urgency': _field(extras, 'urgency', None if urgency is None else URGENCY_LEVELS[urgency], 'trivial')
+        # trivial, ongoing, attention-needed, important, critical
+    }
+
+class ScheduleChange(db.Model):
+    """One row per schedule id holding the version of its latest write; written by triggers (see migrations.py)"""
+    __tablename__ = 'schedule_changes'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    version = db.Column(db.Integer, primary_key=True)
+    scheduleId = db.Column(db.Integer, nullable=False, index=True)
+    op = db.Column(db.String(6), nullable=False)  # upsert, delete or series (scheduleId is then the negated recurring event id)
+    changedAt = db.Column(db.Float, nullable=False)
+
+class OptimizerCache(db.Model):
+    __tablename__ = 'optimizer_cache'
+
+    key = db.Column(db.String(64), primary_key=True)
+    response = db.Column(db.JSON, nullable=False)
+    createdAt = db.Column(db.Float, nullable=False)
+    lastUsed = db.Column(db.Float, nullable=False, index=True)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+
+class RecurringEvent(db.Model):
+    """A repeating event stored once; occurrences are expanded per requested window (see recurrence.py)"""
+    __tablename__ = 'recurring_event'
+    __table_args__ = (db.Index('ix_recurring_event_first_last', 'firstDate', 'lastDate'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    eventInfo = db.Column(db.JSON, nullable=False)  # the first occurrence
+    freq = db.Column(db.String(7), nullable=False)  # daily, weekly or monthly
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    byDay = db.Column(db.JSON)  # weekday numbers (0 = Monday) for weekly rules
+    until = db.Column(db.String(10))
+    count = db.Column(db.Integer)
+    exdates = db.Column(db.JSON)
+    firstDate = db.Column(db.String(10), nullable=False)
+    lastDate = db.Column(db.String(10))  # end date of the last occurrence, NULL when the rule never ends
+
+class RecurrenceOverride(db.Model):
+    """One edited or deleted occurrence of a RecurringEvent, keyed by the date the rule put it on"""
+    __tablename__ = 'recurrence_override'
+    __table_args__ = (db.Index('ix_recurrence_override_start_end', 'startDate', 'endDate'),)
+
+    recurringId = db.Column(db.Integer, primary_key=True)
+    occurrenceDate = db.Column(db.String(10), primary_key=True)
+    eventInfo = db.Column(db.JSON)  # NULL when the occurrence was deleted
+    # Where the edited occurrence now sits, so one moved into a window is found from there
+    startDate = db.Column(db.String(10))
+    endDate = db.Column(db.String(10))
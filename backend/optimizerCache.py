@@ -0,0 +1,92 @@
+from config import app, db
+from models import OptimizerCache, time_to_minutes
+from aiPrompts import optimizer_prompt_version
+from threading import Lock
+import metrics
+import hashlib
+import json
+import logging
+import time
+
+# Fields from the optimizer template; anything else the client sends (e.g. primaryDate) doesn't change the answer
+EVENT_FIELDS = ['description', 'end', 'endDate', 'id', 'locked', 'start', 'startDate', 'title', 'type', 'urgency']
+
+_stats_lock = Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def _normalize_event(event):
+    normalized = {field: event.get(field) for field in EVENT_FIELDS}
+    # "9:00 AM" and "09:00 AM" are the same schedule
+    for field in ('start', 'end'):
+        minutes = time_to_minutes(normalized[field])
+        if minutes is not None:
+            normalized[field] = minutes
+    return normalized
+
+def cache_key(schedule, allowed, variant=None):
+    """Hashes the normalized schedule, the allowed modifications and the prompt version/format into a cache key.
+    variant separates replies produced a different way (e.g. chunked) for the same schedule."""
+    events = sorted((_normalize_event(event) for event in schedule), key=lambda event: json.dumps(event, sort_keys=True, default=str))
+    canonical = json.dumps({
+        'schedule': events,
+        'allowed': sorted(set(allowed)),
+        'version': optimizer_prompt_version,
+        'format': app.config["AI_PROMPT_FORMAT"],
+        'variant': variant,
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+    metrics.OPTIMIZER_CACHE.inc(amount, result=stat)
+
+def _commit_bookkeeping(what):
+    # A locked database or failed write while tidying up must not turn a lookup into an error
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.warning(f"Optimizer cache {what} not recorded: {str(e)}")
+
+def get(key):
+    """Returns the cached response body for key, or None on a miss or an expired entry"""
+    entry = db.session.get(OptimizerCache, key)
+    now = time.time()
+    if entry and now - entry.createdAt > app.config["OPTIMIZER_CACHE_TTL"]:
+        db.session.delete(entry)
+        _commit_bookkeeping("expiry")
+        entry = None
+    if not entry:
+        _count('misses')
+        return None
+    response = entry.response
+    entry.lastUsed = now
+    entry.hits += 1
+    _commit_bookkeeping("hit")
+    _count('hits')
+    return response
+
+def put(key, response):
+    now = time.time()
+    db.session.merge(OptimizerCache(key=key, response=response, createdAt=now, lastUsed=now, hits=0))
+    db.session.flush()
+    # Least recently used entries past the size limit are evicted in one statement
+    evicted = db.session.execute(db.text(
+        'DELETE FROM optimizer_cache WHERE key IN '
+        '(SELECT key FROM optimizer_cache ORDER BY "lastUsed" DESC LIMIT -1 OFFSET :limit)'
+    ), {'limit': app.config["OPTIMIZER_CACHE_MAX_ENTRIES"]}).rowcount
+    db.session.commit()
+    if evicted:
+        _count('evictions', evicted)
+        logging.debug(f"Evicted {evicted} optimizer cache entries")
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    lookups = snapshot['hits'] + snapshot['misses']
+    snapshot['hitRate'] = round(snapshot['hits'] / lookups, 4) if lookups else 0.0
+    snapshot['entries'] = db.session.query(OptimizerCache).count()
+    snapshot['ttl'] = app.config["OPTIMIZER_CACHE_TTL"]
+    snapshot['maxEntries'] = app.config["OPTIMIZER_CACHE_MAX_ENTRIES"]
+    return snapshot
@@ -0,0 +1,252 @@
+"""Recurring events. A rule is stored once in recurring_event and only expanded into occurrences for the
+window a read asks for; the expansion is memoized per (rule, window), so repeated reads of the same days
+cost a dictionary lookup. Edits and deletions of single occurrences are recurrence_override rows applied
+on top. Occurrences carry string ids like "r12:2025-03-04" (rule 12, occurrence of March 4th)."""
+from calendar import monthrange
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import islice
+from typing import NamedTuple
+from sqlalchemy import and_, or_
+from config import db
+from models import RecurringEvent, RecurrenceOverride, event_info_columns, schedule_row_json
+from dateUtils import parse_date, DATE_FORMAT
+import re
+
+FREQUENCIES = ("daily", "weekly", "monthly")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 5000
+EXPANSION_CACHE_SIZE = 4096
+OCCURRENCE_ID = re.compile(r"^r(\d+):(\d{4}-\d{2}-\d{2})$")
+
+class Rule(NamedTuple):
+    """Hashable form of a RecurringEvent's rule, used as the memoization key"""
+    freq: str
+    interval: int
+    first: date
+    by_day: tuple
+    until: date
+    count: int
+    exdates: frozenset
+
+def rule_of(recurring):
+    return Rule(recurring.freq, recurring.interval, parse_date(recurring.firstDate), tuple(recurring.byDay or ()),
+                parse_date(recurring.until), recurring.count, frozenset(recurring.exdates or ()))
+
+def _iter_dates(rule, start):
+    """Occurrence start dates on or after start, in order; honours until but not count or exceptions"""
+    start = max(start, rule.first)
+    if rule.freq == "daily":
+        k = -(-(start - rule.first).days // rule.interval)
+        day = rule.first + timedelta(days=k * rule.interval)
+        while rule.until is None or day <= rule.until:
+            yield day
+            day += timedelta(days=rule.interval)
+    elif rule.freq == "weekly":
+        week = rule.first - timedelta(days=rule.first.weekday())
+        period = 7 * rule.interval
+        k = (start - week).days // period
+        while True:
+            base = week + timedelta(days=k * period)
+            for weekday in rule.by_day:
+                day = base + timedelta(days=weekday)
+                if day < start:
+                    continue
+                if rule.until is not None and day > rule.until:
+                    return
+                yield day
+            k += 1
+    else:
+        # Monthly on the first occurrence's day of the month; months too short for it are skipped
+        first_month = rule.first.year * 12 + rule.first.month - 1
+        k = max(0, (start.year * 12 + start.month - 1 - first_month) // rule.interval)
+        while True:
+            year, month = divmod(first_month + k * rule.interval, 12)
+            if rule.until is not None and date(year, month + 1, 1) > rule.until:
+                return
+            if rule.first.day <= monthrange(year, month + 1)[1]:
+                day = date(year, month + 1, rule.first.day)
+                if day >= start:
+                    if rule.until is not None and day > rule.until:
+                        return
+                    yield day
+            k += 1
+
+@lru_cache(maxsize=EXPANSION_CACHE_SIZE)
+def last_date(rule):
+    """Start date of the final occurrence, or None for a rule that never ends"""
+    if rule.count:
+        # Exceptions still use up their place in the count, as in RFC 5545
+        dates = list(islice(_iter_dates(rule, rule.first), rule.count))
+        return dates[-1] if dates else rule.first
+    return rule.until
+
+@lru_cache(maxsize=EXPANSION_CACHE_SIZE)
+def occurrence_dates(rule, start, end):
+    """Start dates (YYYY-MM-DD) of the occurrences from start to end inclusive, exceptions removed"""
+    last = last_date(rule)
+    dates = []
+    for day in _iter_dates(rule, start):
+        if day > end or (last is not None and day > last):
+            break
+        formatted = day.strftime(DATE_FORMAT)
+        if formatted not in rule.exdates:
+            dates.append(formatted)
+    return tuple(dates)
+
+def is_occurrence(recurring, day):
+    parsed = parse_date(day)
+    return parsed is not None and day in occurrence_dates(rule_of(recurring), parsed, parsed)
+
+def parse_occurrence_id(value):
+    """(rule id, occurrence date) for an occurrence id, None for anything else"""
+    match = OCCURRENCE_ID.match(value) if isinstance(value, str) else None
+    return (int(match.group(1)), match.group(2)) if match else None
+
+def _span_days(info):
+    return (parse_date(info['endDate']) - parse_date(info['startDate'])).days
+
+# Rows in SCHEDULE_JSON_COLUMNS order, so occurrences go through the same shaping as stored events
+
+def _row(occurrence_id, columns, start_date=None, end_date=None):
+    return (occurrence_id, start_date or columns['startDate'], end_date or columns['endDate'], columns['title'],
+            columns['startMinutes'], columns['endMinutes'], columns['description'], columns['locked'],
+            columns['type'], columns['urgency'], columns['extras'])
+
+def occurrence_rows(start, end):
+    """Yields (row, rule id, occurrence date) for every occurrence overlapping start..end (YYYY-MM-DD),
+    with overrides applied"""
+    rules = RecurringEvent.query.filter(RecurringEvent.firstDate <= end,
+                                        or_(RecurringEvent.lastDate == None, RecurringEvent.lastDate >= start)).all()
+    if not rules:
+        return
+    window_start, window_end = parse_date(start), parse_date(end)
+    spans = {recurring.id: _span_days(recurring.eventInfo) for recurring in rules}
+    earliest = (window_start - timedelta(days=max(spans.values()))).strftime(DATE_FORMAT)
+    # Overrides for occurrences the rules put in the window, and edited ones that were moved into it
+    overrides = {(override.recurringId, override.occurrenceDate): override for override in RecurrenceOverride.query.filter(
+        RecurrenceOverride.recurringId.in_(spans),
+        or_(RecurrenceOverride.occurrenceDate.between(earliest, end),
+            and_(RecurrenceOverride.startDate <= end, RecurrenceOverride.endDate >= start)),
+    )}
+    overlaps = lambda override: override.eventInfo is not None and override.startDate <= end and override.endDate >= start
+    for recurring in rules:
+        span = spans[recurring.id]
+        template = event_info_columns(recurring.eventInfo)
+        rule = rule_of(recurring)
+        for day in occurrence_dates(rule, window_start - timedelta(days=span), window_end):
+            occurrence_id = f"r{recurring.id}:{day}"
+            override = overrides.pop((recurring.id, day), None)
+            if override is None:
+                end_date = (parse_date(day) + timedelta(days=span)).strftime(DATE_FORMAT)
+                yield _row(occurrence_id, template, day, end_date), recurring.id, day
+            elif overlaps(override):
+                yield _row(occurrence_id, event_info_columns(override.eventInfo)), recurring.id, day
+    rules_by_id = {recurring.id: recurring for recurring in rules}
+    for (recurring_id, day), override in sorted(overrides.items()):
+        if overlaps(override) and is_occurrence(rules_by_id[recurring_id], day):
+            yield _row(f"r{recurring_id}:{day}", event_info_columns(override.eventInfo)), recurring_id, day
+
+def occurrences(start, end):
+    """API events for the occurrences overlapping start..end"""
+    events = []
+    for row, recurring_id, day in occurrence_rows(start, end):
+        event = schedule_row_json(row)
+        event['recurringId'] = recurring_id
+        event['occurrenceDate'] = day
+        events.append(event)
+    return events
+
+# Writing rules and overrides
+
+def _parse_rrule(text):
+    """Reads an RRULE string such as "FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20251231" into the dict form"""
+    parts = dict(part.split("=", 1) for part in text.removeprefix("RRULE:").split(";") if "=" in part)
+    value = {"freq": parts.get("FREQ", "").lower()}
+    if "INTERVAL" in parts:
+        value["interval"] = int(parts["INTERVAL"]) if parts["INTERVAL"].isdigit() else parts["INTERVAL"]
+    if "BYDAY" in parts:
+        value["byDay"] = parts["BYDAY"].split(",")
+    if "UNTIL" in parts:
+        until = parts["UNTIL"][:8]
+        value["until"] = f"{until[:4]}-{until[4:6]}-{until[6:]}"
+    if "COUNT" in parts:
+        value["count"] = int(parts["COUNT"]) if parts["COUNT"].isdigit() else parts["COUNT"]
+    return value
+
+def _positive_int(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+def parse_recurrence(value, first_date):
+    """Validates a recurrence given as {"freq", "interval", "byDay", "until", "count", "exdates"} or as an
+    RRULE string. Returns RecurringEvent column values; raises ValueError describing the first problem."""
+    if isinstance(value, str):
+        value = _parse_rrule(value)
+    if not isinstance(value, dict):
+        raise ValueError("recurrence must be an object or an RRULE string")
+    freq = str(value.get("freq", "")).lower()
+    if freq not in FREQUENCIES:
+        raise ValueError(f"recurrence freq must be one of {', '.join(FREQUENCIES)}")
+    interval = value.get("interval", 1)
+    if not _positive_int(interval):
+        raise ValueError("recurrence interval must be a positive integer")
+    by_day = value.get("byDay")
+    if by_day is not None and freq != "weekly":
+        raise ValueError("byDay is only supported for weekly rules")
+    if freq == "weekly":
+        codes = by_day if by_day is not None else [WEEKDAYS[parse_date(first_date).weekday()]]
+        if not isinstance(codes, list) or not codes or any(str(code).upper() not in WEEKDAYS for code in codes):
+            raise ValueError(f"byDay must be a non-empty list of {', '.join(WEEKDAYS)}")
+        by_day = sorted({WEEKDAYS.index(str(code).upper()) for code in codes})
+    until, count = value.get("until"), value.get("count")
+    if until is not None and count is not None:
+        raise ValueError("recurrence takes until or count, not both")
+    if until is not None and not (parse_date(until) and until >= first_date):
+        raise ValueError("recurrence until must be a YYYY-MM-DD date on or after startDate")
+    if count is not None and not (_positive_int(count) and count <= MAX_COUNT):
+        raise ValueError(f"recurrence count must be a positive integer up to {MAX_COUNT}")
+    exdates = value.get("exdates", [])
+    if not isinstance(exdates, list) or not all(parse_date(day) for day in exdates):
+        raise ValueError("recurrence exdates must be a list of YYYY-MM-DD dates")
+    return {"freq": freq, "interval": interval, "byDay": by_day, "until": until, "count": count,
+            "exdates": sorted(set(exdates)) or None}
+
+def apply_rule(recurring, event_info, columns):
+    """Writes the first occurrence and rule columns onto recurring, deriving the date bounds used for lookups"""
+    recurring.eventInfo = event_info
+    for column, value in columns.items():
+        setattr(recurring, column, value)
+    recurring.firstDate = event_info['startDate']
+    last = last_date(rule_of(recurring))
+    recurring.lastDate = (last + timedelta(days=_span_days(event_info))).strftime(DATE_FORMAT) if last else None
+
+def recurrence_json(recurring):
+    return {
+        "freq": recurring.freq,
+        "interval": recurring.interval,
+        "byDay": [WEEKDAYS[day] for day in recurring.byDay] if recurring.byDay else None,
+        "until": recurring.until,
+        "count": recurring.count,
+        "exdates": recurring.exdates or [],
+    }
+
+def to_json(recurring):
+    return {"id": recurring.id, "eventInfo": recurring.eventInfo, "recurrence": recurrence_json(recurring),
+            "firstDate": recurring.firstDate, "lastDate": recurring.lastDate}
+
+def set_override(recurring_id, day, event_info):
+    """Records an edited occurrence, or a deleted one when event_info is None. The caller commits."""
+    override = db.session.get(RecurrenceOverride, (recurring_id, day)) or RecurrenceOverride(recurringId=recurring_id, occurrenceDate=day)
+    override.eventInfo = event_info
+    override.startDate = event_info['startDate'] if event_info else None
+    override.endDate = event_info['endDate'] if event_info else None
+    db.session.add(override)
+    return override
+
+def drop_stale_overrides(recurring):
+    """Deletes overrides of dates the (edited) rule no longer produces. Returns how many went."""
+    stale = [override for override in RecurrenceOverride.query.filter_by(recurringId=recurring.id)
+             if not is_occurrence(recurring, override.occurrenceDate)]
+    for override in stale:
+        db.session.delete(override)
+    return len(stale)
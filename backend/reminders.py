@@ -0,0 +1,165 @@
+"""Reminder dispatch. Upcoming due times sit in a min-heap, loaded once at startup from the partial
+ix_schedule_reminder_due index and then kept current from the schedule event broker, so the table is never
+rescanned. One daemon thread sleeps until the earliest deadline and hands due reminders to the configured sinks."""
+from datetime import datetime, timedelta
+from itertools import count
+from sqlalchemy import text
+from threading import Condition, Thread
+from config import app, db
+from models import Schedule, SCHEDULE_JSON_COLUMNS, REMINDER_DUE, schedule_row_json, time_to_minutes
+from dateUtils import parse_date
+from scheduleEvents import broker
+import heapq
+import json
+import logging
+import metrics
+import time
+import urllib.request
+
+WEBHOOK_TIMEOUT = 5
+
+def due_at(start_date, start_minutes, event_type, lead_minutes):
+    """Epoch seconds a reminder fires: the event's start, less the lead time unless it's a reminder item"""
+    day = parse_date(start_date)
+    if day is None:
+        return None
+    lead = 0 if event_type == 'reminder' else lead_minutes
+    moment = datetime(day.year, day.month, day.day) + timedelta(minutes=(start_minutes or 0) - lead)
+    return moment.timestamp()
+
+# Sinks take (event as JSON, due time in epoch seconds) and raise on a failed delivery
+
+def log_sink(event, due):
+    logging.info(f"Reminder: {event['title']} at {event['startDate']} {event['start']} (id {event['id']})")
+
+def sse_sink(event, due):
+    # Reaches /schedule/stream subscribers whose window covers the event, as an "event: reminder" message
+    broker.publish({"op": "reminder", "id": event['id'], "spans": [[event['startDate'], event['endDate']]], "event": event})
+
+def webhook_sink(url):
+    def deliver(event, due):
+        body = json.dumps({"id": event['id'], "dueAt": datetime.fromtimestamp(due).isoformat(timespec="minutes"), "event": event})
+        request = urllib.request.Request(url, data=body.encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT) as response:
+            response.read()
+    return deliver
+
+def build_sinks(names, webhook_url):
+    """{name: sink} for a comma-separated list such as "log,sse"; raises ValueError on an unknown name"""
+    available = {"log": lambda: log_sink, "sse": lambda: sse_sink, "webhook": lambda: webhook_sink(webhook_url)}
+    sinks = {}
+    for name in filter(None, (name.strip() for name in names.split(","))):
+        if name not in available:
+            raise ValueError(f"unknown reminder sink {name!r}; expected some of {', '.join(available)}")
+        sinks[name] = available[name]()
+    return sinks
+
+class ReminderScheduler:
+    def __init__(self, sinks, lead_minutes=0, grace_seconds=0):
+        self.sinks = sinks
+        self.lead_minutes = lead_minutes
+        self.grace_seconds = grace_seconds
+        self.condition = Condition()
+        # (due, sequence, schedule id); entries whose due no longer matches self.due are stale and skipped
+        self.heap = []
+        self.due = {}
+        self.sequence = count()
+        self.thread = None
+
+    def load(self):
+        """Queues every reminder due from grace_seconds ago on; must run inside an app context"""
+        earliest = time.time() - self.grace_seconds
+        first_day = datetime.fromtimestamp(earliest).strftime("%Y-%m-%d")
+        rows = db.session.query(Schedule.id, Schedule.startDate, Schedule.startMinutes, Schedule.type) \
+            .filter(text(REMINDER_DUE), Schedule.startDate >= first_day)
+        with self.condition:
+            for schedule_id, start_date, start_minutes, event_type in rows:
+                due = due_at(start_date, start_minutes, event_type, self.lead_minutes)
+                # A reminder the listener already queued was written after this query read it
+                if due is not None and due >= earliest and schedule_id not in self.due:
+                    self._push(schedule_id, due)
+            self.condition.notify()
+        logging.info(f"Reminder scheduler loaded {len(self.due)} upcoming reminders")
+
+    def _push(self, schedule_id, due):
+        self.due[schedule_id] = due
+        heapq.heappush(self.heap, (due, next(self.sequence), schedule_id))
+
+    def on_schedule_event(self, message):
+        """Broker listener: reschedules or drops the reminder of a created, updated or deleted event"""
+        if message["op"] not in ("create", "update", "delete"):
+            return
+        event = message["event"]
+        due = None
+        if event and (message.get("reminder") or event['type'] == 'reminder'):
+            due = due_at(event['startDate'], time_to_minutes(event['start']), event['type'], self.lead_minutes)
+        with self.condition:
+            if due is None or due < time.time():
+                self.due.pop(message["id"], None)
+                return
+            if self.due.get(message["id"]) == due:
+                return
+            self._push(message["id"], due)
+            # Wakes the thread in case this reminder is now the earliest
+            self.condition.notify()
+
+    def _next_due(self):
+        """Pops the earliest live reminder once it is due; otherwise returns None and the seconds to wait"""
+        while self.heap:
+            due, _, schedule_id = self.heap[0]
+            if self.due.get(schedule_id) != due:
+                heapq.heappop(self.heap)
+                continue
+            wait = due - time.time()
+            if wait > 0:
+                return None, wait
+            heapq.heappop(self.heap)
+            del self.due[schedule_id]
+            return (schedule_id, due), 0
+        return None, None
+
+    def run(self):
+        while True:
+            with self.condition:
+                reminder, wait = self._next_due()
+                if reminder is None:
+                    # Woken early by a new or moved reminder; otherwise the deadline has come
+                    self.condition.wait(wait)
+                    continue
+            self.deliver(*reminder)
+
+    def deliver(self, schedule_id, due):
+        with app.app_context():
+            row = db.session.query(*SCHEDULE_JSON_COLUMNS, Schedule.reminder).filter(Schedule.id == schedule_id).first()
+        # The row is re-checked in case a write reached the heap out of order
+        if row is None or not (row.reminder or row.type == 'reminder') \
+                or due_at(row.startDate, row.startMinutes, row.type, self.lead_minutes) != due:
+            return
+        event = schedule_row_json(row[:-1])
+        metrics.REMINDER_LAG.observe(max(time.time() - due, 0))
+        for name, sink in self.sinks.items():
+            try:
+                sink(event, due)
+                metrics.REMINDERS.inc(sink=name, outcome="delivered")
+            except Exception as e:
+                metrics.REMINDERS.inc(sink=name, outcome="failed")
+                logging.error(f"Reminder {schedule_id} not delivered to {name}: {str(e)}")
+
+    def start(self):
+        """Loads upcoming reminders, subscribes to schedule changes and starts the dispatch thread"""
+        # Subscribed before loading, so a write landing in between is applied rather than missed
+        broker.add_listener(self.on_schedule_event)
+        with app.app_context():
+            self.load()
+        self.thread = Thread(target=self.run, name="eventide-reminders", daemon=True)
+        self.thread.start()
+        return self.thread
+
+def start_scheduler():
+    """Starts the reminder scheduler configured in config.py; returns None when no sinks are configured"""
+    sinks = build_sinks(app.config["REMINDER_SINKS"], app.config["REMINDER_WEBHOOK_URL"])
+    if not sinks:
+        return None
+    scheduler = ReminderScheduler(sinks, app.config["REMINDER_LEAD_MINUTES"], app.config["REMINDER_GRACE_SECONDS"])
+    scheduler.start()
+    return scheduler
@@ -0,0 +1,32 @@
+from config import db
+from models import Schedule, ScheduleArchive, ScheduleChange, SCHEDULE_JSON_COLUMNS, ARCHIVE_JSON_COLUMNS, schedule_row_json
+
+def current_version():
+    """Version of the latest write to the schedule table, 0 before any"""
+    return db.session.query(db.func.coalesce(db.func.max(ScheduleChange.version), 0)).scalar()
+
+def changes_since(since, limit=None):
+    """Returns (upserted events as JSON, deleted ids, ids of changed recurring events, version reached,
+    whether more changes remain)"""
+    # An id's row is in schedule or, once archived, in schedule_archive; moving it doesn't count as a change
+    query = db.session.query(ScheduleChange.version, ScheduleChange.scheduleId, ScheduleChange.op, *SCHEDULE_JSON_COLUMNS, *ARCHIVE_JSON_COLUMNS) \
+        .outerjoin(Schedule, Schedule.id == ScheduleChange.scheduleId) \
+        .outerjoin(ScheduleArchive, ScheduleArchive.id == ScheduleChange.scheduleId) \
+        .filter(ScheduleChange.version > since) \
+        .order_by(ScheduleChange.version)
+    rows = query.limit(limit + 1).all() if limit else query.all()
+    more = bool(limit) and len(rows) > limit
+    rows = rows[:limit] if more else rows
+    width = len(SCHEDULE_JSON_COLUMNS)
+    upserts, deletes, series = [], [], []
+    for row in rows:
+        # row[3] is Schedule.id and row[3 + width] ScheduleArchive.id, NULL when the row isn't in that table
+        event = row[3:3 + width] if row[3] is not None else row[3 + width:] if row[3 + width] is not None else None
+        if row.op == 'series':
+            series.append(-row.scheduleId)
+        elif row.op == 'delete' or event is None:
+            deletes.append(row.scheduleId)
+        else:
+            upserts.append(schedule_row_json(event))
+    version = rows[-1][0] if rows else max(since, current_version())
+    return upserts, deletes, series, version, more
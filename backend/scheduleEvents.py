@@ -0,0 +1,123 @@
+"""In-process pub/sub for schedule create/update/delete notifications, fed by the ORM session hooks
+below and consumed by the /schedule/stream SSE endpoint. Publishing fans out from the committing
+thread into per-subscriber queues, so no thread is spawned per subscriber."""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from threading import Lock
+from models import Schedule, RecurringEvent, RecurrenceOverride
+import logging
+import queue
+
+SUBSCRIBER_QUEUE_SIZE = 256
+
+class Subscription:
+    def __init__(self, start=None, end=None):
+        self.start = start
+        self.end = end
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, message):
+        # Messages carry every date span the event touched, so moves out of the window are delivered too
+        if self.start is None:
+            return True
+        return any(start_date and end_date and start_date <= self.end and end_date >= self.start
+                   for start_date, end_date in message["spans"])
+
+    def get(self, timeout):
+        """Next message, or None if nothing arrived within timeout seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class Broker:
+    def __init__(self):
+        self.lock = Lock()
+        self.subscribers = set()
+        self.listeners = []
+
+    def subscribe(self, start=None, end=None):
+        subscription = Subscription(start, end)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def add_listener(self, listener):
+        """Calls listener(message) for every message, in the publishing thread; it must not block"""
+        with self.lock:
+            self.listeners.append(listener)
+
+    def publish(self, message):
+        with self.lock:
+            subscribers = list(self.subscribers)
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(message)
+            except Exception as e:
+                logging.error(f"Schedule event listener failed: {str(e)}")
+        for subscription in subscribers:
+            if subscription.overflowed or not subscription.wants(message):
+                continue
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                # A stalled client is told to resync instead of holding an unbounded backlog
+                subscription.overflowed = True
+                logging.warning("Schedule stream subscriber fell behind; asking it to resync")
+
+broker = Broker()
+
+def _series_message(obj):
+    # Occurrences aren't rows, so subscribers get the rule id and the dates it touched and refetch those
+    if isinstance(obj, RecurringEvent):
+        recurring_id, spans = obj.id, [[obj.firstDate, obj.lastDate or "9999-12-31"]]
+    else:
+        recurring_id, spans = obj.recurringId, [[obj.occurrenceDate, obj.occurrenceDate]]
+        if obj.startDate:
+            spans.append([obj.startDate, obj.endDate])
+    return {"op": "recurring", "id": recurring_id, "spans": spans, "event": None}
+
+def _spans(schedule):
+    spans = {(schedule.startDate, schedule.endDate)}
+    old_start, old_end = get_history(schedule, 'startDate').deleted, get_history(schedule, 'endDate').deleted
+    if old_start or old_end:
+        spans.add(((old_start or [schedule.startDate])[0], (old_end or [schedule.endDate])[0]))
+    return [list(span) for span in spans]
+
+@event.listens_for(Session, 'after_flush')
+def collect_schedule_events(session, flush_context):
+    # Flushed changes are held until commit so rolled-back writes are never announced
+    pending = session.info.setdefault('schedule_events', [])
+    for op, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for schedule in objects:
+            if isinstance(schedule, (RecurringEvent, RecurrenceOverride)):
+                pending.append(_series_message(schedule))
+                continue
+            if not isinstance(schedule, Schedule):
+                continue
+            if op == 'update' and not session.is_modified(schedule):
+                continue
+            pending.append({
+                "op": op,
+                "id": schedule.id,
+                "spans": _spans(schedule),
+                "event": schedule.to_json() if op != 'delete' else None,
+                # Not part of the event's API shape, but the reminder scheduler needs it
+                "reminder": bool(schedule.reminder) and op != 'delete',
+            })
+
+@event.listens_for(Session, 'after_commit')
+def publish_schedule_events(session):
+    for message in session.info.pop('schedule_events', []):
+        broker.publish(message)
+
+@event.listens_for(Session, 'after_rollback')
+def discard_schedule_events(session):
+    session.info.pop('schedule_events', None)
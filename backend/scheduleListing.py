@@ -0,0 +1,93 @@
+"""The unbounded GET /schedule listing, in pages or as a stream. Pages are cut with keyset cursors (the last row's
+id, or its startDate and id), so page 1000 costs the same index seek as page 1. The NDJSON stream is a run of such
+pages, each a short read of its own that resumes after the last row sent: memory stays flat for any table size, and
+a slow client never holds a read lock that would block writers. Archived events are listed too: every read
+takes the next rows from schedule and schedule_archive and merges them."""
+from itertools import islice
+from operator import itemgetter
+from sqlalchemy import and_, or_, select
+from config import db
+from models import Schedule, ScheduleArchive, JSON_COLUMNS, schedule_row_json
+from dateUtils import parse_date
+import heapq
+import jsonResponses
+
+ORDERS = ("id", "start")
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+STREAM_CHUNK_SIZE = 1000
+
+def default_order(after):
+    return "start" if after and "," in after else "id"
+
+def parse_cursor(order, after):
+    """Decodes an after cursor: "<id>" for id order, "<startDate>,<id>" for start order (startDate empty for
+    events without one). Returns None for no cursor; raises ValueError for a malformed one."""
+    if not after:
+        return None
+    if order == "id":
+        if not after.isdigit():
+            raise ValueError("after must be the id of the last event received")
+        return int(after)
+    start_date, _, schedule_id = after.rpartition(",")
+    if not schedule_id.isdigit() or (start_date and not parse_date(start_date)):
+        raise ValueError("after must be the startDate and id of the last event received, e.g. 2025-06-01,42")
+    return start_date or None, int(schedule_id)
+
+def format_cursor(order, row):
+    # row is a SCHEDULE_JSON_COLUMNS row: id first, startDate second
+    return str(row[0]) if order == "id" else f"{row[1] or ''},{row[0]}"
+
+def _keyset(model, order, cursor):
+    """Select of model's SCHEDULE_JSON_COLUMNS with the order and the "after cursor" condition"""
+    statement = select(*JSON_COLUMNS[model])
+    if order == "id":
+        statement = statement.order_by(model.id)
+        return statement.where(model.id > cursor) if cursor is not None else statement
+    # SQLite sorts NULL startDates first; the (startDate, id) index serves both the seek and the order
+    statement = statement.order_by(model.startDate, model.id)
+    if cursor is None:
+        return statement
+    start_date, schedule_id = cursor
+    if start_date is None:
+        return statement.where(or_(model.startDate != None, model.id > schedule_id))
+    # The range on startDate alone is what the index seeks on; the or_ only trims that first date
+    return statement.where(model.startDate >= start_date,
+                           or_(model.startDate > start_date, and_(model.startDate == start_date, model.id > schedule_id)))
+
+def _sort_key(order):
+    # Python's version of each ORDER BY above, NULL startDates first
+    return itemgetter(0) if order == "id" else lambda row: (row[1] is not None, row[1] or "", row[0])
+
+def _rows(conn, order, cursor, limit):
+    """The first limit events after cursor out of schedule and the archive, merged in order; ids are unique across both"""
+    hot, cold = (conn.execute(_keyset(model, order, cursor).limit(limit)).all() for model in (Schedule, ScheduleArchive))
+    return list(islice(heapq.merge(hot, cold, key=_sort_key(order)), limit))
+
+def next_cursor(order, row):
+    return row[0] if order == "id" else (row[1], row[0])
+
+def page(order, cursor, limit):
+    """Returns (events as JSON, cursor for the next page or None when this is the last)"""
+    rows = _rows(db.session, order, cursor, limit + 1)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return [schedule_row_json(row) for row in rows], format_cursor(order, rows[-1]) if more else None
+
+def stream(order, cursor, chunk_size=STREAM_CHUNK_SIZE):
+    """Generator of NDJSON byte chunks for every event after cursor. Each chunk is read on a pooled connection
+    that goes back before the chunk is sent, so nothing stays open while the client catches up."""
+    # The response body is iterated after the app context is gone
+    engine = db.engine
+
+    def chunks(cursor):
+        while True:
+            with engine.connect() as conn:
+                rows = _rows(conn, order, cursor, chunk_size)
+            if rows:
+                yield b"".join(jsonResponses.dumps(schedule_row_json(row)) for row in rows)
+            if len(rows) < chunk_size:
+                return
+            cursor = next_cursor(order, rows[-1])
+
+    return chunks(cursor)
@@ -0,0 +1,49 @@
+"""Full-text search over event titles and descriptions, answered from the schedule_fts index (see migrations.py).
+Every word typed is matched as a prefix, results come best match first, and pages are cut by the database."""
+from sqlalchemy import column, literal_column, table, or_, select, union_all
+from config import db
+from models import Schedule, ScheduleArchive, JSON_COLUMNS, schedule_row_json
+import archive
+import re
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 16
+TERM = re.compile(r"\w+")
+
+schedule_fts = table("schedule_fts", column("rowid"), column("rank"), column("schedule_fts"))
+
+def match_query(text):
+    """FTS5 query for free text: each word quoted (so FTS5 operators and punctuation are taken literally)
+    and prefix-matched, all words required. Returns None when text has no words."""
+    terms = TERM.findall(text or "")[:MAX_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _matches(model, query, start, end, urgency):
+    """Select of model's SCHEDULE_JSON_COLUMNS and the match rank for every event matching query and the filters"""
+    rows = select(*JSON_COLUMNS[model], schedule_fts.c.rank) \
+        .join(schedule_fts, schedule_fts.c.rowid == model.id) \
+        .where(schedule_fts.c.schedule_fts.match(query))
+    if start and end:
+        rows = rows.where(model.startDate <= end, model.endDate >= start)
+    if urgency == 0:
+        # Events saved without an urgency are shown as trivial
+        rows = rows.where(or_(model.urgency == 0, model.urgency == None))
+    elif urgency is not None:
+        rows = rows.where(model.urgency == urgency)
+    return rows
+
+def search(query, start=None, end=None, urgency=None, limit=DEFAULT_LIMIT, offset=0):
+    """Returns (events as JSON, best first, whether more results follow) for a match_query query,
+    optionally limited to events overlapping start..end and to one urgency rank"""
+    rows = _matches(Schedule, query, start, end, urgency)
+    # The index covers archived events too; their rows are only joined when the window reaches back to them
+    until = archive.archived_until()
+    if until is not None and not (start and end and start > until):
+        rows = union_all(rows, _matches(ScheduleArchive, query, start, end, urgency))
+    # One extra row tells whether another page exists without counting every match
+    rows = rows.order_by(literal_column("rank"), literal_column("id")).limit(limit + 1).offset(offset)
+    rows = db.session.execute(rows).all()
+    return [schedule_row_json(row[:-1]) for row in rows[:limit]], len(rows) > limit
@@ -0,0 +1,96 @@
+"""Incremental parsers for streamed model output: they take text as it arrives and hand back whatever
+is already complete, so streaming endpoints can forward results before the reply finishes."""
+import json
+import re
+
+class JsonEventParser:
+    """Yields each object of a JSON reply's "schedule" array as soon as its closing brace arrives"""
+    ARRAY_START = re.compile(r'"schedule"\s*:\s*\[')
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = None  # scan position once the array has been found
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.start = None
+        self.done = False
+
+    def feed(self, text):
+        """Returns the events completed by text"""
+        self.buffer += text
+        if self.position is None:
+            match = self.ARRAY_START.search(self.buffer)
+            if not match:
+                return []
+            self.position = match.end()
+        events = []
+        buffer, i = self.buffer, self.position
+        while i < len(buffer) and not self.done:
+            char = buffer[i]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                if self.depth == 0:
+                    self.start = i
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    events.append(json.loads(buffer[self.start:i + 1]))
+            elif char == ']' and self.depth == 0:
+                self.done = True
+            i += 1
+        self.position = i
+        return events
+
+class LineParser:
+    """Splits streamed text into complete lines"""
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, text):
+        self.pending += text
+        *lines, self.pending = self.pending.split("\n")
+        return lines
+
+    def finish(self):
+        rest, self.pending = self.pending, ""
+        return [rest] if rest else []
+
+class FenceStripper:
+    """Drops an opening ```lang line and a closing ``` line from streamed text. The last line is held back
+    while it could still turn out to be the closing fence."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.opened = False
+
+    def feed(self, text):
+        self.buffer += text
+        if not self.opened:
+            stripped = self.buffer.lstrip()
+            if len(stripped) < 3 and "```".startswith(stripped):
+                return ""
+            if stripped.startswith("```"):
+                if "\n" not in stripped:
+                    return ""
+                stripped = stripped.split("\n", 1)[1]
+            self.buffer, self.opened = stripped, True
+        last = self.buffer[self.buffer.rfind("\n") + 1:]
+        hold = len(last) + ("\n" in self.buffer) if "```".startswith(last.strip()) else 0
+        visible, self.buffer = self.buffer[:len(self.buffer) - hold], self.buffer[len(self.buffer) - hold:]
+        return visible
+
+    def finish(self):
+        rest = self.buffer if self.opened else self.buffer.lstrip()
+        self.buffer = ""
+        return "" if rest.strip().startswith("```") else rest
@@ -0,0 +1,165 @@
+"""Latency and throughput of the HTTP API on synthetic calendars, through the Flask test client.
+
+Every calendar size runs in a fresh interpreter against its own temporary database, populated by
+synthetic.py. AI routes use the stub model (EVENTIDE_AI_MODEL=stub), so they measure the backend's
+own overhead plus --ai-delay seconds per model call.
+
+    python benchmarks/api_latency.py --sizes 10000 100000 1000000 --output bench.json
+    python benchmarks/api_latency.py --sizes 10000 --compare bench.json
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import common
+import synthetic
+
+FIRST_DAY = date(2025, 1, 1)
+DAYS = 365
+
+def random_day(rng):
+    return FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+
+def timed(client, iterations, warmup, request):
+    """Runs request(client, i) warmup + iterations times; returns (durations, wall seconds, errors)"""
+    for i in range(warmup):
+        request(client, -1 - i)
+    samples, errors = [], 0
+    began = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter()
+        response = request(client, i)
+        samples.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            errors += 1
+    return samples, time.perf_counter() - began, errors
+
+def run_size(args):
+    """Runs inside the child interpreter"""
+    main = common.import_backend()
+    from config import app, db
+    from models import Schedule
+    rng = random.Random(args.seed)
+    report = {"events": args.events, "scenarios": {}}
+
+    with app.app_context():
+        main.init_db()
+        began = time.perf_counter()
+        synthetic.populate(db, args.events, seed=args.seed, days=DAYS)
+        elapsed = time.perf_counter() - began
+        report["populate"] = {"seconds": round(elapsed, 2), "rowsPerSecond": round(args.events / elapsed)}
+        ids = [row[0] for row in db.session.query(Schedule.id)]
+    client = app.test_client()
+
+    # One busy day's events as the AI payload, fetched outside the timed loops
+    day = random_day(rng)
+    day_events = client.get(f"/schedule?date={day}").json["schedule"][:args.ai_events]
+    deletable = rng.sample(ids, min(len(ids), args.iterations + args.warmup))
+
+    def week(client, i):
+        start = random_day(rng)
+        return client.get(f"/schedule?from={start}&to={start + timedelta(days=6)}")
+
+    def optimize_uncached(client, i):
+        # A per-iteration title keeps every request off the optimizer cache
+        schedule = [{**event, "title": f"{event['title']} #{i}"} for event in day_events]
+        return client.post("/optimize_schedule", json={"schedule": schedule, "allowed_modifications": ["times"], "mode": "ai"})
+
+    def stream_all(client, i):
+        # Reading the body is what's timed; the response returns before the first row is sent
+        response = client.get("/schedule?format=ndjson")
+        response.get_data()
+        return response
+
+    scenarios = {
+        "schedule_day": lambda client, i: client.get(f"/schedule?date={random_day(rng)}"),
+        "schedule_week": week,
+        "schedule_summary": lambda client, i: client.get(f"/schedule/summary?month=2025-{rng.randint(1, 12):02d}"),
+        "create": lambda client, i: client.post("/create_schedule", json={"eventInfo": synthetic.random_event(rng, FIRST_DAY, DAYS)}),
+        "update": lambda client, i: client.patch(f"/update_schedule/{rng.choice(ids)}", json={"eventInfo": synthetic.random_event(rng, FIRST_DAY, DAYS)}),
+        "delete": lambda client, i: client.delete(f"/delete_schedule/{deletable.pop()}"),
+        "optimize_ai": optimize_uncached,
+        "optimize_cached": lambda client, i: client.post("/optimize_schedule", json={"schedule": day_events, "allowed_modifications": ["times"], "mode": "ai"}),
+        "optimize_local": lambda client, i: client.post("/optimize_schedule", json={"schedule": day_events, "allowed_modifications": ["times"], "mode": "fast"}),
+        "summarize": lambda client, i: client.post("/summarize_calendar", json={"schedule": day_events}),
+        # Prefixes of the synthetic vocabulary, so every search matches a large share of the calendar
+        "search": lambda client, i: client.get(f"/schedule/search?q={rng.choice(synthetic.WORDS)[:rng.randint(2, 4)]}"),
+        "search_filtered": lambda client, i: client.get(f"/schedule/search?q={rng.choice(synthetic.WORDS)}&urgency=critical"),
+        "schedule_page": lambda client, i: client.get(f"/schedule?limit=500&after={rng.choice(ids)}"),
+    }
+    if args.events <= args.full_list_max:
+        scenarios["schedule_all"] = lambda client, i: client.get("/schedule")
+        scenarios["schedule_stream"] = stream_all
+
+    for name, request in scenarios.items():
+        if args.only and name not in args.only:
+            continue
+        iterations = args.iterations if name not in ("schedule_all", "schedule_stream") else max(1, args.iterations // 20)
+        samples, wall, errors = timed(client, iterations, min(args.warmup, iterations), request)
+        report["scenarios"][name] = {**common.summarize(samples, wall), "errors": errors}
+    print(json.dumps(report))
+
+def compare(current, previous):
+    """Prints p50/p95 changes against an earlier results file"""
+    print(f"\nCompared with {previous['environment'].get('commit')} ({previous['environment'].get('timestamp')}):")
+    for size, result in current["sizes"].items():
+        before = previous["sizes"].get(size)
+        if not before:
+            continue
+        for name, stats in result["scenarios"].items():
+            old = before["scenarios"].get(name)
+            if not old or not old.get("ops") or not stats.get("ops"):
+                continue
+            changes = "  ".join(
+                f"{metric} {old[metric]:.2f} -> {stats[metric]:.2f} ms ({(stats[metric] / old[metric] - 1) * 100 if old[metric] else 0:+.0f}%)"
+                for metric in ("p50Ms", "p95Ms")
+            )
+            print(f"{size:>9} {name:<18} {changes}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="calendar sizes in events")
+    parser.add_argument("--iterations", type=int, default=200, help="timed requests per scenario")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="seconds the stub model sleeps per call")
+    parser.add_argument("--ai-events", type=int, default=50, help="events sent to the AI routes")
+    parser.add_argument("--full-list-max", type=int, default=100000, help="largest size to benchmark unfiltered GET /schedule on")
+    parser.add_argument("--only", nargs="+", help="run just these scenarios")
+    parser.add_argument("--profile", default="default", help="EVENTIDE_DB_PROFILE for the runs")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--events", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.events is not None:
+        return run_size(args)
+
+    results = {"environment": common.environment(), "config": vars(args), "sizes": {}}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            env = common.backend_env(os.path.join(directory, "bench.db"),
+                                     EVENTIDE_AI_STUB_DELAY=args.ai_delay, EVENTIDE_DB_PROFILE=args.profile)
+            child = ["--events", str(size), "--iterations", str(args.iterations), "--warmup", str(args.warmup),
+                     "--seed", str(args.seed), "--ai-events", str(args.ai_events), "--full-list-max", str(args.full_list_max)]
+            if args.only:
+                child += ["--only", *args.only]
+            result = common.run_child(os.path.abspath(__file__), child, env)
+        results["sizes"][str(size)] = result
+        print(f"{size} events (populated at {result['populate']['rowsPerSecond']} rows/s)")
+        for name, stats in result["scenarios"].items():
+            print(f"  {name:<18} p50 {stats['p50Ms']:>9.2f} ms  p95 {stats['p95Ms']:>9.2f} ms  "
+                  f"p99 {stats['p99Ms']:>9.2f} ms  {stats['opsPerSecond']:>8} ops/s  errors {stats['errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Helpers shared by the benchmark scripts: backend import setup, child-process runs and latency statistics."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+BACKEND = os.path.join(ROOT, "backend")
+
+def backend_env(database_path, **extra):
+    """Environment for a child process that imports the backend against its own database and the stub model"""
+    return {
+        **os.environ,
+        "EVENTIDE_DATABASE_URI": "sqlite:///" + database_path,
+        "EVENTIDE_AI_MODEL": "stub",
+        "EVENTIDE_DB_OPTIMIZE_INTERVAL": "0",
+        "EVENTIDE_SLOW_REQUEST_SECONDS": "0",
+        "EVENTIDE_SLOW_QUERY_SECONDS": "0",
+        "TERM": "dumb",
+        **{key: str(value) for key, value in extra.items()},
+    }
+
+def import_backend():
+    """Imports the Flask app quietly; call only in a process whose environment came from backend_env"""
+    sys.path.insert(0, BACKEND)
+    import logging
+    import main
+    logging.disable(logging.CRITICAL)
+    return main
+
+def run_child(script, args, env):
+    """Runs script with args in a fresh interpreter and returns the JSON it prints on its last line"""
+    result = subprocess.run([sys.executable, script, *args], env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(script)} {' '.join(args)} failed:\n{result.stderr[-4000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+def summarize(samples, elapsed=None):
+    """p50/p95/p99/max in milliseconds plus throughput for a list of per-operation durations in seconds"""
+    if not samples:
+        return {"ops": 0}
+    ordered = sorted(samples)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        "ops": len(samples),
+        "opsPerSecond": round(len(samples) / elapsed, 1) if elapsed else None,
+        "p50Ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95Ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99Ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "maxMs": round(ordered[-1] * 1000, 3),
+    }
+
+def environment():
+    """Where and on what the results were produced, so runs from different commits can be lined up"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
@@ -0,0 +1,82 @@
+"""Import-time budget for the backend. Imports each entry module in a fresh interpreter under
+`python -X importtime`, reports the slowest imports, and exits non-zero when an import goes over its budget
+or loads a module that should only be loaded on first use (the Gemini SDK).
+
+    python benchmarks/import_time.py --runs 5 --budget-ms 800
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import common
+
+ENTRY_MODULES = ["main", "db_action"]
+# Only needed once a request actually calls the model
+LAZY_MODULES = ["google.generativeai", "google.ai.generativelanguage"]
+
+def import_profile(module, env):
+    """Runs one cold import and returns {imported module: (self µs, cumulative µs)}"""
+    # db_action runs its interactive menu at import, so it gets no input and quits at the first prompt
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=common.BACKEND,
+                            env=env, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    if module not in timings:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-4000:]}")
+    return timings
+
+def measure(module, runs, env):
+    profiles = [import_profile(module, env) for _ in range(runs)]
+    totals = [profile[module][1] for profile in profiles]
+    # The run closest to the median total is the one whose breakdown gets reported
+    typical = min(profiles, key=lambda profile: abs(profile[module][1] - statistics.median(totals)))
+    slowest = sorted(typical.items(), key=lambda item: item[1][1], reverse=True)
+    return {
+        "medianMs": round(statistics.median(totals) / 1000, 1),
+        "minMs": round(min(totals) / 1000, 1),
+        "maxMs": round(max(totals) / 1000, 1),
+        "modules": len(typical),
+        "slowest": [{"module": name, "selfMs": round(self_us / 1000, 1), "cumulativeMs": round(cumulative_us / 1000, 1)}
+                    for name, (self_us, cumulative_us) in slowest[1:11]],
+        "lazyLoaded": [name for name in LAZY_MODULES if name in typical],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=ENTRY_MODULES, help="backend modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per module; the median is compared to the budget")
+    parser.add_argument("--budget-ms", type=float, default=800, help="largest acceptable median import time")
+    parser.add_argument("--output", help="write the JSON results here")
+    args = parser.parse_args()
+
+    results = {"environment": common.environment(), "config": vars(args), "modules": {}}
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        env = common.backend_env(os.path.join(directory, "bench.db"))
+        for module in args.modules:
+            result = results["modules"][module] = measure(module, args.runs, env)
+            print(f"{module}: median {result['medianMs']} ms (min {result['minMs']}, max {result['maxMs']}), "
+                  f"{result['modules']} modules, budget {args.budget_ms:g} ms")
+            for entry in result["slowest"]:
+                print(f"  {entry['module']:<40} {entry['cumulativeMs']:>8.1f} ms  (self {entry['selfMs']:.1f})")
+            if result["medianMs"] > args.budget_ms:
+                failures.append(f"{module} took {result['medianMs']} ms to import, over the {args.budget_ms:g} ms budget")
+            if result["lazyLoaded"]:
+                failures.append(f"{module} imports {', '.join(result['lazyLoaded'])} at startup")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Prompt size, token and latency savings of the compact optimizer encoding (backend/compactSchedule.py)
+over the JSON layout, on busy days and weeks from synthetic calendars.
+
+The model's reply is stood in for by the local optimizer's result: the JSON format gets the whole schedule
+back, the compact format only the changed rows. Tokens are counted with tiktoken when it is installed and
+estimated otherwise; model latency is estimated from --prefill-rate and --decode-rate (tokens/second).
+
+    python benchmarks/prompt_encoding.py --events 10000 --windows 20 --output prompt.json
+"""
+from datetime import date, timedelta
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+import common
+import synthetic
+
+ALLOWED_SETS = {
+    "times": ["times"],
+    "times+text": ["times", "name", "description", "urgency"],
+}
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+    TOKENIZER = "tiktoken cl100k_base"
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except ImportError:
+    TOKENIZER = "estimate (words, 3-digit groups and punctuation)"
+    _token = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+    def count_tokens(text):
+        return len(_token.findall(text))
+
+def busiest_windows(events, length, count):
+    """The count windows of length days with the most events starting in them"""
+    by_day = {}
+    for event in events:
+        by_day.setdefault(event["startDate"], []).append(event)
+    starts = sorted(by_day, key=lambda day: -sum(len(by_day.get(str(date.fromisoformat(day) + timedelta(days=i)), []))
+                                                 for i in range(length)))[:count]
+    return [[event for i in range(length) for event in by_day.get(str(date.fromisoformat(day) + timedelta(days=i)), [])]
+            for day in starts]
+
+def timed(fn, *args, repeat=20):
+    began = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - began) / repeat
+
+def measure(schedule, allowed, args):
+    import aiService
+    import compactSchedule
+    import localOptimizer
+    local = localOptimizer.optimize(schedule, allowed)
+    results = {}
+    for name in ("json", "compact"):
+        if name == "json":
+            prompt, encode_seconds = timed(aiService.build_optimizer_prompt, schedule, allowed)
+            reply = json.dumps(local) if "schedule" in local else local["message"]
+            decoded, decode_seconds = timed(json.loads, reply) if "schedule" in local else (local, 0.0)
+        else:
+            prompt, encode_seconds = timed(aiService.build_compact_optimizer_prompt, schedule, allowed)
+            if "schedule" in local:
+                changed = [event for event, before in zip(local["schedule"], schedule) if event != before]
+                reply = compactSchedule.encode(changed, allowed)
+                decoded, decode_seconds = timed(compactSchedule.decode, reply, schedule, allowed)
+            else:
+                reply, decoded, decode_seconds = local["message"], local, 0.0
+        prompt_tokens, reply_tokens = count_tokens(prompt), count_tokens(reply)
+        results[name] = {
+            "promptBytes": len(prompt.encode()),
+            "replyBytes": len(reply.encode()),
+            "promptTokens": prompt_tokens,
+            "replyTokens": reply_tokens,
+            "encodeMs": encode_seconds * 1000,
+            "decodeMs": decode_seconds * 1000,
+            "estimatedModelMs": (prompt_tokens / args.prefill_rate + reply_tokens / args.decode_rate) * 1000,
+            "roundTripOk": decoded == local,
+        }
+    return results
+
+def run(args):
+    """Runs inside the child interpreter, so the backend modules import against a scratch database"""
+    common.import_backend()
+    events = [{"id": i + 1, **event} for i, event in enumerate(synthetic.generate(args.events, seed=args.seed))]
+    report = {"tokenizer": TOKENIZER, "windows": {}}
+    for window, length in (("day", 1), ("week", 7)):
+        schedules = busiest_windows(events, length, args.windows)
+        for allowed_name, allowed in ALLOWED_SETS.items():
+            samples = [measure(schedule, allowed, args) for schedule in schedules]
+            totals = {name: {key: sum(sample[name][key] for sample in samples) / len(samples)
+                             for key in samples[0][name] if key != "roundTripOk"} for name in ("json", "compact")}
+            for name in totals:
+                totals[name]["roundTripOk"] = all(sample[name]["roundTripOk"] for sample in samples)
+            json_totals, compact_totals = totals["json"], totals["compact"]
+            report["windows"][f"{window}/{allowed_name}"] = {
+                "eventsPerWindow": sum(len(schedule) for schedule in schedules) / len(schedules),
+                "json": json_totals,
+                "compact": compact_totals,
+                "savings": {
+                    key: round(1 - compact_totals[key] / json_totals[key], 3) if json_totals[key] else None
+                    for key in ("promptTokens", "replyTokens", "promptBytes", "estimatedModelMs")
+                },
+            }
+    print(json.dumps(report))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=10000, help="size of the synthetic calendar")
+    parser.add_argument("--windows", type=int, default=20, help="busiest days/weeks sampled")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefill-rate", type=float, default=5000, help="model prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=150, help="model output tokens per second")
+    parser.add_argument("--output", help="write the JSON results here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        child = ["--child", "--events", str(args.events), "--windows", str(args.windows), "--seed", str(args.seed),
+                 "--prefill-rate", str(args.prefill_rate), "--decode-rate", str(args.decode_rate)]
+        report = common.run_child(os.path.abspath(__file__), child, common.backend_env(os.path.join(directory, "bench.db")))
+    results = {"environment": common.environment(), "config": vars(args), **report}
+    print(f"Tokens: {report['tokenizer']}")
+    for name, window in report["windows"].items():
+        json_totals, compact_totals, savings = window["json"], window["compact"], window["savings"]
+        print(f"{name:<16} {window['eventsPerWindow']:>6.1f} events  "
+              f"prompt {json_totals['promptTokens']:>7.0f} -> {compact_totals['promptTokens']:>6.0f} tok ({savings['promptTokens']:.0%})  "
+              f"reply {json_totals['replyTokens']:>7.0f} -> {compact_totals['replyTokens']:>6.0f} tok ({savings['replyTokens'] or 0:.0%})  "
+              f"est. model {json_totals['estimatedModelMs'] / 1000:>6.1f} -> {compact_totals['estimatedModelMs'] / 1000:>5.1f} s  "
+              f"decode ok {compact_totals['roundTripOk']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    sys.exit(main())
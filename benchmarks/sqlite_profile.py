@@ -0,0 +1,107 @@
+"""Reader/writer throughput of the backend under each database profile (see backend/sqliteProfile.py).
+
+Each profile runs in a fresh interpreter against its own temporary database: reader threads fetch a week
+of /schedule while writer threads create, update and delete events through the API.
+
+    python benchmarks/sqlite_profile.py --events 5000 --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import common
+import synthetic
+
+def run_profile(args):
+    """Runs inside the child interpreter, whose environment already selects the profile and database"""
+    main = common.import_backend()
+    from config import app, db
+    from models import Schedule
+    with app.app_context():
+        main.init_db()
+        synthetic.populate(db, args.events, seed=args.seed)
+        ids = [row[0] for row in db.session.query(Schedule.id)]
+
+    stop = threading.Event()
+    results = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def reader(seed):
+        client, rng = app.test_client(), random.Random(seed)
+        while not stop.is_set():
+            month = rng.randint(1, 12)
+            began = time.perf_counter()
+            response = client.get(f"/schedule?from=2025-{month:02d}-01&to=2025-{month:02d}-07")
+            elapsed = time.perf_counter() - began
+            with lock:
+                if response.status_code == 200:
+                    results["read"].append(elapsed)
+                else:
+                    errors["read"] += 1
+
+    def writer(seed):
+        client, rng = app.test_client(), random.Random(seed)
+        while not stop.is_set():
+            op = rng.random()
+            began = time.perf_counter()
+            if op < 0.5:
+                response = client.post("/create_schedule", json={"eventInfo": synthetic.random_event(rng)})
+            elif op < 0.9:
+                response = client.patch(f"/update_schedule/{rng.choice(ids)}", json={"eventInfo": synthetic.random_event(rng)})
+            else:
+                response = client.delete(f"/delete_schedule/{rng.choice(ids)}")
+            elapsed = time.perf_counter() - began
+            with lock:
+                if response.status_code < 500:
+                    results["write"].append(elapsed)
+                else:
+                    errors["write"] += 1
+
+    threads = [threading.Thread(target=reader, args=(args.seed + i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(args.seed + 1000 + i,)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report = {kind: {**common.summarize(results[kind], args.seconds), "errors": errors[kind]} for kind in ("read", "write")}
+    print(json.dumps(report))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--events", type=int, default=5000, help="events seeded before the run")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_profile(args)
+
+    report = {"environment": common.environment(), "config": {key: value for key, value in vars(args).items() if key not in ("child", "output")}, "profiles": {}}
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as directory:
+            env = common.backend_env(os.path.join(directory, "bench.db"), EVENTIDE_DB_PROFILE=profile)
+            child = ["--child", "--events", str(args.events), "--readers", str(args.readers),
+                     "--writers", str(args.writers), "--seconds", str(args.seconds), "--seed", str(args.seed)]
+            report["profiles"][profile] = common.run_child(os.path.abspath(__file__), child, env)
+        print(f"{profile:>10}: " + "  ".join(
+            f"{kind} {stats['opsPerSecond']}/s p95 {stats['p95Ms']}ms errors {stats['errors']}"
+            for kind, stats in report["profiles"][profile].items()
+        ))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Synthetic calendars for the benchmarks: a seeded, realistic mix of single-day events, multi-day events
+and reminders, written straight into the schedule table in bulk."""
+from datetime import date, timedelta
+import random
+
+URGENCY_WEIGHTS = [("trivial", 35), ("ongoing", 30), ("attention-needed", 18), ("important", 12), ("critical", 5)]
+DURATIONS = [15, 30, 30, 45, 60, 60, 60, 90, 120, 180]
+WORDS = ("standup review planning lunch gym dentist call sync report study lecture lab groceries "
+         "deadline retro interview commute errands flight dinner reading").split()
+
+def format_time(minutes):
+    hours, mins = divmod(minutes, 60)
+    return f"{hours % 12 or 12:02d}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+def random_event(rng, first_day=date(2025, 1, 1), days=365):
+    """One eventInfo dict: ~8% multi-day (1-6 extra days), ~15% reminders, ~10% locked"""
+    day = first_day + timedelta(days=rng.randrange(days))
+    kind = rng.random()
+    if kind < 0.15:
+        start = rng.randrange(6 * 60, 22 * 60, 5)
+        end, end_day, event_type = start, day, "reminder"
+    else:
+        start = rng.randrange(6 * 60, 21 * 60, 15)
+        end, end_day, event_type = min(start + rng.choice(DURATIONS), 24 * 60 - 1), day, "event"
+        if kind > 0.92:
+            end_day = day + timedelta(days=rng.randint(1, 6))
+            end = rng.randrange(6 * 60, 22 * 60, 15)
+    return {
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(1, 3))),
+        "startDate": day.isoformat(),
+        "endDate": end_day.isoformat(),
+        "start": format_time(start),
+        "end": format_time(end),
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 12))),
+        "locked": rng.random() < 0.10,
+        "type": event_type,
+        "urgency": rng.choices([level for level, _ in URGENCY_WEIGHTS], [weight for _, weight in URGENCY_WEIGHTS])[0],
+        "reminder": event_type == "reminder" or rng.random() < 0.2,
+    }
+
+def generate(count, seed=0, first_day=date(2025, 1, 1), days=365):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_event(rng, first_day, days)
+
+def populate(db, count, seed=0, batch_size=10000, days=365):
+    """Bulk-inserts count synthetic events; must run inside an app context after init_db"""
+    from models import Schedule, event_info_columns
+    batch = []
+    for info in generate(count, seed, days=days):
+        batch.append(event_info_columns(info))
+        if len(batch) >= batch_size:
+            db.session.execute(Schedule.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(Schedule.__table__.insert(), batch)
+    db.session.commit()
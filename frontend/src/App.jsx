@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import Calendar from './Calendar.jsx';
 import EventList from './EventList.jsx';
 import { usePalette } from './PaletteContext.jsx';
+import { readEventStream } from './utils.jsx';
 
 function App() {
   const { selectedPalette } = usePalette();
@@ -45,8 +46,8 @@ function App() {
       // Get the formatted date for the selected date
       const formattedDate = `${selectedDate.year}-${String(months.indexOf(selectedDate.month) + 1).padStart(2, '0')}-${String(selectedDate.day).padStart(2, '0')}`;
       
-      // Send the schedule data to the backend for summarization
-      const response = await fetch('http://127.0.0.1:5000/summarize_calendar', {
+      // The summary is streamed so it renders as the model writes it
+      const response = await fetch('http://127.0.0.1:5000/summarize_calendar/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -57,14 +58,23 @@ function App() {
         }),
       });
 
-      const data = await response.json();
-      
-      if (response.ok) {
-        setSummary(data.summary || 'No summary available');
-      } else {
+      if (!response.ok || !response.body) {
+        const data = await response.json();
         console.error('Failed to get summary:', data.message);
         setSummary('Failed to generate summary. Please try again.');
+        return;
       }
+      await readEventStream(response, (eventName, data) => {
+        if (eventName === 'token') {
+          setIsLoading(false);
+          setSummary(prev => prev + data);
+        } else if (eventName === 'done') {
+          setSummary(data.summary || 'No summary available');
+        } else if (eventName === 'error') {
+          console.error('Failed to get summary:', data.message);
+          setSummary('Failed to generate summary. Please try again.');
+        }
+      });
     } catch (error) {
       console.error('Error summarizing calendar:', error);
       setSummary('Error generating summary. Please check your connection.');
@@ -4,7 +4,7 @@ import ScheduleGrid from './ScheduleGrid.jsx';
 import EventModal from './EventModal.jsx';
 import ReminderModal from './ReminderModal.jsx';
 import { usePalette } from './PaletteContext.jsx';
-import { parseTime } from './utils.jsx';
+import { parseTime, readEventStream } from './utils.jsx';
 
 function DayDetails() {
   const { selectedPalette } = usePalette();
@@ -93,23 +93,25 @@ function DayDetails() {
 
   const fetchEvents = async (dates) => {
     try {
-      const eventPromises = dates.map(date =>
-        fetch(`http://127.0.0.1:5000/schedule?date=${date}`).then(res => res.json())
-      );
-      const eventResponses = await Promise.all(eventPromises);
+      // One range request covers every visible date; the backend lists multi-day events once
+      const sortedDates = [...dates].sort();
+      const from = sortedDates[0];
+      const to = sortedDates[sortedDates.length - 1];
+      const response = await fetch(`http://127.0.0.1:5000/schedule?from=${from}&to=${to}`);
+      const data = await response.json();
       const eventMap = new Map();
-      eventResponses.forEach((data, index) => {
-        if (!data.schedule) {
-          console.error(`Failed to fetch events for date ${dates[index]}: No schedule data`);
-          return;
-        }
+      if (!data.schedule) {
+        console.error(`Failed to fetch events for ${from} to ${to}: ${data.message || 'No schedule data'}`);
+      } else {
+        const visibleDates = new Set(dates);
         data.schedule
           .filter(event => {
             if (!event.id || (!event.startDate && !event.date) || !event.start || !event.end || !event.urgency) {
-              console.error(`Invalid event for date ${dates[index]}:`, event);
+              console.error(`Invalid event for ${from} to ${to}:`, event);
               return false;
             }
-            return true;
+            // Custom day selections can leave gaps inside the requested window
+            return (event.dates || []).some(date => visibleDates.has(date));
           })
           .forEach(event => {
             const primaryDate = event.startDate || event.date;
@@ -129,7 +131,7 @@ function DayDetails() {
               });
             }
           });
-      });
+      }
       const allEvents = Array.from(eventMap.values());
       setEvents(allEvents);
       setActionHistory([]);
@@ -269,6 +271,20 @@ function DayDetails() {
     }
   };
 
+  const applyBatch = async (operations) => {
+    // All operations commit together on the backend, so a failure leaves nothing half-applied
+    const response = await fetch('http://127.0.0.1:5000/schedule/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ operations }),
+    });
+    const data = await response.json();
+    if (!response.ok) {
+      throw new Error(data.message || 'Failed to apply changes');
+    }
+    return data;
+  };
+
   const undoAction = async () => {
     if (actionHistory.length === 0) {
       consoleDebug('No actions to undo');
@@ -278,36 +294,18 @@ function DayDetails() {
       const lastAction = actionHistory[actionHistory.length - 1];
       let newEvents = [...events];
       if (lastAction.type === 'create') {
-        const response = await fetch(`http://127.0.0.1:5000/delete_schedule/${lastAction.event.id}`, {
-          method: 'DELETE',
-        });
-        if (!response.ok) {
-          const data = await response.json();
-          throw new Error(data.message || 'Failed to undo create action');
-        }
+        await applyBatch([{ op: 'delete', id: lastAction.event.id }]);
         newEvents = newEvents.filter(e => e.id !== lastAction.event.id);
       } else if (lastAction.type === 'update') {
-        const response = await fetch(`http://127.0.0.1:5000/update_schedule/${lastAction.id}`, {
-          method: 'PATCH',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ eventInfo: lastAction.oldEvent }),
-        });
-        if (!response.ok) {
-          const data = await response.json();
-          throw new Error(data.message || 'Failed to undo update action');
-        }
+        await applyBatch([{ op: 'update', id: lastAction.id, eventInfo: lastAction.oldEvent }]);
         newEvents = newEvents.map(e => (e.id === lastAction.id ? { ...lastAction.oldEvent } : e));
       } else if (lastAction.type === 'delete') {
-        const response = await fetch('http://127.0.0.1:5000/create_schedule', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ eventInfo: lastAction.event }),
-        });
-        const data = await response.json();
-        if (!response.ok) {
-          throw new Error(data.message || 'Failed to undo delete action');
-        }
-        newEvents.push({ ...lastAction.event, id: data.id });
+        const data = await applyBatch([{ op: 'create', eventInfo: lastAction.event }]);
+        newEvents.push({ ...lastAction.event, id: data.ids[0] });
+      } else if (lastAction.type === 'batchUpdate') {
+        await applyBatch(lastAction.oldEvents.map(e => ({ op: 'update', id: e.id, eventInfo: e })));
+        const oldById = new Map(lastAction.oldEvents.map(e => [e.id, e]));
+        newEvents = newEvents.map(e => (oldById.has(e.id) ? { ...oldById.get(e.id) } : e));
       }
       setEvents(newEvents);
       setRedoHistory(prev => {
@@ -334,36 +332,18 @@ function DayDetails() {
       const lastRedo = redoHistory[redoHistory.length - 1];
       let newEvents = [...events];
       if (lastRedo.type === 'create') {
-        const response = await fetch('http://127.0.0.1:5000/create_schedule', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ eventInfo: lastRedo.event }),
-        });
-        const data = await response.json();
-        if (!response.ok) {
-          throw new Error(data.message || 'Failed to redo create action');
-        }
-        newEvents.push({ ...lastRedo.event, id: data.id });
+        const data = await applyBatch([{ op: 'create', eventInfo: lastRedo.event }]);
+        newEvents.push({ ...lastRedo.event, id: data.ids[0] });
       } else if (lastRedo.type === 'update') {
-        const response = await fetch(`http://127.0.0.1:5000/update_schedule/${lastRedo.id}`, {
-          method: 'PATCH',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ eventInfo: lastRedo.newEvent }),
-        });
-        if (!response.ok) {
-          const data = await response.json();
-          throw new Error(data.message || 'Failed to redo update action');
-        }
+        await applyBatch([{ op: 'update', id: lastRedo.id, eventInfo: lastRedo.newEvent }]);
         newEvents = newEvents.map(e => (e.id === lastRedo.id ? { ...lastRedo.newEvent } : e));
       } else if (lastRedo.type === 'delete') {
-        const response = await fetch(`http://127.0.0.1:5000/delete_schedule/${lastRedo.event.id}`, {
-          method: 'DELETE',
-        });
-        if (!response.ok) {
-          const data = await response.json();
-          throw new Error(data.message || 'Failed to redo delete action');
-        }
+        await applyBatch([{ op: 'delete', id: lastRedo.event.id }]);
         newEvents = newEvents.filter(e => e.id !== lastRedo.event.id);
+      } else if (lastRedo.type === 'batchUpdate') {
+        await applyBatch(lastRedo.newEvents.map(e => ({ op: 'update', id: e.id, eventInfo: e })));
+        const newById = new Map(lastRedo.newEvents.map(e => [e.id, e]));
+        newEvents = newEvents.map(e => (newById.has(e.id) ? { ...newById.get(e.id) } : e));
       }
       setEvents(newEvents);
       setRedoHistory(prev => prev.slice(0, -1));
@@ -477,22 +457,39 @@ function DayDetails() {
       urgency: e.urgency
     }));
     try {
-      const response = await fetch('http://127.0.0.1:5000/optimize_schedule', {
+      // Improved events are streamed in as the model finishes each one, so the preview opens on the first
+      const response = await fetch('http://127.0.0.1:5000/optimize_schedule/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ schedule, allowed_modifications: allowed }),
       });
-      const data = await response.json();
-      if (response.ok) {
-        if (data.message) {
-          alert(data.message);
-        } else {
-          setPreviewSchedule(data.schedule);
-          setIsPreviewModalOpen(true);
-        }
-      } else {
+      if (!response.ok || !response.body) {
+        const data = await response.json();
         alert(data.message || 'Failed to optimize');
+        return;
       }
+      let preview = schedule;
+      await readEventStream(response, (eventName, data) => {
+        if (eventName === 'event') {
+          preview = preview.map(e => (e.id === data.id ? data : e));
+          setPreviewSchedule(preview);
+          setIsPreviewModalOpen(true);
+          setIsLoading(false);
+        } else if (eventName === 'done') {
+          if (data.message) {
+            setIsPreviewModalOpen(false);
+            setPreviewSchedule(null);
+            alert(data.message);
+          } else {
+            setPreviewSchedule(data.schedule);
+            setIsPreviewModalOpen(true);
+          }
+        } else if (eventName === 'error') {
+          setIsPreviewModalOpen(false);
+          setPreviewSchedule(null);
+          alert(data.message || 'Failed to optimize');
+        }
+      });
     } catch (err) {
       console.error('Error optimizing schedule:', err);
       alert('Error optimizing schedule');
@@ -504,15 +501,21 @@ function DayDetails() {
   const handleAcceptPreview = async () => {
     if (!previewSchedule) return;
     try {
-      for (const newEvent of previewSchedule) {
-        const existing = events.find(e => e.id === newEvent.id);
-        if (existing) {
-          await fetch(`http://127.0.0.1:5000/update_schedule/${newEvent.id}`, {
-            method: 'PATCH',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ eventInfo: newEvent }),
-          });
-        }
+      const accepted = previewSchedule.filter(newEvent => events.some(e => e.id === newEvent.id));
+      // The whole optimization is applied in one request and one commit
+      if (accepted.length > 0) {
+        await applyBatch(accepted.map(newEvent => ({ op: 'update', id: newEvent.id, eventInfo: newEvent })));
+        const acceptedIds = new Set(accepted.map(e => e.id));
+        setActionHistory(prev => {
+          const newHistory = [...prev, {
+            type: 'batchUpdate',
+            oldEvents: events.filter(e => acceptedIds.has(e.id)).map(e => ({ ...e })),
+            newEvents: accepted.map(e => ({ ...e })),
+          }];
+          if (newHistory.length > maxHistorySize) newHistory.shift();
+          return newHistory;
+        });
+        setRedoHistory([]);
       }
       setEvents(previewSchedule);
       setIsPreviewModalOpen(false);
@@ -520,7 +523,7 @@ function DayDetails() {
       setShowOriginalEvents(false);
     } catch (error) {
       console.error('Error accepting preview:', error);
-      alert('Failed to accept preview');
+      alert(`Failed to accept preview: ${error.message}`);
     }
   };
 
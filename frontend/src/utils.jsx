@@ -49,6 +49,29 @@ export const minutesToTime = (minutes) => {
   const h12 = hours % 12 || 12;
   return `${h12.toString().padStart(2, '0')}:${mins.toString().padStart(2, '0')} ${period}`;
 };
+// Reads a server-sent event stream from a fetch() response, calling onEvent(eventName, data) per message.
+// Used for POST endpoints, which EventSource can't call.
+export const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const messages = buffer.split('\n\n');
+    buffer = messages.pop();
+    for (const message of messages) {
+      let eventName = 'message';
+      const dataLines = [];
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) eventName = line.slice(7);
+        else if (line.startsWith('data: ')) dataLines.push(line.slice(6));
+      }
+      if (dataLines.length) onEvent(eventName, JSON.parse(dataLines.join('\n')));
+    }
+  }
+};
 /*
 Use this to delete a specific event manually
 fetch('http://127.0.0.1:5000/delete_schedule/1', {
@@ -0,0 +1,34 @@
+"""Runs the backend against a throwaway database and the stub model. Each test gets an empty schedule."""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+DATABASE = os.path.join(tempfile.mkdtemp(prefix="eventide-tests-"), "eventide.db")
+
+os.environ["EVENTIDE_DATABASE_URI"] = "sqlite:///" + DATABASE
+os.environ["EVENTIDE_AI_MODEL"] = "stub"
+sys.path.insert(0, BACKEND)
+
+import main  # noqa: E402
+from config import app, db  # noqa: E402
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        main.init_db()
+    yield app.test_client()
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+
+def create_event(client, **event_info):
+    """Posts one event (09:00-10:00 on 2026-10-19 unless overridden) and returns its id"""
+    event = {"title": "Event", "startDate": "2026-10-19", "endDate": "2026-10-19",
+             "start": "09:00 AM", "end": "10:00 AM", "urgency": "ongoing", "locked": False, **event_info}
+    response = client.post("/create_schedule", json={"eventInfo": event})
+    assert response.status_code == 201, response.json
+    return response.json["id"]
@@ -0,0 +1,32 @@
+from config import app
+import aiService
+import chunkedOptimizer
+
+TRIP = {"id": 1, "title": "Trip", "startDate": "2026-10-19", "endDate": "2026-10-21", "start": "06:00 PM",
+        "end": "10:00 AM", "urgency": "important", "locked": True, "type": "event"}
+
+def task(id, start, end, day):
+    return {"id": id, "title": f"Task {id}", "startDate": day, "endDate": day, "start": start, "end": end,
+            "urgency": "ongoing", "locked": False, "type": "event"}
+
+def optimize_with_moves(monkeypatch, schedule, moves):
+    """Runs the chunked optimizer with a model that applies moves ({id: (start, end)}) to its chunk"""
+    def model(payload, allowed, key):
+        return {"schedule": [{**event, "start": moves[event["id"]][0], "end": moves[event["id"]][1]}
+                             for event in payload if event["id"] in moves]}, 200
+    monkeypatch.setattr(aiService, "optimize", model)
+    with app.app_context():
+        return chunkedOptimizer.optimize(schedule, ["times"], f"test:{moves}")
+
+def test_move_into_an_overnight_multi_day_locked_event_is_rejected(client, monkeypatch):
+    # The middle day of the trip is booked all day, not just from 6 PM to 10 AM
+    body, status = optimize_with_moves(monkeypatch, [TRIP, task(4, "11:00 PM", "11:30 PM", "2026-10-20")],
+                                       {4: ("02:00 PM", "02:30 PM")})
+    assert status == 200 and body["chunks"]["conflicts"] == 1
+    assert body["message"] == "Perfect Schedule"
+
+def test_move_outside_the_multi_day_event_is_accepted(client, monkeypatch):
+    body, status = optimize_with_moves(monkeypatch, [TRIP, task(2, "09:00 AM", "09:30 AM", "2026-10-21")],
+                                       {2: ("11:00 AM", "11:30 AM")})
+    assert status == 200 and body["chunks"]["conflicts"] == 0
+    assert [event["start"] for event in body["schedule"]] == ["06:00 PM", "11:00 AM"]
@@ -0,0 +1,22 @@
+import localOptimizer
+
+def event(id, start, end, start_date="2026-10-20", end_date=None, **fields):
+    return {"id": id, "title": f"Event {id}", "startDate": start_date, "endDate": end_date or start_date,
+            "start": start, "end": end, "urgency": "ongoing", "locked": False, "type": "event", **fields}
+
+def test_overnight_multi_day_event_blocks_the_days_it_covers():
+    trip = event(1, "06:00 PM", "10:00 AM", start_date="2026-10-19", end_date="2026-10-21", locked=True)
+    inside = event(2, "11:00 PM", "11:30 PM")
+    morning = event(3, "09:00 AM", "09:30 AM", start_date="2026-10-21")
+    result = localOptimizer.optimize([trip, inside, morning], ["times"])
+    moved = {item["id"]: (item["start"], item["end"]) for item in result.get("schedule", [trip, inside, morning])}
+    # Nothing on 2026-10-20 is free, so the task stays where it was instead of moving into the trip
+    assert moved[2] == ("11:00 PM", "11:30 PM")
+    assert moved[3] == ("10:10 AM", "10:40 AM")
+
+def test_long_events_keep_their_length_and_go_to_the_model():
+    deep_work = event(1, "09:00 AM", "12:00 PM")
+    result = localOptimizer.optimize([deep_work], ["times"])
+    assert result == {"message": "Perfect Schedule"}
+    assert localOptimizer.needs_model(["times"], [deep_work])
+    assert not localOptimizer.needs_model(["times"], [event(2, "09:00 AM", "10:00 AM")])
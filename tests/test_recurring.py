@@ -0,0 +1,23 @@
+from config import app, db
+from models import RecurrenceOverride
+
+EVENT = {"title": "Standup", "startDate": "2026-10-19", "endDate": "2026-10-19", "start": "09:00 AM",
+         "end": "09:15 AM", "urgency": "ongoing", "locked": False}
+
+def stored_override(recurring_id, day):
+    with app.app_context():
+        return db.session.get(RecurrenceOverride, (recurring_id, day)).eventInfo
+
+def test_occurrence_overrides_get_the_same_reminder_flag_as_other_writes(client):
+    response = client.post("/create_recurring", json={"eventInfo": {**EVENT, "reminder": True}, "recurrence": {"freq": "daily"}})
+    assert response.status_code == 201
+    recurring_id = response.json["id"]
+    # A missing or non-boolean flag keeps the occurrence's current one, as updates of stored events do
+    moved = {**EVENT, "startDate": "2026-10-20", "endDate": "2026-10-20", "start": "10:00 AM", "end": "10:15 AM"}
+    assert client.patch(f"/update_schedule/r{recurring_id}:2026-10-20", json={"eventInfo": {**moved, "reminder": "yes"}}).status_code == 200
+    assert stored_override(recurring_id, "2026-10-20")["reminder"] is True
+    batch = [{"op": "update", "id": f"r{recurring_id}:2026-10-21", "eventInfo": {**moved, "startDate": "2026-10-21", "endDate": "2026-10-21"}}]
+    assert client.post("/schedule/batch", json={"operations": batch}).status_code == 200
+    assert stored_override(recurring_id, "2026-10-21")["reminder"] is True
+    assert client.patch(f"/update_schedule/r{recurring_id}:2026-10-20", json={"eventInfo": {**moved, "reminder": False}}).status_code == 200
+    assert stored_override(recurring_id, "2026-10-20")["reminder"] is False
@@ -0,0 +1,22 @@
+from conftest import create_event
+
+def month_summary(client, month="2026-10"):
+    response = client.get(f"/schedule/summary?month={month}")
+    assert response.status_code == 200
+    return response.json["days"]
+
+def test_overlapping_events_are_booked_once(client):
+    create_event(client, start="09:00 AM", end="11:00 AM")
+    create_event(client, start="10:00 AM", end="12:00 PM")
+    create_event(client, start="10:30 AM", end="11:00 AM")
+    create_event(client, start="02:00 PM", end="03:00 PM")
+    day = month_summary(client)["2026-10-19"]
+    assert day["count"] == 4
+    assert day["bookedMinutes"] == 4 * 60
+
+def test_multi_day_event_books_each_covered_day(client):
+    create_event(client, startDate="2026-10-19", endDate="2026-10-21", start="06:00 PM", end="10:00 AM")
+    create_event(client, startDate="2026-10-20", endDate="2026-10-20", start="09:00 AM", end="10:00 AM")
+    days = month_summary(client)
+    assert [days[day]["bookedMinutes"] for day in ("2026-10-19", "2026-10-20", "2026-10-21")] == [360, 1440, 600]
+    assert days["2026-10-20"]["count"] == 2